@@ -1,10 +1,12 @@
 """
 Blender 편집 관련 API 엔드포인트
 """
-from fastapi import APIRouter, HTTPException, Path, Body
+from fastapi import APIRouter, HTTPException, Path, Body, Query
 from pydantic import BaseModel
 from typing import Optional
-from app.services.blender_mcp_service import blender_service
+from app.services.blender_pool import blender_pool
+from app.services.blender_mcp_service import ChatEditor, edited_model_path, export_stats, record_export
+from app.services import conversation_store, edit_cache, glb_optimizer, intent_parser
 from app.core.config import settings
 import os
 
@@ -13,6 +15,8 @@ router = APIRouter()
 
 class ChatEditRequest(BaseModel):
     message: str
+    # True면 편집만 하고 GLB 내보내기는 미룸 (연속 편집 중 미리보기용, 내보내기는 POST /tasks/{task_id}/export)
+    preview: bool = False
     
 
 class ChatEditResponse(BaseModel):
@@ -20,6 +24,11 @@ class ChatEditResponse(BaseModel):
     message: str
     tools_used: list
     model_url: Optional[str] = None
+    export_pending: bool = False
+
+
+def _edited_model_url(task_id: str) -> str:
+    return f"/static/models/{task_id}_edited.glb"
 
 
 @router.post(
@@ -50,39 +59,47 @@ async def edit_model_with_chat(
     try:
         print(f"[DEBUG] 편집 시작 - Task ID: {task_id}, Message: {request.message}")
         
-        # Blender MCP를 통해 모델 로드 (처음 편집 시에만)
-        if not blender_service.is_model_loaded(task_id):
-            print(f"[DEBUG] 첫 편집 - 모델 로드 시작: {model_path}")
-            load_result = await blender_service.load_model(model_path, task_id)
-            print(f"[DEBUG] 모델 로드 결과: {load_result}")
-            
-            if not load_result.get("success"):
-                raise HTTPException(
-                    status_code=500, 
-                    detail=f"모델 로드 실패: {load_result.get('error')}"
-                )
-        else:
-            print(f"[DEBUG] 이어서 편집 - 모델 로드 스킵")
-        
-        # 채팅 기반 편집 실행
-        print(f"[DEBUG] 채팅 편집 시작")
-        edit_result = await blender_service.chat_edit(
-            user_message=request.message,
-            model_path=model_path,
-            task_id=task_id
-        )
-        print(f"[DEBUG] 편집 결과: {edit_result}")
-        
-        if not edit_result.get("success"):
-            error_detail = edit_result.get("error", "편집 실패")
-            print(f"[ERROR] 편집 실패: {error_detail}")
-            raise HTTPException(status_code=500, detail=error_detail)
-        
-        # 편집된 모델 저장 (새 파일명으로)
-        edited_model_path = os.path.join(settings.OUTPUT_DIR, f"{task_id}_edited.glb")
-        print(f"[DEBUG] 모델 저장 시작: {edited_model_path}")
-        save_result = await blender_service.save_model(edited_model_path)
-        print(f"[DEBUG] 모델 저장 결과: {save_result}")
+        # 같은 작업의 편집은 순서대로 실행되고, Blender 워커는 형상을 바꾸는 편집일 때만 배정됨
+        # (변환/재질 값만 바꾸는 편집은 GLB를 직접 수정하므로 워커를 띄우거나 다른 세션을 내보내지 않음)
+        # 모델은 Blender가 필요한 편집일 때만 로드됨 (처음 편집, 세션 이동, GLB 직접 편집 후 파일 변경 시)
+        async with blender_pool.edit_session(task_id) as session:
+            # 채팅 기반 편집 실행
+            print(f"[DEBUG] 채팅 편집 시작")
+            edit_result = await ChatEditor(session).chat_edit(
+                user_message=request.message,
+                model_path=model_path,
+                task_id=task_id
+            )
+            print(f"[DEBUG] 편집 결과: {edit_result}")
+
+            if not edit_result.get("success"):
+                error_detail = edit_result.get("error", "편집 실패")
+                print(f"[ERROR] 편집 실패: {error_detail}")
+                raise HTTPException(status_code=500, detail=error_detail)
+
+            # 편집된 모델 저장 (새 파일명으로, GLB를 직접 수정한 경우 이미 저장됨)
+            # 씬이 바뀌지 않았으면 애드온이 내보내기를 건너뜀
+            edited_path = edited_model_path(task_id)
+            if edit_result.get("saved") or session.service is None:
+                record_export("fast_path")
+                save_result = {"success": os.path.exists(edited_path), "path": edited_path}
+            elif request.preview:
+                # 미리보기: 연속 편집이 끝나면 한 번만 내보내도록 예약
+                blender_pool.schedule_export(task_id)
+                save_result = None
+            else:
+                blender_pool.cancel_export(task_id)
+                print(f"[DEBUG] 모델 저장 시작: {edited_path}")
+                save_result = await session.service.save_model(edited_path)
+                print(f"[DEBUG] 모델 저장 결과: {save_result}")
+
+        if save_result is None:
+            return ChatEditResponse(
+                success=True,
+                message=edit_result.get("message", "편집이 완료되었습니다."),
+                tools_used=edit_result.get("tools_used", []),
+                export_pending=True
+            )
         
         if not save_result.get("success"):
             # 저장 실패해도 편집은 성공했으므로 경고만 추가
@@ -92,7 +109,7 @@ async def edit_model_with_chat(
             success=True,
             message=edit_result.get("message", "편집이 완료되었습니다."),
             tools_used=edit_result.get("tools_used", []),
-            model_url=f"/static/models/{task_id}_edited.glb" if save_result.get("success") else None
+            model_url=_edited_model_url(task_id) if save_result.get("success") else None
         )
         
     except HTTPException:
@@ -105,6 +122,20 @@ async def edit_model_with_chat(
         raise HTTPException(status_code=500, detail=f"편집 중 오류 발생: {str(e)}")
 
 
+@router.post(
+    "/tasks/{task_id}/export",
+    summary="편집 결과 내보내기",
+    description="미리보기 편집으로 미뤄 둔 GLB 내보내기를 바로 실행하고 편집된 모델 URL을 반환합니다. 바뀐 것이 없으면 내보내기를 건너뜁니다."
+)
+async def export_edited_model(
+    task_id: str = Path(..., description="내보낼 작업 ID")
+):
+    result = await blender_pool.export(task_id)
+    if not result.get("success"):
+        raise HTTPException(status_code=500, detail=result.get("error", "편집된 모델이 없습니다."))
+    return {"task_id": task_id, "model_url": _edited_model_url(task_id), "skipped": result.get("skipped", False)}
+
+
 @router.post(
     "/tasks/{task_id}/reset-edit",
     summary="편집 대화 초기화",
@@ -114,28 +145,113 @@ async def reset_edit_conversation(
     task_id: str = Path(..., description="초기화할 작업 ID")
 ):
     """편집 대화 히스토리 초기화"""
-    blender_service.reset_conversation(task_id)
+    blender_pool.reset(task_id)
     return {"message": "대화 히스토리가 초기화되었습니다.", "task_id": task_id}
 
 
+@router.get(
+    "/tasks/{task_id}/edit-conversation",
+    summary="편집 대화 상태 조회",
+    description="작업의 최근 편집 대화, 누적된 장면 상태 요약, LLM 토큰 사용량을 조회합니다."
+)
+async def get_edit_conversation(
+    task_id: str = Path(..., description="조회할 작업 ID")
+):
+    scene = conversation_store.scene_state(task_id)
+    return {
+        "task_id": task_id,
+        "messages": conversation_store.history(task_id),
+        "scene": scene,
+        "scene_summary": conversation_store.summarize_scene(scene),
+        "usage": conversation_store.usage(task_id),
+    }
+
+
 @router.get(
     "/tasks/{task_id}/download-edited",
     summary="편집된 모델 다운로드",
     description="편집된 3D 모델 파일을 다운로드합니다."
 )
 async def download_edited_model(
-    task_id: str = Path(..., description="다운로드할 작업 ID")
+    task_id: str = Path(..., description="다운로드할 작업 ID"),
+    variant: str = Query("original", description="original 또는 optimized (최적화 변형이 아직 없으면 원본)")
 ):
     """편집된 GLB 모델 다운로드"""
     from fastapi.responses import FileResponse
     
-    edited_path = os.path.join(settings.OUTPUT_DIR, f"{task_id}_edited.glb")
+    if variant not in glb_optimizer.VARIANTS:
+        raise HTTPException(status_code=400, detail=f"variant는 {', '.join(glb_optimizer.VARIANTS)} 중 하나여야 합니다.")
+    edited_path = edited_model_path(task_id)
     
     if not os.path.exists(edited_path):
         raise HTTPException(status_code=404, detail="편집된 모델을 찾을 수 없습니다.")
     
+    path = glb_optimizer.variant_path(edited_path, variant)
     return FileResponse(
-        path=edited_path,
+        path=path,
         media_type="model/gltf-binary",
-        filename=f"{task_id}_edited.glb"
+        filename=os.path.basename(path),
+        headers={"X-Model-Variant": "original" if path == edited_path else "optimized"}
     )
+
+
+@router.get(
+    "/tasks/{task_id}/edited-lods",
+    summary="편집된 모델 LOD 매니페스트 조회",
+    description="편집된 모델의 LOD 단계별 URL, 삼각형 수, 파일 크기를 조회합니다. LOD가 아직 없거나 이후 편집으로 오래되었으면 편집 결과(0단계)만 반환합니다."
+)
+async def get_edited_model_lods(
+    task_id: str = Path(..., description="조회할 작업 ID")
+):
+    edited_path = edited_model_path(task_id)
+    if not os.path.exists(edited_path):
+        raise HTTPException(status_code=404, detail="편집된 모델을 찾을 수 없습니다.")
+    manifest = glb_optimizer.lod_manifest(edited_path)
+    for level in manifest["levels"]:
+        level["url"] = f"/static/models/{level['file']}"
+    return manifest
+
+
+@router.get(
+    "/blender/pool",
+    summary="Blender 워커 풀 상태",
+    description="Blender 워커별 포트, 배정된 편집 세션, 사용 중 여부를 조회합니다."
+)
+async def get_blender_pool_stats():
+    return blender_pool.stats()
+
+
+@router.get(
+    "/blender/exports/stats",
+    summary="편집 결과 내보내기 통계",
+    description="GLB 내보내기 횟수와 평균 소요 시간(ms), 바뀐 것이 없거나 지연 내보내기로 합쳐지거나 GLB 직접 편집으로 건너뛴 내보내기 수를 조회합니다."
+)
+async def get_export_stats():
+    return export_stats()
+
+
+@router.get(
+    "/blender/snapshots",
+    summary="Blender 씬 스냅샷 캐시 통계",
+    description="워커별 씬 스냅샷 복원/glTF import 횟수와 평균 소요 시간(ms), 스냅샷 저장 시간, 단색 재질 재사용/생성/정리 수를 조회합니다."
+)
+async def get_blender_snapshot_stats():
+    return {"workers": await blender_pool.snapshot_stats()}
+
+
+@router.get(
+    "/blender/intent/stats",
+    summary="로컬 의도 파서 적중률",
+    description="LLM 호출 없이 로컬 파서로 처리한 편집 요청 수(hits)와 LLM에 넘긴 요청 수(misses), 명령별 처리 수를 조회합니다."
+)
+async def get_intent_parser_stats():
+    return intent_parser.stats()
+
+
+@router.get(
+    "/blender/edit-cache/stats",
+    summary="편집 명령 캐시 통계",
+    description="LLM 편집 명령 캐시의 정확/근사 적중 수, 적중률, 절약한 LLM 호출 시간(ms)과 항목 수를 조회합니다."
+)
+async def get_edit_cache_stats():
+    return edit_cache.stats()
@@ -1,33 +1,100 @@
 import uuid
 import os
 import json
-import redis
+import anyio
+import anyio.to_thread
+import hashlib
+import zipfile
+import mimetypes
+from typing import List, Optional, Tuple
 from app.core.config import settings
-from fastapi import APIRouter, File, UploadFile, BackgroundTasks, HTTPException, Depends, Path, Form, Body
-from starlette.responses import JSONResponse
-from app.services.ai_pipeline import run_ai_pipeline
-from app.schemas.generation import AIOptions, SetEmailRequest
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Path, Form, Body, Query, Request, WebSocket, WebSocketDisconnect
+from starlette.responses import FileResponse, JSONResponse, StreamingResponse
+from app.services import batch_store, generation_cache, glb_optimizer, job_queue, task_store
+from app.services.ai_pipeline import complete_task
+from app.services.status_broker import status_broker
+from app.schemas.generation import AIOptions, SetEmailRequest, BatchStatusRequest
 
 
 router = APIRouter()
 
-redis_client = redis.Redis(
-    host=settings.REDIS_HOST,
-    port=settings.REDIS_PORT,
-    db=settings.REDIS_DB,
-    decode_responses=True
-)
-
 UPLOAD_DIR = settings.UPLOAD_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
+async def _save_upload(file: UploadFile, file_path: str) -> str:
+    """
+    업로드 파일을 청크 단위로 디스크에 복사하고, 파일 하나가 크기 제한을 넘으면 중단
+    저장하면서 계산한 이미지 SHA-256을 반환
+    (요청 본문 전체 크기는 본문을 받는 동안 UploadSizeLimitMiddleware가 먼저 제한)
+    """
+    too_large_detail = f"파일 크기는 {settings.MAX_UPLOAD_SIZE // (1024 * 1024)}MB를 넘을 수 없습니다."
+    if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail=too_large_detail)
+
+    written = 0
+    digest = hashlib.sha256()
+    try:
+        async with await anyio.open_file(file_path, "wb") as buffer:
+            while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > settings.MAX_UPLOAD_SIZE:
+                    raise HTTPException(status_code=413, detail=too_large_detail)
+                digest.update(chunk)
+                await buffer.write(chunk)
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return digest.hexdigest()
+
+
+async def _submit_task(task_id: str, file_path: str, original_filename: str, image_digest: str,
+                       options: AIOptions, batch_id: Optional[str] = None) -> bool:
+    """
+    저장된 업로드 이미지로 생성 작업을 등록 (캐시 적중이면 바로 완료 처리)
+    캐시에서 결과를 재사용했으면 True 반환
+    """
+    task_store.create(task_id, status="processing", progress=0, cached=False, batch_id=batch_id)
+
+    cache_key = generation_cache.cache_key(image_digest, options.dict())
+    cached_path = generation_cache.lookup(cache_key)
+    generation_cache.record(hit=cached_path is not None)
+
+    if cached_path is None and settings.GENERATION_CACHE_ENABLED and not generation_cache.claim(cache_key, task_id):
+        # 같은 이미지 + 옵션의 생성이 이미 진행 중이면 그 결과를 함께 받음
+        os.remove(file_path)
+        task_store.update(task_id, detail="동일한 요청의 생성 결과를 기다리는 중...")
+        # 대기 등록 직전에 선행 작업이 끝났을 수 있으므로 한 번 더 확인
+        cached_path = generation_cache.lookup(cache_key)
+        if cached_path is None:
+            return False
+
+    if cached_path is not None:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        output_filename = f"{task_id}.glb"
+        generation_cache.link_model(cached_path, os.path.join(settings.OUTPUT_DIR, output_filename))
+        await complete_task(task_id, output_filename, cached=True)
+        glb_optimizer.schedule(os.path.join(settings.OUTPUT_DIR, output_filename))
+        print(f"[{task_id}] 생성 캐시 적중: {cache_key}")
+        return True
+
+    job_queue.enqueue(
+        task_id=task_id,
+        image_path=file_path,
+        original_filename=original_filename,
+        options=options.dict(),
+        cache_key=cache_key if settings.GENERATION_CACHE_ENABLED else None,
+    )
+    return False
+
+
 @router.post("/generate",
              summary="3D 모델 생성 시작",
-             description="이미지 파일과 AI 옵션을 받아 3D 모델 생성을 비동기적으로 시작합니다.",
+             description="이미지 파일과 AI 옵션을 받아 3D 모델 생성 작업을 큐에 등록합니다. 실제 생성은 워커 프로세스(python -m app.worker)가 처리합니다.",
              status_code=202)
 async def generate_3d_model(
-    background_tasks: BackgroundTasks,
     options: AIOptions = Depends(),
     file: UploadFile = File(..., description="3D 모델을 생성할 원본 이미지 파일 (JPG, PNG 등)"),
 ):
@@ -36,37 +103,303 @@ async def generate_3d_model(
 
     task_id = str(uuid.uuid4())
     file_path = os.path.join(UPLOAD_DIR, f"{task_id}_{file.filename}")
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
+    image_digest = await _save_upload(file, file_path)
 
-    initial_status = {"status": "processing", "progress": 0}
-    redis_client.set(task_id, json.dumps(initial_status))
+    cached = await _submit_task(task_id, file_path, file.filename, image_digest, options)
 
-    background_tasks.add_task(
-        run_ai_pipeline,
-        task_id=task_id,
-        image_path=file_path,
-        original_filename=file.filename,
-        options=options.dict(),
+    return JSONResponse(
+        status_code=202,
+        content={"task_id": task_id, "status_url": f"/api/status/{task_id}", "cached": cached}
     )
 
+
+def _extract_archive_image(archive: zipfile.ZipFile, info: zipfile.ZipInfo, file_path: str) -> str:
+    """zip 항목 하나를 청크 단위로 풀어 저장하고 SHA-256 반환 (압축 해제 크기가 제한을 넘으면 중단)"""
+    written = 0
+    digest = hashlib.sha256()
+    try:
+        with archive.open(info) as source, open(file_path, "wb") as buffer:
+            while chunk := source.read(settings.UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > settings.MAX_UPLOAD_SIZE:
+                    raise ValueError(f"파일 크기는 {settings.MAX_UPLOAD_SIZE // (1024 * 1024)}MB를 넘을 수 없습니다.")
+                digest.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return digest.hexdigest()
+
+
+def _open_archive(archive_file: UploadFile) -> Tuple[zipfile.ZipFile, List[zipfile.ZipInfo]]:
+    """zip 파일을 열어 (ZipFile, 처리할 항목 목록) 반환 (디렉터리와 숨김 파일 제외)"""
+    try:
+        archive = zipfile.ZipFile(archive_file.file)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="올바른 zip 파일이 아닙니다.")
+    entries = [info for info in archive.infolist()
+               if not info.is_dir() and not os.path.basename(info.filename).startswith(".")]
+    return archive, entries
+
+
+async def _iter_archive_images(archive: zipfile.ZipFile, entries: List[zipfile.ZipInfo]):
+    """zip 파일의 이미지 항목을 하나씩 풀어 (파일 이름, 작업 ID, 저장 경로, SHA-256, 오류) 형태로 반환"""
+    with archive:
+        for info in entries:
+            filename = os.path.basename(info.filename)
+            mime_type = mimetypes.guess_type(filename)[0] or ""
+            if not mime_type.startswith("image/"):
+                yield filename, None, None, None, "이미지 파일만 업로드할 수 있습니다."
+                continue
+
+            task_id = str(uuid.uuid4())
+            file_path = os.path.join(UPLOAD_DIR, f"{task_id}_{filename}")
+            try:
+                image_digest = await anyio.to_thread.run_sync(_extract_archive_image, archive, info, file_path)
+            except (ValueError, zipfile.BadZipFile, RuntimeError) as e:
+                yield filename, None, None, None, str(e)
+                continue
+            yield filename, task_id, file_path, image_digest, None
+
+
+@router.post("/generate/batch",
+             summary="3D 모델 일괄 생성 시작",
+             description="여러 이미지 파일(files) 또는 이미지가 담긴 zip 파일(archive)과 공통 AI 옵션을 받아 작업을 한 번에 등록합니다. "
+                         "Meshy 요청은 워커에서 동시 요청 수와 토큰 버킷 속도 제한에 맞춰 처리됩니다.",
+             status_code=202)
+async def generate_3d_models_batch(
+    options: AIOptions = Depends(),
+    files: List[UploadFile] = File(None, description="3D 모델을 생성할 원본 이미지 파일 목록"),
+    archive: Optional[UploadFile] = File(None, description="원본 이미지들을 담은 zip 파일"),
+):
+    if not files and archive is None:
+        raise HTTPException(status_code=400, detail="files 또는 archive 중 하나는 필요합니다.")
+
+    # 개수 제한은 배치를 만들기 전에 확인 (zip은 항목 수로 확인, 413 응답 후 빈 배치가 Redis에 남지 않도록)
+    archive_entries = None
+    if archive is not None:
+        archive_zip, archive_entries = _open_archive(archive)
+    if len(files or []) + len(archive_entries or []) > settings.BATCH_MAX_ITEMS:
+        if archive_entries is not None:
+            archive_zip.close()
+        raise HTTPException(status_code=413, detail=f"한 번에 최대 {settings.BATCH_MAX_ITEMS}개까지 등록할 수 있습니다.")
+
+    batch_id = str(uuid.uuid4())
+    batch_store.create(batch_id, options.dict())
+    items = []
+    rejected = []
+
+    async def submit(task_id: str, filename: str, file_path: str, image_digest: str):
+        batch_store.add_task(batch_id, task_id)
+        cached = await _submit_task(task_id, file_path, filename, image_digest, options, batch_id=batch_id)
+        items.append({"filename": filename, "task_id": task_id, "cached": cached})
+
+    for file in files or []:
+        if not (file.content_type or "").startswith("image/"):
+            rejected.append({"filename": file.filename, "detail": "이미지 파일만 업로드할 수 있습니다."})
+            continue
+        task_id = str(uuid.uuid4())
+        file_path = os.path.join(UPLOAD_DIR, f"{task_id}_{file.filename}")
+        try:
+            image_digest = await _save_upload(file, file_path)
+        except HTTPException as e:
+            rejected.append({"filename": file.filename, "detail": e.detail})
+            continue
+        await submit(task_id, file.filename, file_path, image_digest)
+
+    if archive_entries is not None:
+        async for filename, task_id, file_path, image_digest, error in _iter_archive_images(archive_zip, archive_entries):
+            if error:
+                rejected.append({"filename": filename, "detail": error})
+                continue
+            await submit(task_id, filename, file_path, image_digest)
+
+    print(f"[Batch {batch_id}] {len(items)}개 작업 등록, {len(rejected)}개 거부")
     return JSONResponse(
         status_code=202,
-        content={"task_id": task_id, "status_url": f"/api/status/{task_id}"}
+        content={
+            "batch_id": batch_id,
+            "status_url": f"/api/batches/{batch_id}",
+            "task_ids": [item["task_id"] for item in items],
+            "items": items,
+            "rejected": rejected,
+        }
     )
 
 
+@router.get("/batches/{batch_id}",
+            summary="일괄 생성 진행 상황 조회",
+            description="배치에 속한 작업들의 완료/실패 수와 전체 진행률을 조회합니다."
+            )
+async def get_batch_status(batch_id: str = Path(..., description="조회할 배치의 고유 ID")):
+    batch_data = batch_store.get(batch_id)
+    if not batch_data:
+        raise HTTPException(status_code=404, detail="배치를 찾을 수 없습니다.")
+    return batch_data
+
+
+@router.get("/cache/stats",
+            summary="생성 캐시 통계",
+            description="동일 이미지 + 옵션 재사용 캐시의 적중/실패 횟수와 디스크 사용량을 조회합니다."
+            )
+async def get_generation_cache_stats():
+    return generation_cache.stats()
+
+
+@router.get("/models/optimizer/stats",
+            summary="GLB 최적화 통계",
+            description="gltfpack 최적화 변형 생성 횟수, 원본 대비 크기 비율, 평균 처리 시간(ms)을 조회합니다."
+            )
+async def get_glb_optimizer_stats():
+    return glb_optimizer.stats()
+
+
+@router.get("/tasks/{task_id}/model",
+            summary="생성된 모델 다운로드",
+            description="생성된 GLB를 내려받습니다. variant=optimized면 메쉬/텍스처를 압축한 변형을, 아직 없으면 원본을 내려줍니다 (X-Model-Variant 헤더로 구분)."
+            )
+async def download_model(
+        task_id: str = Path(..., description="다운로드할 작업 ID"),
+        variant: str = Query("original", description="original 또는 optimized"),
+):
+    if variant not in glb_optimizer.VARIANTS:
+        raise HTTPException(status_code=400, detail=f"variant는 {', '.join(glb_optimizer.VARIANTS)} 중 하나여야 합니다.")
+    model_path = os.path.join(settings.OUTPUT_DIR, f"{task_id}.glb")
+    if not os.path.exists(model_path):
+        raise HTTPException(status_code=404, detail="모델 파일을 찾을 수 없습니다.")
+
+    path = glb_optimizer.variant_path(model_path, variant)
+    return FileResponse(
+        path=path,
+        media_type="model/gltf-binary",
+        filename=os.path.basename(path),
+        headers={"X-Model-Variant": "original" if path == model_path else "optimized"},
+    )
+
+
+@router.get("/tasks/{task_id}/lods",
+            summary="LOD 매니페스트 조회",
+            description="생성된 모델의 LOD 단계별 URL, 삼각형 수, 파일 크기를 조회합니다. 거친 단계부터 받아 점차 교체하면 됩니다. LOD가 아직 없거나 오래되었으면 원본(0단계)만 반환합니다."
+            )
+async def get_model_lods(task_id: str = Path(..., description="조회할 작업 ID")):
+    model_path = os.path.join(settings.OUTPUT_DIR, f"{task_id}.glb")
+    if not os.path.exists(model_path):
+        raise HTTPException(status_code=404, detail="모델 파일을 찾을 수 없습니다.")
+    manifest = glb_optimizer.lod_manifest(model_path)
+    for level in manifest["levels"]:
+        level["url"] = f"/static/models/{level['file']}"
+    return manifest
+
+
 @router.get("/status/{task_id}",
             summary="작업 상태 조회",
             description="제공된 Task ID에 해당하는 작업의 현재 상태와 진행률을 조회합니다."
             )
 async def get_task_status(task_id: str = Path(..., description="조회할 작업의 고유 ID", example="a1b2c3d4-e5f6-7890-1234-567890abcdef")):
-    status_json = redis_client.get(task_id)
+    status_data = task_store.get(task_id)
 
-    if not status_json:
+    if not status_data:
         raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
 
-    return json.loads(status_json)
+    return status_data
+
+
+@router.post("/status:batch",
+             summary="작업 상태 일괄 조회",
+             description="여러 작업의 상태를 한 번에 조회합니다. fields로 필요한 필드만 받을 수 있으며, 없는 작업은 null로 반환됩니다. 요청이 많으면 응답을 청크 단위로 스트리밍합니다."
+             )
+async def get_task_status_batch(request_body: BatchStatusRequest = Body(...)):
+    task_ids = list(dict.fromkeys(request_body.task_ids))
+    fields = request_body.fields
+    chunk_size = settings.STATUS_BATCH_CHUNK_SIZE
+
+    if len(task_ids) <= chunk_size:
+        return {"tasks": dict(zip(task_ids, task_store.get_many(task_ids, fields)))}
+
+    def chunks():
+        # {"tasks": {...}} 형태를 유지하면서 청크마다 파이프라인 한 번씩 조회해 바로 전송
+        yield '{"tasks": {'
+        for start in range(0, len(task_ids), chunk_size):
+            batch = task_ids[start:start + chunk_size]
+            entries = (
+                f"{json.dumps(task_id)}: {json.dumps(status_data, ensure_ascii=False)}"
+                for task_id, status_data in zip(batch, task_store.get_many(batch, fields))
+            )
+            yield ("" if start == 0 else ", ") + ", ".join(entries)
+        yield "}}"
+
+    return StreamingResponse(chunks(), media_type="application/json")
+
+
+def _stream_event(status_data: dict) -> str:
+    """진행 중이면 status, 끝났으면 completed/failed 이벤트 이름 반환"""
+    status = status_data.get("status")
+    return status if status in ("completed", "failed") else "status"
+
+
+@router.get("/status/{task_id}/events",
+            summary="작업 상태 스트리밍 (SSE)",
+            description="작업 상태가 바뀔 때마다 Server-Sent Events로 전송합니다. 완료되면 model_url이 담긴 completed 이벤트(실패 시 failed)를 보내고 스트림을 닫습니다."
+            )
+async def stream_task_status(request: Request, task_id: str = Path(..., description="구독할 작업의 고유 ID")):
+    if not task_store.exists(task_id):
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+
+    async def events():
+        async with status_broker.subscribe(task_id) as subscription:
+            # 구독 이후에 읽어야 그 사이의 변경을 놓치지 않음
+            status_data = task_store.get(task_id)
+            if not status_data:
+                return
+            while True:
+                event = _stream_event(status_data)
+                yield f"event: {event}\ndata: {json.dumps(status_data, ensure_ascii=False)}\n\n"
+                if event != "status":
+                    return
+
+                changes = None
+                while changes is None:
+                    if await request.is_disconnected():
+                        return
+                    changes = await subscription.next(timeout=settings.STATUS_STREAM_KEEPALIVE)
+                    if changes is None:
+                        yield ": keep-alive\n\n"
+                status_data.update(task_store.decode(changes))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws/status/{task_id}")
+async def task_status_websocket(websocket: WebSocket, task_id: str):
+    """작업 상태 스트리밍 (WebSocket). 메시지 형식: {"event": status|completed|failed, "data": {...}}"""
+    await websocket.accept()
+    if not task_store.exists(task_id):
+        await websocket.close(code=4404, reason="작업을 찾을 수 없습니다.")
+        return
+
+    try:
+        async with status_broker.subscribe(task_id) as subscription:
+            status_data = task_store.get(task_id) or {}
+            while True:
+                event = _stream_event(status_data)
+                await websocket.send_json({"event": event, "data": status_data})
+                if event != "status":
+                    break
+
+                changes = None
+                while changes is None:
+                    changes = await subscription.next(timeout=settings.STATUS_STREAM_KEEPALIVE)
+                    if changes is None:
+                        await websocket.send_json({"event": "keep-alive"})
+                status_data.update(task_store.decode(changes))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
 
 
 @router.delete("/tasks/{task_id}",
@@ -74,7 +407,7 @@ async def get_task_status(task_id: str = Path(..., description="조회할 작업
                description="완료되거나 실패한 작업을 시스템에서 완전히 삭제합니다."
                )
 async def delete_task(task_id: str = Path(..., description="삭제할 작업의 고유 ID", example="a1b2c3d4-e5f6-7890-1234-567890abcdef")):
-    if not redis_client.exists(task_id):
+    if not task_store.exists(task_id):
         raise HTTPException(status_code=404, detail=f"Task ID '{task_id}' not found.")
 
     print(f"Deleting task and files for ID: {task_id}")
@@ -92,6 +425,11 @@ async def delete_task(task_id: str = Path(..., description="삭제할 작업의
     except Exception as e:
         errors.append(f"Failed to delete model file: {e}")
 
+    try:
+        deleted_files.extend(glb_optimizer.remove(model_path))
+    except Exception as e:
+        errors.append(f"Failed to delete optimized model files: {e}")
+
     try:
         if os.path.exists(meta_path):
             os.remove(meta_path)
@@ -99,7 +437,7 @@ async def delete_task(task_id: str = Path(..., description="삭제할 작업의
     except Exception as e:
         errors.append(f"Failed to delete metadata file: {e}")
 
-    redis_client.delete(task_id)
+    task_store.delete(task_id)
 
     if errors:
         raise HTTPException(status_code=500, detail={"message": f"Task '{task_id}' removed from Redis, but file deletion failed.", "errors": errors})
@@ -119,13 +457,8 @@ async def set_email_for_task(
         task_id: str = Path(..., description="이메일 주소를 설정할 작업의 고유 ID"),
         request_body: SetEmailRequest = Body(...)
 ):
-    status_json = redis_client.get(task_id)
-    if not status_json:
+    if not task_store.set_if_exists(task_id, recipient_email=request_body.recipient_email):
         raise HTTPException(status_code=404, detail=f"Task ID '{task_id}' not found.")
 
-    status_data = json.loads(status_json)
-    status_data['recipient_email'] = request_body.recipient_email
-    redis_client.set(task_id, json.dumps(status_data))
-
     return {"message": "Email address has been set for the task.", "task_id": task_id,
             "recipient_email": request_body.recipient_email}
\ No newline at end of file
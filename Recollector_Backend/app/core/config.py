@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from typing import List
 from pydantic_settings import BaseSettings
 from pydantic import EmailStr
 
@@ -18,6 +19,60 @@ class Settings(BaseSettings):
     METADATA_DIR: Path = BASE_DIR.parent / "metadata"
     UPLOAD_DIR: Path = BASE_DIR.parent / "uploads"
 
+    # 업로드 이미지 크기 제한 및 스트리밍 청크 크기 (바이트)
+    MAX_UPLOAD_SIZE: int = 20 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+
+    # 생성 결과 캐시 (동일 이미지 + 옵션 재사용)
+    GENERATION_CACHE_ENABLED: bool = True
+    GENERATION_CACHE_MAX_BYTES: int = 5 * 1024 * 1024 * 1024
+    GENERATION_CACHE_INFLIGHT_TTL: int = 2 * 60 * 60
+
+    # 생성 작업 큐 / 워커
+    JOB_VISIBILITY_TIMEOUT: int = 60
+    JOB_MAX_ATTEMPTS: int = 5
+    WORKER_PROCESSES: int = 1
+    WORKER_CONCURRENCY: int = 50
+    WORKER_POLL_INTERVAL: float = 0.5
+
+    # 작업 상태 스트리밍 (SSE / WebSocket keep-alive 간격, 초 단위)
+    STATUS_STREAM_KEEPALIVE: float = 15.0
+
+    # 일괄 상태 조회 (이 개수를 넘으면 청크 단위 파이프라인으로 응답을 스트리밍)
+    STATUS_BATCH_CHUNK_SIZE: int = 500
+
+    # 일괄 제출 (요청당 최대 이미지 수, 요청 본문(여러 파일 또는 zip) 최대 크기)
+    BATCH_MAX_ITEMS: int = 500
+    MAX_BATCH_UPLOAD_SIZE: int = 512 * 1024 * 1024
+
+    # Meshy 작업 생성 요청 제한 (초당 토큰 수, 버킷 크기, 워커 프로세스당 동시 요청 수)
+    MESHY_SUBMIT_RATE: float = 2.0
+    MESHY_SUBMIT_BURST: int = 10
+    MESHY_SUBMIT_CONCURRENCY: int = 4
+
+    # Meshy 작업 상태 폴링 (초 단위)
+    MESHY_POLL_MIN_INTERVAL: float = 2.0
+    MESHY_POLL_MAX_INTERVAL: float = 30.0
+    MESHY_POLL_BACKOFF: float = 1.5
+    MESHY_POLL_CONCURRENCY: int = 16
+    # 일시적 오류(연결 오류, 타임아웃, 429/5xx)가 연속으로 이 횟수를 넘으면 작업 실패 처리
+    MESHY_POLL_MAX_ERRORS: int = 5
+
+    # Meshy HTTP 클라이언트 (커넥션 풀, 타임아웃, 재시도)
+    # keep-alive 수가 최대 연결 수보다 작으면 요청이 몰릴 때 넘치는 유휴 연결을 닫고 다시 맺으므로 같게 둠
+    MESHY_HTTP2: bool = True
+    MESHY_MAX_CONNECTIONS: int = 20
+    MESHY_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    MESHY_DOWNLOAD_MAX_CONNECTIONS: int = 10
+    MESHY_CONNECT_TIMEOUT: float = 10.0
+    MESHY_REQUEST_TIMEOUT: float = 60.0
+    MESHY_STATUS_TIMEOUT: float = 15.0
+    MESHY_DOWNLOAD_TIMEOUT: float = 120.0
+    MESHY_DOWNLOAD_CHUNK_SIZE: int = 1024 * 1024
+    MESHY_MAX_RETRIES: int = 3
+    MESHY_RETRY_BACKOFF: float = 0.5
+    MESHY_RETRY_BACKOFF_MAX: float = 8.0
+
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
     MAIL_FROM: EmailStr
@@ -27,6 +82,59 @@ class Settings(BaseSettings):
     
     # Anthropic API for Blender MCP
     ANTHROPIC_API_KEY: str = ""
+    ANTHROPIC_MODEL: str = "claude-3-5-sonnet-20241022"
+    ANTHROPIC_TIMEOUT: float = 30.0
+    ANTHROPIC_MAX_RETRIES: int = 2
+    ANTHROPIC_MAX_CONCURRENCY: int = 8
+    ANTHROPIC_STREAMING: bool = True
+
+    # 로컬 의도 파서 (신뢰도가 임계값 이상인 편집 요청은 LLM 호출 없이 바로 실행)
+    INTENT_PARSER_ENABLED: bool = True
+    INTENT_PARSER_THRESHOLD: float = 0.85
+
+    # 채팅 편집 명령 캐시 (정규화한 메시지 -> LLM이 생성한 명령, 유사도 임계값은 글자 3-gram Jaccard)
+    EDIT_CACHE_ENABLED: bool = True
+    EDIT_CACHE_TTL: int = 7 * 24 * 60 * 60
+    EDIT_CACHE_MAX_ENTRIES: int = 10000
+    EDIT_CACHE_SIMILARITY_ENABLED: bool = True
+    EDIT_CACHE_SIMILARITY_THRESHOLD: float = 0.85
+
+    # 작업별 편집 대화 (최근 K턴만 LLM에 전송, 토큰 예산은 시스템 프롬프트 포함 추정치)
+    CONVERSATION_MAX_TURNS: int = 6
+    CONVERSATION_TOKEN_BUDGET: int = 4000
+    CONVERSATION_TTL: int = 7 * 24 * 60 * 60
+
+    # 변환/재질 값만 바꾸는 편집은 Blender 없이 GLB JSON 청크를 직접 수정
+    GLB_FAST_PATH_ENABLED: bool = True
+
+    # 전송용 GLB 최적화 변형({이름}.opt.glb, gltfpack이 설치되어 있을 때만 생성)
+    # 메쉬 양자화 + meshopt 압축, 텍스처는 ktx2 / webp로 변환 (빈 문자열이면 텍스처 유지)
+    GLB_OPTIMIZE_ENABLED: bool = True
+    GLTFPACK_PATH: str = "gltfpack"
+    GLB_OPTIMIZE_TEXTURES: str = "ktx2"
+    GLB_OPTIMIZE_TIMEOUT: float = 120.0
+    GLB_OPTIMIZE_CONCURRENCY: int = 2
+    # LOD 체인 (gltfpack 단순화, 원본 대비 삼각형 비율 / 원본이 0단계)
+    GLB_LOD_ENABLED: bool = True
+    GLB_LOD_RATIOS: List[float] = [0.25, 0.05]
+
+    # Blender 워커 풀 (BLENDER_EXECUTABLE이 비어 있으면 직접 실행한 Blender 하나(BLENDER_HOST:BLENDER_PORT)에 연결)
+    BLENDER_EXECUTABLE: str = ""
+    BLENDER_HOST: str = "localhost"
+    BLENDER_PORT: int = 9876
+    BLENDER_POOL_MIN: int = 1
+    BLENDER_POOL_MAX: int = 4
+    BLENDER_STARTUP_TIMEOUT: float = 60.0
+    BLENDER_SESSION_IDLE_TIMEOUT: float = 600.0
+    BLENDER_COMMAND_TIMEOUT: float = 30.0
+    # 워커가 공유하는 씬 스냅샷(.blend) 캐시 (비어 있으면 임시 디렉터리, 예산 초과 시 LRU 삭제)
+    BLENDER_SNAPSHOT_DIR: str = ""
+    BLENDER_SNAPSHOT_BUDGET_MB: int = 2048
+    # 미리보기 편집(preview) 후 내보내기 지연 시간 (초, 그 안에 이어진 편집은 내보내기 한 번으로 합침)
+    BLENDER_EXPORT_DEBOUNCE: float = 2.0
+    # subdivide 안전장치 (예상 삼각형 수가 예산을 넘으면 레벨을 낮춤, 내보내기 전까지는 뷰포트 레벨로 유지)
+    BLENDER_SUBDIVIDE_TRIANGLE_BUDGET: int = 500000
+    BLENDER_SUBDIVIDE_VIEWPORT_LEVELS: int = 0
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,61 @@
+"""
+Upload Size Limit
+업로드 경로의 요청 본문 크기를 받는 도중에 제한하는 ASGI 미들웨어
+Starlette는 엔드포인트가 실행되기 전에 multipart 본문을 모두 받아 임시 파일에 저장하므로,
+엔드포인트에서 검사하면 이미 큰 본문을 다 받은 뒤가 됨
+- Content-Length가 제한을 넘으면 본문을 읽지 않고 바로 413 응답
+- Content-Length가 없거나(chunked) 실제 본문이 더 길면 받은 바이트를 세다가 제한을 넘는 순간 413
+"""
+from typing import Optional
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+# 경로 -> 본문 크기 제한 설정 이름
+UPLOAD_LIMITS = {
+    "/api/generate": "MAX_UPLOAD_SIZE",
+    "/api/generate/batch": "MAX_BATCH_UPLOAD_SIZE",
+}
+
+# 파일 외의 multipart 경계 / 파트 헤더 여유분
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def body_limit(scope: Scope) -> Optional[int]:
+    """요청의 본문 크기 제한 (업로드 경로가 아니면 None)"""
+    if scope["type"] != "http" or scope["method"] != "POST":
+        return None
+    setting = UPLOAD_LIMITS.get(scope["path"])
+    return getattr(settings, setting) + MULTIPART_OVERHEAD if setting else None
+
+
+class UploadSizeLimitMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limit = body_limit(scope)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"요청 크기는 {(limit - MULTIPART_OVERHEAD) // (1024 * 1024)}MB를 넘을 수 없습니다."
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # 본문 파싱 중에 발생한 HTTPException은 FastAPI가 그대로 다시 던져 413 응답이 됨
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,10 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.endpoints import generation, blender_edit
+from app.core.upload_limit import UploadSizeLimitMiddleware
+from app.services.blender_pool import blender_pool
+from app.services.meshy_client import meshy_client
+from app.services.status_broker import status_broker
 import os
 
-app = FastAPI(title="AI 3D Model Generator with Blender Integration")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 작업 상태 스트리밍용 pub/sub 연결은 프로세스당 하나
+    await status_broker.start()
+    await blender_pool.start()
+    # Meshy 호출은 워커가 하지만, API 프로세스에서 쓰더라도 풀을 lifespan이 관리하도록 함께 열고 닫음
+    await meshy_client.start()
+    yield
+    await meshy_client.close()
+    await blender_pool.stop()
+    await status_broker.stop()
+
+
+app = FastAPI(title="AI 3D Model Generator with Blender Integration", lifespan=lifespan)
 
 # CORS 설정 추가
 app.add_middleware(
@@ -15,6 +34,9 @@ app.add_middleware(
     allow_headers=["*"],  # 모든 헤더 허용
 )
 
+# 업로드 본문 크기는 받는 도중에 제한 (엔드포인트에 도달하기 전에 본문 전체가 임시 파일에 저장되므로)
+app.add_middleware(UploadSizeLimitMiddleware)
+
 app.include_router(generation.router, prefix="/api", tags=["AI Model"])
 app.include_router(blender_edit.router, prefix="/api", tags=["Blender Edit"])
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Literal
+from typing import List, Literal, Optional
 
 class AIOptions(BaseModel):
     enable_pbr: bool = True
@@ -8,4 +8,8 @@ class AIOptions(BaseModel):
     ai_model: Literal["latest", "meshy-5"] = "latest"
 
 class SetEmailRequest(BaseModel):
-    recipient_email: EmailStr = Field(..., description="결과를 통보받을 이메일 주소")
\ No newline at end of file
+    recipient_email: EmailStr = Field(..., description="결과를 통보받을 이메일 주소")
+
+class BatchStatusRequest(BaseModel):
+    task_ids: List[str] = Field(..., max_length=10000, description="조회할 작업 ID 목록")
+    fields: Optional[List[str]] = Field(None, description="응답에 포함할 필드 (생략하면 전체 필드)", examples=[["status", "progress"]])
@@ -1,130 +1,212 @@
-import time
 import os
 import json
-import redis
 import base64
-import requests
+import asyncio
+import mimetypes
+import anyio
+import httpx
+from typing import Optional
 from app.core.config import settings
+from . import batch_store, generation_cache, glb_optimizer, task_store
 from .email_service import send_result_email
+from .meshy_client import meshy_client
+from .poll_scheduler import MeshyPollScheduler
+from .rate_limiter import meshy_submit_bucket
 
-MESHY_API_BASE_URL = settings.MESHY_API_BASE_URL
-MESHY_API_KEY = settings.MESHY_API_KEY
 OUTPUT_DIR = settings.OUTPUT_DIR
 METADATA_DIR = settings.METADATA_DIR
 
-redis_client = redis.Redis(
-    host=settings.REDIS_HOST,
-    port=settings.REDIS_PORT,
-    db=settings.REDIS_DB,
-    decode_responses=True
-)
-
-
-def _update_status(task_id, status_data):
-    redis_client.set(task_id, json.dumps(status_data))
-
-
 def _save_meta(task_id, meta_data):
     meta_path = os.path.join(METADATA_DIR, f"{task_id}.json")
     with open(meta_path, "w") as f:
         json.dump(meta_data, f, indent=4)
 
 
-def run_ai_pipeline(task_id: str, image_path: str, original_filename: str, options: dict):
+def load_meta(task_id) -> dict:
+    meta_path = os.path.join(METADATA_DIR, f"{task_id}.json")
+    if not os.path.exists(meta_path):
+        return {}
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _image_payload_stream(image_path: str, options: dict):
+    """
+    {"image_url": "data:...;base64,<이미지>", **options} JSON 본문을 스트리밍으로 생성
+    원본 이미지를 3바이트 배수 청크로 읽어 base64 인코딩하므로 이미지 전체나 인코딩 사본을 메모리에 두지 않음
+    """
+    mime_type = mimetypes.guess_type(image_path)[0] or "image/png"
+    prefix = f'{{"image_url": "data:{mime_type};base64,'.encode("utf-8")
+    option_fields = json.dumps(options)[1:-1]
+    suffix = (f'", {option_fields}}}' if option_fields else '"}').encode("utf-8")
+
+    image_size = os.path.getsize(image_path)
+    content_length = len(prefix) + 4 * ((image_size + 2) // 3) + len(suffix)
+    chunk_size = max(3, settings.UPLOAD_CHUNK_SIZE - settings.UPLOAD_CHUNK_SIZE % 3)
+
+    async def body():
+        yield prefix
+        async with await anyio.open_file(image_path, "rb") as f:
+            while chunk := await f.read(chunk_size):
+                yield base64.b64encode(chunk)
+        yield suffix
+
+    return body, content_length
+
+
+# 워커 프로세스당 동시에 진행하는 작업 생성 요청 수 (대용량 업로드가 커넥션을 독점하지 않도록)
+_submit_slots: Optional[asyncio.Semaphore] = None
+
+
+async def _create_meshy_task(image_path: str, options: dict) -> str:
+    global _submit_slots
+    if _submit_slots is None:
+        _submit_slots = asyncio.Semaphore(settings.MESHY_SUBMIT_CONCURRENCY)
+
+    body_factory, content_length = _image_payload_stream(image_path, options)
+    async with _submit_slots:
+        await meshy_submit_bucket.acquire()
+        return await meshy_client.create_image_to_3d(body_factory, content_length)
+
+
+# 모든 작업이 공유하는 상태 폴링 스케줄러 (작업마다 스레드를 점유하지 않음)
+poll_scheduler = MeshyPollScheduler(fetch_status=meshy_client.get_image_to_3d)
+
+
+async def complete_task(task_id: str, output_filename: str, cached: bool = False):
+    """
+    작업을 processing -> completed로 원자적으로 전이하고, 이메일이 설정되어 있으면 결과 메일 발송
+    cached: 새로 생성하지 않고 캐시나 동일 요청의 결과를 재사용했는지
+    """
+    viewer_url = f"http://127.0.0.1:3000/result/{task_id}"
+    current_data = task_store.transition(
+        task_id, "processing",
+        status="completed",
+        progress=100,
+        detail="3D 모델 생성 완료",
+        viewer_url=viewer_url,
+        model_url=f"/static/models/{output_filename}",
+        cached=cached,
+    )
+    if current_data is None:
+        print(f"[{task_id}] 처리 중 상태가 아니어서 완료 처리를 건너뜀")
+        return
+    if current_data.get("batch_id"):
+        batch_store.record_result(current_data["batch_id"], "completed")
+
+    recipient_email = current_data.get('recipient_email')
+    if recipient_email:
+        email_sent, email_detail = await send_result_email(recipient_email, viewer_url)
+
+        task_store.update(task_id, email_status={
+            "sent": email_sent,
+            "recipient": recipient_email,
+            "detail": email_detail
+        })
+
+
+def fail_task(task_id: str, error: str):
+    """작업을 실패 처리하고, 배치에 속한 작업이면 배치 실패 수 증가"""
+    current_data = task_store.fail(task_id, error)
+    if current_data and current_data.get("batch_id"):
+        batch_store.record_result(current_data["batch_id"], "failed")
+
+
+async def _resolve_cache_waiters(cache_key: str, task_id: str, error_detail: Optional[str]):
+    """같은 이미지 + 옵션으로 대기 중이던 작업들에 이 작업의 결과를 전달"""
+    output_path = os.path.join(OUTPUT_DIR, f"{task_id}.glb")
+    for waiter_id in generation_cache.release(cache_key):
+        if error_detail:
+            fail_task(waiter_id, error_detail)
+            continue
+
+        try:
+            generation_cache.link_model(output_path, os.path.join(OUTPUT_DIR, f"{waiter_id}.glb"))
+            await complete_task(waiter_id, f"{waiter_id}.glb", cached=True)
+            glb_optimizer.schedule(os.path.join(OUTPUT_DIR, f"{waiter_id}.glb"))
+            print(f"[{waiter_id}] 동일 요청({task_id})의 결과로 완료 처리")
+        except Exception as e:
+            fail_task(waiter_id, str(e))
+
+
+async def run_ai_pipeline(task_id: str, image_path: Optional[str], original_filename: Optional[str], options: dict,
+                          cache_key: Optional[str] = None):
     print(f"[{task_id}] AI 파이프라인 시작. 옵션: {options}")
 
-    headers = {"Authorization": f"Bearer {MESHY_API_KEY}"}
-
+    error_detail = None
+    interrupted = False
     try:
-        _update_status(task_id, {"status": "processing", "progress": 10, "detail": "이미지 인코딩 및 AI 서버 요청 중..."})
-        with open(image_path, "rb") as f:
-            image_bytes = f.read()
-        img_b64 = base64.b64encode(image_bytes).decode("utf-8")
-        image_data_url = f"data:image/png;base64,{img_b64}"
-
-        payload = {"image_url": image_data_url, **options}
-        response = requests.post(f"{MESHY_API_BASE_URL}/image-to-3d", headers=headers, json=payload, timeout=60)
-        response.raise_for_status()
-
-        external_task_id = response.json().get("result")
-        if not external_task_id:
-            raise RuntimeError("외부 API에서 task_id를 받지 못했습니다.")
-
-        _save_meta(task_id,
-                   {"original_filename": original_filename, "options": options, "external_task_id": external_task_id})
-        print(f"[{task_id}] 외부 AI 작업 생성 성공. 외부 Task ID: {external_task_id}")
-
-        while True:
-            status_response = requests.get(f"{MESHY_API_BASE_URL}/image-to-3d/{external_task_id}", headers=headers)
-            status_response.raise_for_status()
-            data = status_response.json()
-
-            external_status = data.get("status")
+        # 재전달된 작업이 이미 외부 작업을 만들었다면 다시 제출하지 않고 이어서 폴링
+        external_task_id = load_meta(task_id).get("external_task_id")
+        if external_task_id:
+            print(f"[{task_id}] 기록된 외부 작업 재개. 외부 Task ID: {external_task_id}")
+        else:
+            task_store.update(task_id, status="processing", progress=10, detail="이미지 인코딩 및 AI 서버 요청 중...")
+            external_task_id = await _create_meshy_task(image_path, options)
+
+            _save_meta(task_id,
+                       {"original_filename": original_filename, "options": options,
+                        "external_task_id": external_task_id, "cache_key": cache_key})
+            print(f"[{task_id}] 외부 AI 작업 생성 성공. 외부 Task ID: {external_task_id}")
+
+        def _on_progress(data):
             real_progress = data.get("progress", 0)
 
-            current_data = json.loads(redis_client.get(task_id) or '{}')
-
-            current_data['status'] = 'processing'
-            current_data['progress'] = real_progress
-            current_data['detail'] = f"3D 모델 생성 중... ({real_progress}%)"
-
-            _update_status(task_id, current_data)
-            print(f"[{task_id}] 외부 작업 상태: {external_status}, 진행률: {real_progress}%")
-
-            if external_status == "SUCCEEDED":
-                model_data = data.get("model_urls", {})
-                glb_url = model_data.get("glb")
-
-                if not glb_url:
-                    raise RuntimeError("완료되었으나 모델 URL을 찾을 수 없습니다.")
+            task_store.update(task_id, status="processing", progress=real_progress,
+                              detail=f"3D 모델 생성 중... ({real_progress}%)")
 
-                model_response = requests.get(glb_url)
-                model_response.raise_for_status()
+        data = await poll_scheduler.wait_for_completion(task_id, external_task_id, on_progress=_on_progress)
 
-                output_filename = f"{task_id}.glb"
-                output_path = os.path.join(OUTPUT_DIR, output_filename)
-                with open(output_path, "wb") as f:
-                    f.write(model_response.content)
+        if data.get("status") != "SUCCEEDED":
+            error_message = (data.get("error") or {}).get("message", "알 수 없는 외부 API 에러")
+            raise RuntimeError(error_message)
 
-                print(f"[{task_id}] 최종 모델 파일 다운로드 및 저장 완료.")
+        model_data = data.get("model_urls", {})
+        glb_url = model_data.get("glb")
 
-                current_data = json.loads(redis_client.get(task_id) or '{}')
+        if not glb_url:
+            raise RuntimeError("완료되었으나 모델 URL을 찾을 수 없습니다.")
 
-                viewer_url = f"http://127.0.0.1:3000/result/{task_id}"
-                completion_data = {
-                    "status": "completed",
-                    "progress": 100,
-                    "viewer_url": viewer_url,
-                    "model_url": f"/static/models/{output_filename}"
-                }
+        output_filename = f"{task_id}.glb"
+        output_path = os.path.join(OUTPUT_DIR, output_filename)
+        last_reported = [-1]
 
-                current_data.update(completion_data)
-                recipient_email = current_data.get('recipient_email')
-                if recipient_email:
-                    import asyncio
-                    email_sent, email_detail = asyncio.run(send_result_email(recipient_email, viewer_url))
+        def _on_download_progress(received, total):
+            if not total:
+                return
+            percent = received * 100 // total
+            if percent < 100 and percent - last_reported[0] < 10:
+                return
+            last_reported[0] = percent
 
-                    current_data["email_status"] = {
-                        "sent": email_sent,
-                        "recipient": recipient_email,
-                        "detail": email_detail
-                    }
+            task_store.update(task_id, detail=f"모델 파일 다운로드 중... ({percent}%, {received // 1024} / {total // 1024} KB)")
 
-                _update_status(task_id, current_data)
+        await meshy_client.download(glb_url, output_path, on_progress=_on_download_progress)
 
-                break
+        print(f"[{task_id}] 최종 모델 파일 다운로드 및 저장 완료.")
 
-            elif external_status == "FAILED":
-                error_message = data.get("error", {}).get("message", "알 수 없는 외부 API 에러")
-                raise RuntimeError(error_message)
+        await complete_task(task_id, output_filename)
+        # 전송용 최적화 변형은 완료 알림을 늦추지 않도록 백그라운드에서 생성
+        glb_optimizer.schedule(output_path)
 
-            time.sleep(10)
+        if cache_key:
+            generation_cache.store(cache_key, output_path)
 
-    except requests.exceptions.RequestException as e:
-        error_detail = f"외부 API 호출 실패: {e.response.text if e.response else str(e)}"
-        _update_status(task_id, {"status": "failed", "error": error_detail})
+    except asyncio.CancelledError:
+        # 워커 종료로 중단된 작업은 큐에서 재전달되므로 업로드 파일과 대기자를 그대로 둠
+        interrupted = True
+        raise
+    except httpx.HTTPStatusError as e:
+        error_detail = f"외부 API 호출 실패: {e.response.text}"
+    except httpx.HTTPError as e:
+        error_detail = f"외부 API 호출 실패: {str(e)}"
     except Exception as e:
-        _update_status(task_id, {"status": "failed", "error": str(e)})
+        error_detail = str(e)
     finally:
-        if os.path.exists(image_path):
-            os.remove(image_path)
\ No newline at end of file
+        if not interrupted:
+            if error_detail:
+                fail_task(task_id, error_detail)
+            if cache_key:
+                await _resolve_cache_waiters(cache_key, task_id, error_detail)
+            if image_path and os.path.exists(image_path):
+                os.remove(image_path)
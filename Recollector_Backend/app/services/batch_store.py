@@ -0,0 +1,86 @@
+"""
+Batch Store
+일괄 제출된 작업 묶음(batch)의 작업 목록과 완료/실패 카운터를 Redis에 저장
+"""
+import time
+import redis
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from . import task_store
+
+BATCH_KEY = "batch:{}"
+BATCH_TASKS_KEY = "batch:{}:tasks"
+
+redis_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    decode_responses=True
+)
+
+
+def create(batch_id: str, options: dict):
+    """빈 배치 생성 (작업은 add_task로 하나씩 추가)"""
+    redis_client.hset(BATCH_KEY.format(batch_id), mapping={
+        "total": 0,
+        "completed": 0,
+        "failed": 0,
+        "created_at": time.time(),
+        "ai_model": options.get("ai_model", ""),
+    })
+
+
+def add_task(batch_id: str, task_id: str):
+    pipe = redis_client.pipeline()
+    pipe.rpush(BATCH_TASKS_KEY.format(batch_id), task_id)
+    pipe.hincrby(BATCH_KEY.format(batch_id), "total", 1)
+    pipe.execute()
+
+
+def record_result(batch_id: str, status: str):
+    """배치에 속한 작업 하나가 completed / failed로 끝났을 때 카운터 증가"""
+    redis_client.hincrby(BATCH_KEY.format(batch_id), status, 1)
+
+
+def task_ids(batch_id: str) -> List[str]:
+    return redis_client.lrange(BATCH_TASKS_KEY.format(batch_id), 0, -1)
+
+
+def get(batch_id: str) -> Optional[Dict[str, Any]]:
+    """배치 진행 상황 조회 (완료/실패 수와 전체 평균 진행률)"""
+    pipe = redis_client.pipeline()
+    pipe.hgetall(BATCH_KEY.format(batch_id))
+    pipe.lrange(BATCH_TASKS_KEY.format(batch_id), 0, -1)
+    batch, ids = pipe.execute()
+    if not batch:
+        return None
+
+    total = int(batch.get("total", 0))
+    completed = int(batch.get("completed", 0))
+    failed = int(batch.get("failed", 0))
+
+    # 진행 중인 작업의 진행률은 작업 상태에서 한 번의 파이프라인으로 모음
+    progress_sum = 0
+    for status_data in task_store.get_many(ids, ["status", "progress"]):
+        if status_data and status_data.get("status") == "completed":
+            progress_sum += 100
+        elif status_data and status_data.get("status") == "processing":
+            progress_sum += status_data.get("progress", 0)
+
+    finished = completed + failed
+    if total and finished >= total:
+        status = "completed" if failed == 0 else "partially_failed" if completed else "failed"
+    else:
+        status = "processing"
+
+    return {
+        "batch_id": batch_id,
+        "status": status,
+        "total": total,
+        "completed": completed,
+        "failed": failed,
+        "processing": max(total - finished, 0),
+        "progress": round(progress_sum / total) if total else 0,
+        "created_at": float(batch.get("created_at", 0)),
+        "task_ids": ids,
+    }
@@ -2,116 +2,329 @@
 Blender MCP Service
 채팅 기반으로 Blender를 제어하여 3D 모델을 편집하는 서비스
 """
+import os
 import json
+import time
 import asyncio
-import socket
-from typing import Optional, Dict, Any
-from anthropic import Anthropic
+from typing import Callable, Optional, Dict, Any, List
+import httpx
+import redis
+import anyio.to_thread
+from anthropic import AsyncAnthropic
 from app.core.config import settings
+from app.services import conversation_store, edit_cache, glb_editor, glb_optimizer, intent_parser
 
-# Blender 소켓 서버 정보
-BLENDER_HOST = 'localhost'
-BLENDER_PORT = 9876
+# Blender 소켓 서버 정보 (기본값, 워커 풀은 워커마다 다른 포트를 사용)
+BLENDER_HOST = settings.BLENDER_HOST
+BLENDER_PORT = settings.BLENDER_PORT
+
+# 메시지 한 줄의 최대 크기 (씬 정보 등 큰 응답도 잘리지 않도록)
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+# 모든 Blender 워커가 공유하는 비동기 Anthropic 클라이언트 (이벤트 루프를 막지 않음)
+anthropic_client = AsyncAnthropic(
+    api_key=settings.ANTHROPIC_API_KEY,
+    timeout=httpx.Timeout(settings.ANTHROPIC_TIMEOUT, connect=10.0),
+    max_retries=settings.ANTHROPIC_MAX_RETRIES,
+)
+
+# 동시에 진행하는 LLM 요청 수 제한
+_llm_slots = asyncio.Semaphore(settings.ANTHROPIC_MAX_CONCURRENCY)
+
+# 편집 결과 내보내기 통계 (내보낸 횟수/시간, 바뀐 것이 없어 건너뛴 횟수 등)
+EXPORT_STATS_KEY = "blender:export:stats"
+
+redis_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    decode_responses=True
+)
+
+
+def edited_model_path(task_id: str) -> str:
+    """작업의 편집 결과 파일 경로 (편집이 이어지는 동안 항상 최신 상태)"""
+    return os.path.join(settings.OUTPUT_DIR, f"{task_id}_edited.glb")
+
+
+def _file_version(path: str) -> Optional[tuple]:
+    """파일이 바뀌었는지 비교하기 위한 (mtime_ns, size), 파일이 없으면 None"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def current_model_path(task_id: str, original_path: str) -> str:
+    """이어서 편집할 모델 (이전 편집 결과가 있으면 편집 결과, 없거나 초기화되었으면 원본)"""
+    edited_path = edited_model_path(task_id)
+    if os.path.exists(edited_path) and conversation_store.scene_state(task_id).get("edits"):
+        return edited_path
+    return original_path
+
+
+def record_export(field: str, export_ms: float = None):
+    """
+    내보내기 통계 기록
+    - exports: Blender에서 실제로 내보낸 횟수 (export_ms 누적)
+    - skipped: 씬이 바뀌지 않아 건너뛴 횟수
+    - coalesced: 미리보기 편집이 이어져 지연 내보내기 한 번으로 합쳐진 횟수
+    - fast_path: GLB 직접 편집으로 이미 저장되어 내보낼 필요가 없었던 횟수
+    """
+    try:
+        pipe = redis_client.pipeline()
+        pipe.hincrby(EXPORT_STATS_KEY, field, 1)
+        if export_ms is not None:
+            pipe.hincrbyfloat(EXPORT_STATS_KEY, "export_ms", export_ms)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"[BlenderMCP] 내보내기 통계 기록 실패: {e}")
+
+
+def export_stats() -> dict:
+    counters = redis_client.hgetall(EXPORT_STATS_KEY)
+    exports = int(counters.get("exports", 0))
+    export_ms = float(counters.get("export_ms", 0))
+    avoided = sum(int(counters.get(field, 0)) for field in ("skipped", "coalesced", "fast_path"))
+    return {
+        "exports": exports,
+        "export_ms": round(export_ms, 1),
+        "avg_export_ms": round(export_ms / exports, 1) if exports else 0.0,
+        "skipped": int(counters.get("skipped", 0)),
+        "coalesced": int(counters.get("coalesced", 0)),
+        "fast_path": int(counters.get("fast_path", 0)),
+        "avoided": avoided,
+        # 내보내기 한 번 평균 시간으로 추정한 절약 시간
+        "estimated_saved_ms": round(avoided * export_ms / exports, 1) if exports else 0.0,
+    }
+
+
+# 편집 명령 생성용 시스템 프롬프트
+EDIT_SYSTEM_PROMPT = """당신은 Blender 3D 모델 편집 전문가입니다.
+사용자의 요청을 분석하여 Blender 편집 명령과 파라미터를 JSON 형식으로 생성하세요.
+
+사용 가능한 명령:
+1. change_color - 색상 변경
+   예: {"command": "change_color", "params": {"r": 1.0, "g": 0.0, "b": 0.0}}
+
+2. scale_model - 크기 변경
+   예: {"command": "scale_model", "params": {"factor": 2.0}}
+
+3. rotate_model - 회전
+   예: {"command": "rotate_model", "params": {"axis": "Z", "angle": 45}}
+
+4. apply_smooth - 스무딩 적용
+   예: {"command": "apply_smooth", "params": {}}
+
+5. add_object - 객체 추가 (Cube, Sphere, Cylinder, Cone 등)
+   예: {"command": "add_object", "params": {"type": "CUBE", "position": [0, 0, -1], "scale": 1.0}}
+
+6. change_material - 재질 변경
+   예: {"command": "change_material", "params": {"metallic": 0.9, "roughness": 0.1}}
+
+7. subdivide - 세분화 (더 부드럽게)
+   예: {"command": "subdivide", "params": {"levels": 2}}
+
+8. mirror - 미러 복제
+   예: {"command": "mirror", "params": {"axis": "X"}}
+
+9. array - 배열 복제
+   예: {"command": "array", "params": {"count": 3, "offset": [2, 0, 0]}}
+
+응답 형식:
+{"command": "명령어", "params": {파라미터들}, "description": "무엇을 했는지 한글 설명"}
+
+요청에 여러 작업이 들어 있으면 (예: "빨갛고 금속 느낌으로, 두 배 크게") 순서대로 나열:
+{"commands": [{"command": "명령어", "params": {파라미터들}}, ...], "description": "무엇을 했는지 한글 설명"}
+
+사용자의 요청을 정확히 파악하여 적절한 명령을 생성하세요."""
+
+# 편집 명령 캐시 키에 포함 (프롬프트나 모델이 바뀌면 이전 캐시를 사용하지 않음)
+EDIT_PROMPT_DIGEST = edit_cache.prompt_digest(EDIT_SYSTEM_PROMPT, settings.ANTHROPIC_MODEL)
+
+
+class _JsonObjectScanner:
+    """스트리밍 텍스트에서 최상위 JSON 객체가 닫히는 순간을 찾아 해당 문자열을 반환"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.start = -1
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> List[str]:
+        completed = []
+        for char in text:
+            self.buffer += char
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"' and self.depth > 0:
+                self.in_string = True
+            elif char == "{":
+                if self.depth == 0:
+                    self.start = len(self.buffer) - 1
+                self.depth += 1
+            elif char == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    completed.append(self.buffer[self.start:])
+        return completed
 
 
 class BlenderMCPService:
-    """Blender 소켓 서버와 통신하여 3D 모델을 편집하는 서비스"""
+    """
+    Blender 소켓 서버 하나와 통신하여 3D 모델을 편집하는 서비스
+    Blender 프로세스(씬) 하나당 인스턴스 하나이며, 워커 풀(blender_pool)이 작업별로 배정함
+    """
     
-    def __init__(self):
-        self.socket: Optional[socket.socket] = None
-        self.anthropic_client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-        self.conversation_history = []
+    def __init__(self, host: str = BLENDER_HOST, port: int = BLENDER_PORT):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
         self.request_id = 0
-        self.loaded_models = {}  # task_id -> model_path 매핑
+        self.loaded_models = {}  # task_id -> model_path 매핑 (씬에는 항상 모델 하나만 로드됨)
+        self._synced_version: Optional[tuple] = None  # 씬과 내용이 같은 편집 결과 파일의 버전
+        self._scene_dirty = False  # 씬에 아직 내보내지 않은 편집이 있는지 (애드온이 응답에 알려줌)
+        self._pending: Dict[int, asyncio.Future] = {}  # 요청 id -> 응답 대기 Future
+        self._receiver: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        self._connect_lock = asyncio.Lock()
         
     async def connect(self):
-        """Blender 소켓 서버에 연결"""
-        if self.socket:
-            print(f"[BlenderMCP] 이미 연결되어 있음")
-            return
-            
+        """Blender 소켓 서버에 연결 (동시에 여러 명령이 연결을 시도해도 연결은 하나만 생성)"""
+        async with self._connect_lock:
+            if self.writer:
+                return
+            await self._open_connection()
+
+    async def _open_connection(self):
         try:
-            print(f"[BlenderMCP] Blender 소켓 서버 연결 시작... ({BLENDER_HOST}:{BLENDER_PORT})")
-            loop = asyncio.get_event_loop()
-            
-            # 소켓 생성 및 연결 (블로킹 작업을 executor에서 실행)
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(10)  # 10초 타임아웃
-            
-            await loop.run_in_executor(None, self.socket.connect, (BLENDER_HOST, BLENDER_PORT))
+            print(f"[BlenderMCP] Blender 소켓 서버 연결 시작... ({self.host}:{self.port})")
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, limit=MAX_MESSAGE_SIZE),
+                timeout=10  # 10초 타임아웃
+            )
+            self._receiver = asyncio.create_task(self._receive_loop(self.reader))
             print(f"[BlenderMCP] Blender 연결 완료!")
             
         except Exception as e:
             print(f"[BlenderMCP] 연결 실패: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            if self.socket:
-                self.socket.close()
-            self.socket = None
-            raise Exception(f"Blender 소켓 서버에 연결할 수 없습니다. Blender가 실행 중이고 MCP 서버가 포트 {BLENDER_PORT}에서 대기 중인지 확인하세요.")
+            await self.disconnect()
+            raise Exception(f"Blender 소켓 서버에 연결할 수 없습니다. Blender가 실행 중이고 MCP 서버가 포트 {self.port}에서 대기 중인지 확인하세요.")
         
     async def disconnect(self):
         """Blender 소켓 서버 연결 해제"""
-        if self.socket:
+        if self._receiver:
+            self._receiver.cancel()
+            self._receiver = None
+        if self.writer:
             try:
-                self.socket.close()
+                self.writer.close()
             except Exception:
                 pass
             finally:
-                self.socket = None
+                self.writer = None
+                self.reader = None
+        self._fail_pending(ConnectionError("Blender 연결이 종료되었습니다"))
+
+    async def _receive_loop(self, reader: asyncio.StreamReader):
+        """줄 단위(JSON 한 줄 = 메시지 하나)로 응답을 읽어 같은 id의 요청에 전달"""
+        error: Exception = ConnectionError("Blender 서버가 연결을 닫았습니다")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"[BlenderMCP] 잘못된 응답 무시: {line[:200]!r}")
+                    continue
+
+                print(f"[BlenderMCP] 수신: {line[:200].decode('utf-8', 'replace').strip()}")
+                future = self._pending.pop(response.get("id"), None)
+                if future and not future.done():
+                    future.set_result(response)
+                elif response.get("id") is None and "error" in response:
+                    print(f"[BlenderMCP] id 없는 오류 응답: {response['error']}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+        # 응답을 더 받을 수 없으므로 대기 중인 요청을 모두 실패 처리하고 다음 요청 때 재연결
+        if self.reader is reader:
+            self.reader = None
+            self.writer = None
+            self._receiver = None
+        self._fail_pending(error)
+
+    def _fail_pending(self, error: Exception):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
     
     async def send_command(self, method: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Blender에 JSON-RPC 명령 전송"""
-        if not self.socket:
+        """
+        Blender에 JSON-RPC 명령 전송
+        응답은 id로 매칭되므로 한 연결에서 여러 명령을 동시에(파이프라인으로) 보낼 수 있음
+        """
+        if not self.writer:
             await self.connect()
         
         self.request_id += 1
+        request_id = self.request_id
         request = {
             "jsonrpc": "2.0",
-            "id": self.request_id,
+            "id": request_id,
             "method": method,
             "params": params or {}
         }
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
         
         try:
             # 명령 전송
             message = json.dumps(request) + "\n"
             print(f"[BlenderMCP] 전송: {message[:200]}")
-            await asyncio.get_event_loop().run_in_executor(
-                None, self.socket.sendall, message.encode('utf-8')
-            )
+            async with self._write_lock:
+                self.writer.write(message.encode('utf-8'))
+                await self.writer.drain()
             
-            # 응답 수신 (타임아웃 증가)
-            self.socket.settimeout(30)  # 30초 타임아웃
-            response_data = await asyncio.get_event_loop().run_in_executor(
-                None, self.socket.recv, 8192
-            )
-            
-            if not response_data:
-                raise Exception("Blender 서버로부터 응답이 없습니다")
+            # 응답 수신
+            return await asyncio.wait_for(future, timeout=settings.BLENDER_COMMAND_TIMEOUT)
             
-            response_str = response_data.decode('utf-8').strip()
-            print(f"[BlenderMCP] 수신: {response_str[:200]}")
-            response = json.loads(response_str)
-            return response
-            
-        except socket.timeout:
+        except asyncio.TimeoutError:
             print(f"[BlenderMCP] 타임아웃: Blender가 응답하지 않습니다")
             raise Exception("Blender 응답 타임아웃")
         except Exception as e:
             print(f"[BlenderMCP] 명령 전송/수신 오류: {str(e)}")
             raise e
+        finally:
+            self._pending.pop(request_id, None)
             
     def is_model_loaded(self, task_id: str) -> bool:
         """모델이 이미 로드되었는지 확인"""
         return task_id in self.loaded_models
     
-    async def load_model(self, model_path: str, task_id: str = None) -> Dict[str, Any]:
-        """GLB 모델을 Blender에 로드"""
+    def has_unsaved_edits(self, task_id: str) -> bool:
+        """이 작업의 씬에 편집 결과 파일로 내보내지 않은 편집이 있는지 여부"""
+        return task_id in self.loaded_models and self._scene_dirty
+
+    async def load_model(self, model_path: str, task_id: str = None, fresh: bool = True) -> Dict[str, Any]:
+        """GLB 모델을 Blender에 로드 (fresh면 원본 모델이므로 누적된 장면 상태도 초기화)"""
         print(f"[BlenderMCP] load_model 시작: {model_path}")
         
         try:
-            if not self.socket:
+            if not self.writer:
                 print(f"[BlenderMCP] 소켓이 없음, 연결 시도 중...")
                 await self.connect()
                 print(f"[BlenderMCP] 연결 완료")
@@ -123,9 +336,21 @@ class BlenderMCPService:
             if "error" in response:
                 return {"success": False, "error": response["error"].get("message", "Unknown error")}
             
-            # 로드 성공 시 기록
+            load_info = response.get("result") or {}
+            if load_info.get("status") == "error":
+                return {"success": False, "error": load_info.get("message", "Unknown error")}
+            print(f"[BlenderMCP] 모델 로드 방식: {load_info.get('source', 'import')} "
+                  f"({(load_info.get('timing') or {}).get('exec_ms')}ms)")
+
+            # 로드 성공 시 기록 (load_model은 씬을 비우므로 이전 작업의 모델은 더 이상 로드되어 있지 않음)
+            self.loaded_models = {}
+            self._scene_dirty = False
             if task_id:
                 self.loaded_models[task_id] = model_path
+                self._synced_version = _file_version(edited_model_path(task_id))
+                if fresh:
+                    # 원본 모델부터 다시 시작하므로 누적된 장면 상태도 초기화
+                    conversation_store.reset_scene(task_id)
                 print(f"[BlenderMCP] 모델 로드 기록: task_id={task_id}")
             
             return {"success": True, "message": "Model loaded successfully", "data": response.get("result")}
@@ -136,94 +361,166 @@ class BlenderMCPService:
             traceback.print_exc()
             return {"success": False, "error": str(e)}
     
-    async def chat_edit(self, user_message: str, model_path: str, task_id: str) -> Dict[str, Any]:
+    async def run_edits(self, commands: list, task_id: str, model_path: str):
         """
-        사용자의 채팅 메시지를 기반으로 모델 편집
-        Claude가 Blender 명령을 생성하고 실행
+        편집 명령을 Blender에서 실행 (여러 명령이면 한 번의 요청으로 묶어서 전송, 하나라도 실패하면 전체 롤백)
+        실제로 적용된 명령과 애드온 응답을 반환
         """
-        try:
-            print(f"[BlenderMCP] chat_edit 시작: {user_message}")
-            
-            if not self.socket:
-                await self.connect()
-            
-            # 대화 히스토리에 사용자 메시지 추가
-            self.conversation_history.append({
-                "role": "user",
-                "content": user_message
-            })
-            
-            # Claude에게 Blender 명령 생성 요청
-            system_prompt = """당신은 Blender 3D 모델 편집 전문가입니다.
-사용자의 요청을 분석하여 Blender 편집 명령과 파라미터를 JSON 형식으로 생성하세요.
-
-사용 가능한 명령:
-1. change_color - 색상 변경
-   예: {"command": "change_color", "params": {"r": 1.0, "g": 0.0, "b": 0.0}}
-
-2. scale_model - 크기 변경
-   예: {"command": "scale_model", "params": {"factor": 2.0}}
+        await self._ensure_scene(task_id, model_path)
+        if len(commands) > 1:
+            result = await self.send_command("execute_edits", {"commands": commands})
+        else:
+            result = await self.send_command("execute_edit", commands[0])
+        edit_result = result.get("result") or {}
+        self._scene_dirty = bool(edit_result.get("dirty", True))
+        return self._applied_commands(commands, edit_result), result
 
-3. rotate_model - 회전
-   예: {"command": "rotate_model", "params": {"axis": "Z", "angle": 45}}
-
-4. apply_smooth - 스무딩 적용
-   예: {"command": "apply_smooth", "params": {}}
+    def _applied_commands(self, commands: list, edit_result: dict) -> list:
+        """
+        실제로 적용된 명령 (subdivide는 삼각형 예산에 맞춰 애드온이 낮춘 레벨로 교체)
+        원래 명령은 캐시에 저장되므로 바꾸지 않고 사본을 만듦
+        """
+        results = edit_result.get("results") or [edit_result]
+        applied = []
+        for command, item in zip(commands, results):
+            stats = item.get("subdivide") if isinstance(item, dict) else None
+            if stats and stats.get("levels") != stats.get("requested_levels"):
+                command = {**command, "params": {**(command.get("params") or {}), "levels": stats["levels"]}}
+            applied.append(command)
+        return applied + commands[len(applied):]
 
-5. add_object - 객체 추가 (Cube, Sphere, Cylinder, Cone 등)
-   예: {"command": "add_object", "params": {"type": "CUBE", "position": [0, 0, -1], "scale": 1.0}}
+    async def _ensure_scene(self, task_id: str, model_path: str):
+        """Blender 씬에 이 작업의 최신 모델이 로드되어 있는지 확인하고, 아니면 (다시) 로드"""
+        if task_id in self.loaded_models and self._synced_version == _file_version(edited_model_path(task_id)):
+            return
+        # 처음 편집하거나, 세션이 다른 워커로 옮겨졌거나, GLB 직접 편집으로 파일이 바뀐 경우
+        source_path = current_model_path(task_id, model_path)
+        load_result = await self.load_model(source_path, task_id, fresh=source_path == model_path)
+        if not load_result.get("success"):
+            raise RuntimeError(f"모델 로드 실패: {load_result.get('error')}")
 
-6. change_material - 재질 변경
-   예: {"command": "change_material", "params": {"metallic": 0.9, "roughness": 0.1}}
+    async def save_model(self, output_path: str, format: str = "GLB", if_changed: bool = True) -> Dict[str, Any]:
+        """
+        편집된 모델을 파일로 저장
+        if_changed면 마지막 로드/내보내기 이후 씬과 파일이 그대로일 때 애드온이 내보내기를 건너뜀 (skipped)
+        """
+        if not self.writer:
+            return {"success": False, "error": "Not connected to Blender"}
+        
+        try:
+            print(f"[BlenderMCP] save_model 시작: {output_path}")
+            response = await self.send_command("export_model", {
+                "file_path": output_path,
+                "format": format,
+                "if_changed": if_changed
+            })
+            print(f"[BlenderMCP] save_model 응답: {response}")
+            
+            if "error" in response:
+                return {"success": False, "error": response["error"].get("message", "Unknown error")}
+            export_info = response.get("result") or {}
+            if export_info.get("status") == "error":
+                return {"success": False, "error": export_info.get("message", "Unknown error")}
 
-7. subdivide - 세분화 (더 부드럽게)
-   예: {"command": "subdivide", "params": {"levels": 2}}
+            skipped = bool(export_info.get("skipped"))
+            if skipped:
+                record_export("skipped")
+            else:
+                record_export("exports", export_info.get("export_ms", (export_info.get("timing") or {}).get("exec_ms", 0.0)))
+                glb_optimizer.schedule(output_path)
+            
+            # 씬과 편집 결과 파일이 같은 상태 (다음 편집 때 다시 로드할 필요 없음)
+            self._synced_version = _file_version(output_path)
+            self._scene_dirty = False
+            return {"success": True, "path": output_path, "skipped": skipped, "data": export_info}
+            
+        except Exception as e:
+            print(f"[BlenderMCP] save_model 오류: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
+    def reset_conversation(self, task_id: str = None):
+        """대화 히스토리 초기화 (task_id가 없으면 모델 로드 기록만 초기화)"""
+        if task_id is None:
+            self.loaded_models = {}
+            return
+        conversation_store.reset(task_id)
+        if task_id in self.loaded_models:
+            # 모델 로드 기록도 제거 (다음에 다시 원본 로드)
+            del self.loaded_models[task_id]
+            print(f"[BlenderMCP] 모델 로드 기록 제거: task_id={task_id}")
 
-8. mirror - 미러 복제
-   예: {"command": "mirror", "params": {"axis": "X"}}
 
-9. array - 배열 복제
-   예: {"command": "array", "params": {"count": 3, "offset": [2, 0, 0]}}
+class ChatEditor:
+    """
+    채팅 메시지 하나를 편집 명령으로 바꿔 실행 (로컬 파서 -> 명령 캐시 -> Claude 순)
+    GLB 직접 편집은 Blender 없이 처리하고, Blender가 필요한 편집일 때만 session.blender()로 워커를 배정받음
+    session은 작업 하나의 편집 세션 (blender_pool.EditSession)
+    """
 
-응답 형식:
-{"command": "명령어", "params": {파라미터들}, "description": "무엇을 했는지 한글 설명"}
+    def __init__(self, session):
+        self.session = session
 
-사용자의 요청을 정확히 파악하여 적절한 명령을 생성하세요."""
-            
-            # Claude API 호출
-            response = self.anthropic_client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1024,
-                system=system_prompt,
-                messages=self.conversation_history
-            )
-            
-            # Claude의 응답 추출
-            assistant_text = ""
-            for block in response.content:
-                if block.type == "text":
-                    assistant_text += block.text
-            
-            print(f"[BlenderMCP] Claude 응답: {assistant_text}")
+    async def chat_edit(self, user_message: str, model_path: str, task_id: str) -> Dict[str, Any]:
+        """
+        사용자의 채팅 메시지를 기반으로 모델 편집
+        Claude가 Blender 명령을 생성하고 실행
+        """
+        try:
+            print(f"[BlenderMCP] chat_edit 시작: {user_message}")
             
-            # Claude 응답에서 JSON 명령 추출
-            edit_params = self._extract_command_from_response(assistant_text, user_message)
+            # 명확한 요청은 로컬 파서로 바로 처리하고, 애매한 요청만 Claude에게 명령 생성 요청
+            intent = intent_parser.parse(user_message) if settings.INTENT_PARSER_ENABLED else None
+            handled_locally = intent is not None and intent.confidence >= settings.INTENT_PARSER_THRESHOLD
+            if settings.INTENT_PARSER_ENABLED:
+                try:
+                    intent_parser.record(intent, handled_locally)
+                except Exception as e:
+                    print(f"[BlenderMCP] 의도 파서 통계 기록 실패: {e}")
+
+            llm_ms = None
+            if handled_locally:
+                edit_params = intent.to_plan()
+                assistant_text = json.dumps(edit_params, ensure_ascii=False)
+                print(f"[BlenderMCP] 로컬 파서로 처리 (신뢰도 {intent.confidence}): {assistant_text}")
+                commands, result = await self._dispatch_edit(edit_params, task_id, model_path)
+            else:
+                cached_plan = edit_cache.lookup(user_message, EDIT_PROMPT_DIGEST)
+                if cached_plan:
+                    edit_params = cached_plan
+                    assistant_text = json.dumps(edit_params, ensure_ascii=False)
+                    commands, result = await self._dispatch_edit(edit_params, task_id, model_path)
+                else:
+                    edit_params, assistant_text, commands, result, llm_ms = await self._plan_with_llm(
+                        task_id, model_path, user_message
+                    )
             print(f"[BlenderMCP] 추출된 명령: {edit_params}")
-            
-            # Blender에 편집 명령 전송
-            result = await self.send_command("execute_edit", edit_params)
             print(f"[BlenderMCP] 편집 결과: {result}")
             
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": assistant_text
-            })
+            # 대화 히스토리에 완료된 턴 저장 (작업별, Redis)
+            conversation_store.append_turn(task_id, user_message, assistant_text)
+            
+            edit_result = result.get("result") or {}
+            if "error" in result or edit_result.get("status") == "error":
+                error_message = (result.get("error") or {}).get("message") or edit_result.get("message", "Unknown error")
+                return {
+                    "success": False,
+                    "error": f"Blender 편집 실패: {error_message}",
+                    "message": "편집에 실패했습니다. 다시 시도해주세요."
+                }
             
+            conversation_store.record_edits(task_id, commands)
+            if llm_ms is not None:
+                # LLM이 생성해 실행에 성공한 명령만 캐시
+                edit_cache.store(user_message, EDIT_PROMPT_DIGEST, edit_params, llm_ms)
+
             return {
                 "success": True,
                 "message": edit_params.get("description", assistant_text) or "편집이 완료되었습니다.",
-                "tools_used": [{"tool": "blender_edit", "command": edit_params.get("command"), "params": edit_params.get("params")}],
-                "conversation_id": task_id
+                "tools_used": [{"tool": "blender_edit", "command": command.get("command"), "params": command.get("params")}
+                               for command in commands],
+                "conversation_id": task_id,
+                # GLB를 직접 수정한 경우 이미 편집 결과 파일에 저장되어 있음 (Blender 내보내기 불필요)
+                "saved": bool(edit_result.get("saved"))
             }
             
         except Exception as e:
@@ -236,119 +533,174 @@ class BlenderMCPService:
                 "message": "편집에 실패했습니다. 다시 시도해주세요."
             }
     
-    def _extract_command_from_response(self, claude_response: str, user_message: str) -> dict:
-        """Claude의 응답에서 명령과 파라미터 추출"""
-        import re
-        import json
+    async def _plan_with_llm(self, task_id: str, model_path: str, user_message: str):
+        """
+        Claude에게 편집 명령을 생성받아 실행 (스트리밍이면 JSON 명령이 닫히는 즉시 Blender에 먼저 전송)
+        LLM 호출 시간(ms)도 함께 반환하며, 응답에 JSON 명령이 없어 키워드로 대신 만든 경우에는 None
+        """
+        # 시스템 프롬프트(+ 장면 상태 요약) + 토큰 예산 안의 최근 턴 + 현재 메시지
+        system_prompt, messages, estimated_tokens = conversation_store.build_context(
+            task_id, EDIT_SYSTEM_PROMPT, user_message
+        )
+        early: Dict[str, Any] = {}
+        started = time.monotonic()
+
+        def _on_plan(plan: dict):
+            early["plan"] = plan
+            early["dispatch"] = asyncio.create_task(self._dispatch_edit(plan, task_id, model_path))
+
+        try:
+            assistant_text, usage = await self._generate(system_prompt, messages, on_plan=_on_plan)
+        except BaseException:
+            if "dispatch" in early:
+                await self._settle_early_dispatch(early, task_id, user_message)
+            raise
         
-        # JSON 패턴 찾기
-        json_pattern = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
-        json_matches = re.findall(json_pattern, claude_response, re.DOTALL)
+        llm_ms = (time.monotonic() - started) * 1000
+        edit_cache.record_llm_call(llm_ms)
+        if usage is not None:
+            conversation_store.record_usage(task_id, usage.input_tokens, usage.output_tokens, estimated_tokens)
+        print(f"[BlenderMCP] Claude 응답 ({llm_ms:.0f}ms, 입력 {len(messages)}개 메시지 / 추정 {estimated_tokens}토큰): {assistant_text}")
         
-        for json_str in json_matches:
+        if "dispatch" in early:
+            edit_params = early["plan"]
+            commands, result = await early["dispatch"]
+        else:
+            # Claude 응답에서 JSON 명령 추출
+            edit_params = self._find_command_json(assistant_text)
+            if edit_params is None:
+                llm_ms = None
+                edit_params = self._extract_command_from_response(assistant_text, user_message)
+            commands, result = await self._dispatch_edit(edit_params, task_id, model_path)
+        return edit_params, assistant_text, commands, result, llm_ms
+
+    async def _settle_early_dispatch(self, early: Dict[str, Any], task_id: str, user_message: str):
+        """
+        스트림이 실패했을 때 먼저 보낸 편집 처리
+        이미 Blender나 편집 결과 파일에 반영되었을 수 있으므로 취소하지 않고 끝까지 기다린 뒤,
+        성공했으면 대화와 장면 상태에 기록해 모델과 대화 히스토리가 어긋나지 않게 함
+        """
+        try:
+            commands, result = await asyncio.shield(early["dispatch"])
+        except Exception as e:
+            print(f"[BlenderMCP] 먼저 보낸 편집 실패: {e}")
+            return
+        edit_result = result.get("result") or {}
+        if "error" in result or edit_result.get("status") == "error":
+            return
+        print(f"[BlenderMCP] 스트림 오류 전에 보낸 편집은 적용됨, 대화에 기록: {early['plan']}")
+        conversation_store.append_turn(task_id, user_message, json.dumps(early["plan"], ensure_ascii=False))
+        conversation_store.record_edits(task_id, commands)
+
+    async def _generate(self, system_prompt: str, messages: list,
+                        on_plan: Optional[Callable[[dict], None]] = None):
+        """
+        Claude 응답 텍스트와 토큰 사용량 생성 (동시 요청 수 제한, 타임아웃 적용)
+        스트리밍 모드에서는 편집 명령 JSON이 완성되는 즉시 on_plan을 호출
+        """
+        async with _llm_slots:
+            if not settings.ANTHROPIC_STREAMING:
+                response = await anthropic_client.messages.create(
+                    model=settings.ANTHROPIC_MODEL,
+                    max_tokens=1024,
+                    system=system_prompt,
+                    messages=messages
+                )
+                return "".join(block.text for block in response.content if block.type == "text"), response.usage
+
+            scanner = _JsonObjectScanner()
+            assistant_text = ""
+            async with anthropic_client.messages.stream(
+                model=settings.ANTHROPIC_MODEL,
+                max_tokens=1024,
+                system=system_prompt,
+                messages=messages
+            ) as stream:
+                async for text in stream.text_stream:
+                    assistant_text += text
+                    if on_plan is None:
+                        continue
+                    for candidate in scanner.feed(text):
+                        try:
+                            plan = json.loads(candidate)
+                        except json.JSONDecodeError:
+                            continue
+                        if isinstance(plan, dict) and ("command" in plan or isinstance(plan.get("commands"), list)):
+                            print(f"[BlenderMCP] 스트리밍 중 명령 완성, 먼저 전송: {plan}")
+                            on_plan(plan)
+                            on_plan = None
+                            break
+                final_message = await stream.get_final_message()
+            return assistant_text, final_message.usage
+
+    async def _dispatch_edit(self, edit_params: dict, task_id: str, model_path: str):
+        """
+        편집 명령 실행
+        변환/재질 값만 바꾸는 명령은 GLB 파일을 직접 수정하고, 형상을 바꾸는 명령일 때만 워커를 배정받아 Blender로 전송
+        """
+        commands = edit_params.get("commands") or [edit_params]
+        # 씬에 내보내지 않은 편집이 있으면 파일이 최신이 아니므로 Blender에서 이어서 편집
+        if settings.GLB_FAST_PATH_ENABLED and glb_editor.supports(commands) and not self.session.has_unsaved_edits():
+            result = await self._edit_glb(commands, task_id, model_path)
+            if result is not None:
+                return commands, result
+
+        blender = await self.session.blender()
+        return await blender.run_edits(commands, task_id, model_path)
+
+    async def _edit_glb(self, commands: list, task_id: str, model_path: str) -> Optional[Dict[str, Any]]:
+        """GLB JSON 청크만 고쳐 편집 결과 파일에 저장 (해석할 수 없는 파일이면 None을 반환해 Blender로 처리)"""
+        source_path = current_model_path(task_id, model_path)
+        started = time.perf_counter()
+        try:
+            info = await anyio.to_thread.run_sync(
+                glb_editor.apply_edits, source_path, edited_model_path(task_id), commands
+            )
+        except (glb_editor.GLBError, OSError) as e:
+            print(f"[BlenderMCP] GLB 직접 편집 불가, Blender로 처리: {e}")
+            return None
+        exec_ms = round((time.perf_counter() - started) * 1000, 2)
+        glb_optimizer.schedule(edited_model_path(task_id))
+        print(f"[BlenderMCP] GLB 직접 편집 완료 ({exec_ms}ms, BIN {info['bin_bytes']}바이트 재사용): {source_path}")
+        return {"result": {
+            "status": "success",
+            "message": "GLB 직접 편집 완료",
+            "saved": True,
+            "timing": {"exec_ms": exec_ms},
+        }}
+
+    def _find_command_json(self, claude_response: str) -> Optional[dict]:
+        """Claude의 응답에서 JSON 명령 객체 찾기 (없으면 None)"""
+        # 여러 명령은 중첩이 깊으므로 정규식 대신 '{' 위치마다 디코딩 시도
+        decoder = json.JSONDecoder()
+        index = claude_response.find("{")
+        while index != -1:
             try:
-                data = json.loads(json_str)
-                if "command" in data:
-                    print(f"[BlenderMCP] JSON 명령 추출 성공: {data}")
-                    return data
-            except:
+                data, end = decoder.raw_decode(claude_response, index)
+            except json.JSONDecodeError:
+                index = claude_response.find("{", index + 1)
                 continue
+            if isinstance(data, dict) and ("command" in data or isinstance(data.get("commands"), list)):
+                print(f"[BlenderMCP] JSON 명령 추출 성공: {data}")
+                return data
+            index = claude_response.find("{", end)
+        return None
+
+    def _extract_command_from_response(self, claude_response: str, user_message: str) -> dict:
+        """Claude의 응답에서 명령과 파라미터 추출"""
+        data = self._find_command_json(claude_response)
+        if data is not None:
+            return data
         
-        # JSON 추출 실패 시 키워드 기반 명령 생성
+        # JSON 추출 실패 시 로컬 의도 파서로 명령 생성 (신뢰도와 무관하게 가장 그럴듯한 해석 사용)
         print(f"[BlenderMCP] JSON 추출 실패, 키워드 기반 명령 생성")
-        user_lower = user_message.lower()
-        
-        # 색상 변경
-        if any(word in user_lower for word in ["색상", "색깔", "color", "빨간", "파란", "초록", "노란"]):
-            color = self._extract_color_from_response(claude_response, user_message)
-            return {
-                "command": "change_color",
-                "params": color,
-                "description": f"색상을 변경했습니다"
-            }
-        
-        # 객체 추가
-        elif any(word in user_lower for word in ["추가", "만들어", "생성", "add", "create"]):
-            obj_type = "CUBE"
-            if "구" in user_lower or "sphere" in user_lower:
-                obj_type = "SPHERE"
-            elif "원기둥" in user_lower or "실린더" in user_lower or "cylinder" in user_lower:
-                obj_type = "CYLINDER"
-            elif "원뿔" in user_lower or "cone" in user_lower:
-                obj_type = "CONE"
-            elif "정육면체" in user_lower or "큐브" in user_lower or "cube" in user_lower:
-                obj_type = "CUBE"
-            
-            position = [0, 0, -1]  # 기본 위치 (모델 아래)
-            if "위" in user_lower:
-                position = [0, 0, 1]
-            elif "옆" in user_lower or "오른쪽" in user_lower:
-                position = [1, 0, 0]
-            elif "왼쪽" in user_lower:
-                position = [-1, 0, 0]
-                
-            return {
-                "command": "add_object",
-                "params": {"type": obj_type, "position": position, "scale": 1.0},
-                "description": f"{obj_type}를 추가했습니다"
-            }
-        
-        # 크기 변경
-        elif any(word in user_lower for word in ["크기", "키워", "줄여", "scale", "크게", "작게"]):
-            factor = 2.0
-            if "2배" in user_lower or "두배" in user_lower:
-                factor = 2.0
-            elif "3배" in user_lower:
-                factor = 3.0
-            elif "절반" in user_lower or "반" in user_lower:
-                factor = 0.5
-            elif "작게" in user_lower or "줄여" in user_lower:
-                factor = 0.5
-            
-            return {
-                "command": "scale_model",
-                "params": {"factor": factor},
-                "description": f"크기를 {factor}배로 조정했습니다"
-            }
-        
-        # 회전
-        elif any(word in user_lower for word in ["회전", "돌려", "rotate"]):
-            angle = 90
-            axis = "Z"
-            if "45" in user_lower:
-                angle = 45
-            elif "180" in user_lower:
-                angle = 180
-            
-            return {
-                "command": "rotate_model",
-                "params": {"axis": axis, "angle": angle},
-                "description": f"{axis}축으로 {angle}도 회전했습니다"
-            }
-        
-        # 스무딩
-        elif any(word in user_lower for word in ["부드럽", "smooth", "스무딩"]):
-            return {
-                "command": "apply_smooth",
-                "params": {},
-                "description": "스무딩을 적용했습니다"
-            }
-        
-        # 세분화
-        elif any(word in user_lower for word in ["세분화", "subdivide", "더 많은 면"]):
-            return {
-                "command": "subdivide",
-                "params": {"levels": 2},
-                "description": "모델을 세분화했습니다"
-            }
-        
-        # 재질 변경
-        elif any(word in user_lower for word in ["금속", "메탈", "metallic", "광택"]):
-            return {
-                "command": "change_material",
-                "params": {"metallic": 0.9, "roughness": 0.1},
-                "description": "금속 재질로 변경했습니다"
-            }
+        intent = intent_parser.parse(user_message)
+        if intent:
+            plan = intent.to_plan()
+            for command in plan.get("commands") or [plan]:
+                if command["command"] == "change_color":
+                    command["params"] = self._extract_color_from_response(claude_response, user_message)
+            return plan
         
         # 기본값
         return {
@@ -356,6 +708,8 @@ class BlenderMCPService:
             "params": {"message": user_message},
             "description": "명령을 처리했습니다"
         }
+    
+    def _extract_color_from_response(self, claude_response: str, user_message: str) -> dict:
         """Claude의 응답에서 RGB 색상 값 추출"""
         import re
         
@@ -374,68 +728,11 @@ class BlenderMCPService:
             }
         
         # 매칭 실패 시 키워드로 색상 결정
-        user_lower = user_message.lower()
-        
-        color_map = {
-            "빨간": {"r": 1.0, "g": 0.0, "b": 0.0, "a": 1.0},
-            "red": {"r": 1.0, "g": 0.0, "b": 0.0, "a": 1.0},
-            "파란": {"r": 0.0, "g": 0.3, "b": 1.0, "a": 1.0},
-            "blue": {"r": 0.0, "g": 0.3, "b": 1.0, "a": 1.0},
-            "초록": {"r": 0.0, "g": 1.0, "b": 0.0, "a": 1.0},
-            "green": {"r": 0.0, "g": 1.0, "b": 0.0, "a": 1.0},
-            "노란": {"r": 1.0, "g": 1.0, "b": 0.0, "a": 1.0},
-            "yellow": {"r": 1.0, "g": 1.0, "b": 0.0, "a": 1.0},
-            "보라": {"r": 0.5, "g": 0.0, "b": 1.0, "a": 1.0},
-            "purple": {"r": 0.5, "g": 0.0, "b": 1.0, "a": 1.0},
-            "주황": {"r": 1.0, "g": 0.5, "b": 0.0, "a": 1.0},
-            "orange": {"r": 1.0, "g": 0.5, "b": 0.0, "a": 1.0},
-            "분홍": {"r": 1.0, "g": 0.4, "b": 0.7, "a": 1.0},
-            "pink": {"r": 1.0, "g": 0.4, "b": 0.7, "a": 1.0},
-            "흰": {"r": 1.0, "g": 1.0, "b": 1.0, "a": 1.0},
-            "white": {"r": 1.0, "g": 1.0, "b": 1.0, "a": 1.0},
-            "검은": {"r": 0.0, "g": 0.0, "b": 0.0, "a": 1.0},
-            "black": {"r": 0.0, "g": 0.0, "b": 0.0, "a": 1.0},
-        }
-        
-        for keyword, color in color_map.items():
-            if keyword in user_lower:
-                print(f"[BlenderMCP] 키워드 '{keyword}'로 색상 결정: {color}")
-                return color
+        color = intent_parser.parse_color(user_message)
+        if color:
+            print(f"[BlenderMCP] 키워드로 색상 결정: {color}")
+            return color
         
         # 기본값 (파란색)
         print(f"[BlenderMCP] 색상을 찾을 수 없어 기본값(파란색) 사용")
         return {"r": 0.0, "g": 0.3, "b": 1.0, "a": 1.0}
-    
-    async def save_model(self, output_path: str, format: str = "GLB") -> Dict[str, Any]:
-        """편집된 모델을 파일로 저장"""
-        if not self.socket:
-            return {"success": False, "error": "Not connected to Blender"}
-        
-        try:
-            print(f"[BlenderMCP] save_model 시작: {output_path}")
-            response = await self.send_command("export_model", {
-                "file_path": output_path,
-                "format": format
-            })
-            print(f"[BlenderMCP] save_model 응답: {response}")
-            
-            if "error" in response:
-                return {"success": False, "error": response["error"].get("message", "Unknown error")}
-            
-            return {"success": True, "path": output_path, "data": response.get("result")}
-            
-        except Exception as e:
-            print(f"[BlenderMCP] save_model 오류: {str(e)}")
-            return {"success": False, "error": str(e)}
-    
-    def reset_conversation(self, task_id: str = None):
-        """대화 히스토리 초기화"""
-        self.conversation_history = []
-        if task_id and task_id in self.loaded_models:
-            # 모델 로드 기록도 제거 (다음에 다시 원본 로드)
-            del self.loaded_models[task_id]
-            print(f"[BlenderMCP] 모델 로드 기록 제거: task_id={task_id}")
-
-
-# 싱글톤 인스턴스
-blender_service = BlenderMCPService()
@@ -0,0 +1,445 @@
+"""
+Blender Worker Pool
+헤드리스 Blender 프로세스(blender -b --python blender_mcp_addon.py -- --port N) 여러 개를 관리하고
+작업(task_id)별 편집 세션을 한 워커에 고정(session affinity)하여 서로 다른 작업의 편집이 병렬로 실행되도록 함
+
+워커 하나는 씬 하나이므로 한 번에 한 세션만 로드해 두며, 워커가 모자라면 최대 개수까지 새로 띄우고
+그래도 모자라면 가장 오래 사용하지 않은 세션을 내보냄 (내보낸 세션은 다음 편집 때 모델을 다시 로드)
+미리보기 편집은 내보내기를 BLENDER_EXPORT_DEBOUNCE초 미뤄 연속된 편집을 GLB 내보내기 한 번으로 합침
+BLENDER_EXECUTABLE이 비어 있으면 직접 실행한 Blender 하나(BLENDER_HOST:BLENDER_PORT)를 워커로 사용
+"""
+import os
+import time
+import socket
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+from app.core.config import settings
+from app.services import conversation_store
+from app.services.blender_mcp_service import BlenderMCPService, edited_model_path, record_export
+
+ADDON_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "blender_mcp_addon.py"))
+
+
+class BlenderWorker:
+    """Blender 프로세스 하나와 그 연결"""
+
+    def __init__(self, port: int, process: Optional[asyncio.subprocess.Process] = None):
+        self.port = port
+        self.process = process
+        # 대화 히스토리는 작업별로 Redis에 저장되므로 세션이 다른 워커로 옮겨져도 이어서 대화
+        self.service = BlenderMCPService(host=settings.BLENDER_HOST, port=port)
+        self.lock = asyncio.Lock()  # 씬 하나에 대한 명령은 순서대로 실행
+        self.task_id: Optional[str] = None  # 현재 배정된 세션
+        self.reserved = False  # 시작 중이거나 세션을 내보내는 중 (다른 배정 대상에서 제외)
+        self.last_used = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is None or self.process.returncode is None
+
+
+class EditSession:
+    """
+    작업 하나의 편집 요청 하나 동안 쓰는 세션
+    GLB 직접 편집은 워커 없이 처리하고, Blender가 필요할 때만 워커를 배정받아 세션이 끝날 때까지 독점 사용
+    """
+
+    def __init__(self, pool: "BlenderPool", task_id: str):
+        self._pool = pool
+        self._stack = AsyncExitStack()
+        self.task_id = task_id
+        self.service: Optional[BlenderMCPService] = None  # 배정받은 워커 (Blender를 쓰지 않았으면 None)
+
+    def has_unsaved_edits(self) -> bool:
+        """배정된 워커의 씬에 편집 결과 파일로 내보내지 않은 편집이 있는지 (워커를 새로 배정하지 않음)"""
+        worker = self._pool._sessions.get(self.task_id)
+        return worker is not None and worker.service.has_unsaved_edits(self.task_id)
+
+    async def blender(self) -> BlenderMCPService:
+        """이 작업에 고정된 워커를 배정받음 (이미 받았으면 그대로 사용)"""
+        if self.service is None:
+            self.service = await self._stack.enter_async_context(self._pool.session(self.task_id))
+        return self.service
+
+    async def aclose(self):
+        await self._stack.aclose()
+        self.service = None
+
+
+class BlenderPool:
+    def __init__(self):
+        self._workers: List[BlenderWorker] = []
+        self._sessions: Dict[str, BlenderWorker] = {}  # task_id -> 워커
+        self._assign_lock = asyncio.Lock()
+        self._changed = asyncio.Condition(self._assign_lock)  # 워커 예약이 풀리면 알림
+        self._assigning: Dict[str, asyncio.Event] = {}  # task_id -> 진행 중인 새 배정
+        self._reaper: Optional[asyncio.Task] = None
+        self._exports: Dict[str, asyncio.Task] = {}  # task_id -> 대기 중인 지연 내보내기
+        self._task_locks: Dict[str, list] = {}  # task_id -> [작업 락, 사용/대기 중인 수]
+
+    @property
+    def managed(self) -> bool:
+        """Blender 프로세스를 직접 띄워 관리하는지 여부"""
+        return bool(settings.BLENDER_EXECUTABLE)
+
+    async def start(self):
+        """최소 워커 수만큼 Blender 실행 (앱 lifespan 시작 시 호출)"""
+        if self._workers:
+            return
+        if not self.managed:
+            self._workers.append(BlenderWorker(settings.BLENDER_PORT))
+            return
+
+        results = await asyncio.gather(
+            *(self._spawn() for _ in range(settings.BLENDER_POOL_MIN)), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"[BlenderPool] 워커 시작 실패: {result}")
+        self._reaper = asyncio.create_task(self._reap_idle())
+
+    async def stop(self):
+        """모든 세션 연결을 닫고 관리 중인 Blender 프로세스 종료"""
+        if self._reaper:
+            self._reaper.cancel()
+            self._reaper = None
+        for task_id in list(self._exports):
+            self.cancel_export(task_id)
+        for worker in list(self._workers):
+            await self._shutdown(worker)
+        self._workers = []
+        self._sessions = {}
+
+    @asynccontextmanager
+    async def session(self, task_id: str) -> AsyncIterator[BlenderMCPService]:
+        """task_id에 고정된 워커를 배정받아 그 워커의 BlenderMCPService를 독점 사용"""
+        while True:
+            worker = await self._assign(task_id)
+            await worker.lock.acquire()
+            if worker.task_id == task_id and worker.alive:
+                break
+            # 락을 기다리는 동안 세션이 내보내졌거나 워커가 죽은 경우 다시 배정
+            worker.lock.release()
+
+        try:
+            worker.last_used = time.monotonic()
+            yield worker.service
+        finally:
+            worker.last_used = time.monotonic()
+            worker.lock.release()
+
+    @asynccontextmanager
+    async def edit_session(self, task_id: str) -> AsyncIterator[EditSession]:
+        """
+        작업의 편집 세션 (같은 작업의 편집과 내보내기는 순서대로 실행)
+        워커는 Blender가 필요한 편집일 때만 배정되므로 GLB 직접 편집은 다른 세션을 내보내거나 Blender를 띄우지 않음
+        """
+        async with self._task_lock(task_id):
+            session = EditSession(self, task_id)
+            try:
+                yield session
+            finally:
+                await session.aclose()
+
+    @asynccontextmanager
+    async def _task_lock(self, task_id: str):
+        entry = self._task_locks.setdefault(task_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                self._task_locks.pop(task_id, None)
+
+    def reset(self, task_id: str):
+        """작업의 대화 히스토리와 모델 로드 기록을 지우고 워커 배정을 해제"""
+        self.cancel_export(task_id)
+        conversation_store.reset(task_id)
+        self.release(task_id)
+
+    def schedule_export(self, task_id: str):
+        """편집 결과 내보내기 예약 (예약된 내보내기가 있으면 취소하고 다시 예약해 한 번으로 합침)"""
+        if self.cancel_export(task_id):
+            record_export("coalesced")
+        self._exports[task_id] = asyncio.create_task(self._debounced_export(task_id))
+
+    def cancel_export(self, task_id: str) -> bool:
+        """예약된 내보내기 취소 (취소했으면 True)"""
+        pending = self._exports.pop(task_id, None)
+        if pending is None or pending.done():
+            return False
+        pending.cancel()
+        return True
+
+    def export_pending(self, task_id: str) -> bool:
+        return task_id in self._exports
+
+    async def _debounced_export(self, task_id: str):
+        await asyncio.sleep(settings.BLENDER_EXPORT_DEBOUNCE)
+        # 내보내는 도중에는 취소되지 않도록 예약 목록에서 먼저 제거
+        self._exports.pop(task_id, None)
+        try:
+            result = await self.export(task_id)
+            print(f"[BlenderPool] 지연 내보내기 완료: {task_id} {result}")
+        except Exception as e:
+            print(f"[BlenderPool] 지연 내보내기 실패: {task_id} {e}")
+
+    async def export(self, task_id: str) -> dict:
+        """예약된 내보내기를 기다리지 않고 바로 편집 결과 파일로 내보냄 (바뀐 것이 없으면 건너뜀)"""
+        self.cancel_export(task_id)
+        path = edited_model_path(task_id)
+        async with self._task_lock(task_id):
+            if task_id not in self._sessions:
+                # 배정된 워커가 없으면 씬을 내보낼 때 이미 저장됨 (다른 세션을 내보내면서 워커를 배정하지 않음)
+                return {"success": os.path.exists(path), "path": path, "skipped": True}
+            async with self.session(task_id) as service:
+                if not service.is_model_loaded(task_id):
+                    return {"success": os.path.exists(path), "path": path, "skipped": True}
+                return await service.save_model(path)
+
+    async def _flush(self, worker: BlenderWorker):
+        """세션을 내보내기 전에 씬에만 있는 편집을 편집 결과 파일로 저장 (워커 락을 잡은 상태에서 호출)"""
+        task_id = worker.task_id
+        if not task_id:
+            return
+        self.cancel_export(task_id)
+        if worker.service.has_unsaved_edits(task_id):
+            print(f"[BlenderPool] 세션 {task_id}의 저장하지 않은 편집 내보내기 (port {worker.port})")
+            result = await worker.service.save_model(edited_model_path(task_id))
+            if not result.get("success"):
+                print(f"[BlenderPool] 내보내기 실패: {result.get('error')}")
+
+    def release(self, task_id: str):
+        """워커 배정과 모델 로드 기록만 해제 (Redis의 대화 히스토리는 유지되어 다음 편집 때 이어서 대화)"""
+        worker = self._sessions.pop(task_id, None)
+        if worker is None:
+            return
+        worker.service.loaded_models.pop(task_id, None)
+        if worker.task_id == task_id:
+            worker.task_id = None
+
+    def stats(self) -> dict:
+        return {
+            "managed": self.managed,
+            "workers": [
+                {"port": worker.port, "task_id": worker.task_id, "busy": worker.lock.locked(), "alive": worker.alive,
+                 "reserved": worker.reserved}
+                for worker in self._workers
+            ],
+            "sessions": len(self._sessions),
+        }
+
+    async def snapshot_stats(self) -> List[dict]:
+        """워커별 씬 스냅샷 캐시 통계 (스냅샷 복원 vs glTF import 평균 시간)와 재질 캐시 통계"""
+        async def _query(worker: BlenderWorker) -> dict:
+            try:
+                response = await worker.service.send_command("snapshot_stats")
+                result = response.get("result") or {}
+                return {"port": worker.port, **(result.get("stats") or {}), "materials": result.get("materials")}
+            except Exception as e:
+                return {"port": worker.port, "error": str(e)}
+
+        return list(await asyncio.gather(*(_query(worker) for worker in self._workers if worker.alive)))
+
+    async def _assign(self, task_id: str) -> BlenderWorker:
+        """
+        task_id의 워커 (이미 배정된 워커는 배정 락 없이 바로 반환)
+        새로 배정할 때는 배정 락 안에서 워커를 예약만 하고, 느린 작업(Blender 시작, 내보낼 세션 저장)은 락 밖에서 함
+        """
+        while True:
+            worker = self._sessions.get(task_id)
+            if worker and worker.alive and worker in self._workers:
+                return worker
+            assigning = self._assigning.get(task_id)
+            if assigning is None:
+                break
+            # 같은 작업의 배정이 진행 중이면 끝난 뒤 다시 확인
+            await assigning.wait()
+
+        done = self._assigning[task_id] = asyncio.Event()
+        try:
+            return await self._assign_new(task_id)
+        finally:
+            del self._assigning[task_id]
+            done.set()
+
+    async def _assign_new(self, task_id: str) -> BlenderWorker:
+        dead: List[BlenderWorker] = []
+        launch = False
+        async with self._changed:
+            if not self._workers and not self.managed:
+                await self.start()
+            self._sessions.pop(task_id, None)
+
+            while True:
+                for stale in [w for w in self._workers if not w.alive and not w.reserved]:
+                    print(f"[BlenderPool] 종료된 워커 제거 (port {stale.port})")
+                    self._forget(stale)
+                    dead.append(stale)
+
+                worker = next((w for w in self._workers if w.task_id is None and not w.reserved), None)
+                if worker is not None:
+                    self._bind(worker, task_id)
+                    break
+                if self.managed and len(self._workers) < settings.BLENDER_POOL_MAX:
+                    worker = self._new_worker()
+                    launch = True
+                    break
+                candidates = [w for w in self._workers if not w.reserved]
+                if candidates:
+                    # 가장 오래 사용하지 않은 세션을 내보내고 그 워커를 재사용 (진행 중인 편집이 없는 워커 우선)
+                    worker = min(candidates, key=lambda w: (w.lock.locked(), w.last_used))
+                    worker.reserved = True
+                    break
+                if not self._workers:
+                    raise RuntimeError("사용 가능한 Blender 워커가 없습니다.")
+                # 모든 워커가 시작/내보내기 준비 중이면 하나가 끝날 때까지 대기
+                await self._changed.wait()
+
+        for stale in dead:
+            await self._shutdown(stale)
+        if not worker.reserved:
+            return worker
+
+        launched = False
+        try:
+            if launch:
+                await self._launch(worker)
+                launched = True
+            else:
+                print(f"[BlenderPool] 세션 {worker.task_id} 내보냄 (port {worker.port}) -> {task_id}")
+                async with worker.lock:
+                    await self._flush(worker)
+                    # 락을 놓기 전에 다시 배정해야 내보낸 세션의 대기 중인 편집이 이 워커를 쓰지 않음
+                    if worker.task_id and self._sessions.get(worker.task_id) is worker:
+                        self._sessions.pop(worker.task_id)
+                    self._bind(worker, task_id)
+        finally:
+            async with self._changed:
+                worker.reserved = False
+                if launched:
+                    self._bind(worker, task_id)
+                self._changed.notify_all()
+        return worker
+
+    def _bind(self, worker: BlenderWorker, task_id: str):
+        worker.task_id = task_id
+        worker.last_used = time.monotonic()
+        self._sessions[task_id] = worker
+
+    def _new_worker(self) -> BlenderWorker:
+        """빈 포트로 시작 전 워커를 만들어 예약해 둠 (_launch로 Blender 실행)"""
+        used_ports = {worker.port for worker in self._workers}
+        port = next(p for p in range(settings.BLENDER_PORT, settings.BLENDER_PORT + settings.BLENDER_POOL_MAX * 2)
+                    if p not in used_ports)
+        worker = BlenderWorker(port)
+        worker.reserved = True
+        self._workers.append(worker)
+        return worker
+
+    async def _spawn(self) -> BlenderWorker:
+        worker = self._new_worker()
+        try:
+            await self._launch(worker)
+        finally:
+            worker.reserved = False
+        return worker
+
+    async def _launch(self, worker: BlenderWorker):
+        addon_args = [
+            "--port", str(worker.port),
+            "--snapshot-budget-mb", str(settings.BLENDER_SNAPSHOT_BUDGET_MB),
+            "--triangle-budget", str(settings.BLENDER_SUBDIVIDE_TRIANGLE_BUDGET),
+            "--subdivide-viewport-levels", str(settings.BLENDER_SUBDIVIDE_VIEWPORT_LEVELS),
+        ]
+        if settings.BLENDER_SNAPSHOT_DIR:
+            addon_args += ["--snapshot-dir", settings.BLENDER_SNAPSHOT_DIR]
+        try:
+            worker.process = await asyncio.create_subprocess_exec(
+                settings.BLENDER_EXECUTABLE, "-b", "--factory-startup", "--python", ADDON_PATH, "--", *addon_args,
+                stdin=asyncio.subprocess.DEVNULL,
+            )
+            await self._wait_ready(worker)
+        except BaseException:
+            await self._shutdown(worker)
+            raise
+        print(f"[BlenderPool] 워커 시작 (port {worker.port}, pid {worker.process.pid}, 총 {len(self._workers)}개)")
+
+    async def _wait_ready(self, worker: BlenderWorker):
+        """애드온 소켓 서버가 연결을 받을 때까지 대기"""
+        deadline = time.monotonic() + settings.BLENDER_STARTUP_TIMEOUT
+        loop = asyncio.get_running_loop()
+        while True:
+            if not worker.alive:
+                raise RuntimeError(f"Blender 워커가 시작 중 종료되었습니다 (port {worker.port})")
+            try:
+                probe = await loop.run_in_executor(
+                    None, socket.create_connection, (settings.BLENDER_HOST, worker.port), 1
+                )
+                probe.close()
+                return
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Blender 워커가 {settings.BLENDER_STARTUP_TIMEOUT:.0f}초 안에 시작되지 않았습니다 (port {worker.port})")
+                await asyncio.sleep(0.5)
+
+    def _forget(self, worker: BlenderWorker):
+        """워커를 풀과 세션 배정에서 제거 (프로세스는 _shutdown에서 종료)"""
+        if worker in self._workers:
+            self._workers.remove(worker)
+        if worker.task_id and self._sessions.get(worker.task_id) is worker:
+            self._sessions.pop(worker.task_id, None)
+
+    async def _shutdown(self, worker: BlenderWorker):
+        self._forget(worker)
+        await worker.service.disconnect()
+        if worker.process and worker.process.returncode is None:
+            worker.process.terminate()
+            try:
+                await asyncio.wait_for(worker.process.wait(), timeout=10)
+            except asyncio.TimeoutError:
+                worker.process.kill()
+                await worker.process.wait()
+
+    async def _reap_idle(self):
+        """오래 쓰지 않은 세션을 해제하고, 최소 개수를 넘는 유휴 워커를 종료 (부하에 맞춰 축소)"""
+        interval = max(settings.BLENDER_SESSION_IDLE_TIMEOUT / 4, 5)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            idle, retired = [], []
+            # 배정 락 안에서는 대상만 골라 예약하고, 저장/종료는 락 밖에서 함
+            async with self._changed:
+                for worker in list(self._workers):
+                    if worker.reserved or worker.lock.locked() or now - worker.last_used < settings.BLENDER_SESSION_IDLE_TIMEOUT:
+                        continue
+                    if worker.task_id:
+                        worker.reserved = True
+                        idle.append(worker)
+                    elif len(self._workers) - len(retired) > settings.BLENDER_POOL_MIN:
+                        self._forget(worker)
+                        retired.append(worker)
+
+            for worker in idle:
+                try:
+                    async with worker.lock:
+                        # 예약한 뒤 락을 얻기 전에 편집이 있었으면 유지
+                        if worker.task_id and time.monotonic() - worker.last_used >= settings.BLENDER_SESSION_IDLE_TIMEOUT:
+                            print(f"[BlenderPool] 유휴 세션 해제: {worker.task_id} (port {worker.port})")
+                            await self._flush(worker)
+                            self.release(worker.task_id)
+                            worker.last_used = time.monotonic()
+                finally:
+                    async with self._changed:
+                        worker.reserved = False
+                        self._changed.notify_all()
+            for worker in retired:
+                print(f"[BlenderPool] 유휴 워커 종료 (port {worker.port})")
+                await self._shutdown(worker)
+
+
+# 싱글톤 인스턴스
+blender_pool = BlenderPool()
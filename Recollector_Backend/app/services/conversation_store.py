@@ -0,0 +1,187 @@
+"""
+Conversation Store
+작업(task_id)별 채팅 편집 대화를 Redis에 저장 (서버 재시작 후에도 유지되고 여러 워커 프로세스가 공유)
+
+LLM에는 시스템 프롬프트 + 최근 K턴만 보내고, 그보다 오래된 턴의 내용은 지금까지 실행된 편집 명령을
+누적한 장면 상태(색상, 크기, 회전, 재질, 추가한 객체 등) 요약으로 대신하여 요청 크기를 일정하게 유지
+"""
+import json
+import redis
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+MESSAGES_KEY = "conversation:{}:messages"
+SCENE_KEY = "conversation:{}:scene"
+USAGE_KEY = "conversation:{}:usage"
+STATS_KEY = "conversation:stats"
+
+redis_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    decode_responses=True
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 대략적인 토큰 수 추정 (ASCII는 4글자당 1토큰, 한글 등은 글자당 1토큰)"""
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def _expire(pipe, task_id: str):
+    for key in (MESSAGES_KEY, SCENE_KEY, USAGE_KEY):
+        pipe.expire(key.format(task_id), settings.CONVERSATION_TTL)
+
+
+def history(task_id: str) -> List[Dict[str, str]]:
+    """저장된 최근 대화 (user / assistant가 번갈아 나오는 메시지 목록)"""
+    return [json.loads(message) for message in redis_client.lrange(MESSAGES_KEY.format(task_id), 0, -1)]
+
+
+def append_turn(task_id: str, user_message: str, assistant_text: str):
+    """완료된 한 턴(사용자 메시지 + 응답)을 저장하고 최근 K턴만 남김"""
+    key = MESSAGES_KEY.format(task_id)
+    pipe = redis_client.pipeline()
+    pipe.rpush(key,
+               json.dumps({"role": "user", "content": user_message}, ensure_ascii=False),
+               json.dumps({"role": "assistant", "content": assistant_text}, ensure_ascii=False))
+    pipe.ltrim(key, -settings.CONVERSATION_MAX_TURNS * 2, -1)
+    _expire(pipe, task_id)
+    pipe.execute()
+
+
+def scene_state(task_id: str) -> Dict[str, Any]:
+    raw = redis_client.get(SCENE_KEY.format(task_id))
+    return json.loads(raw) if raw else {}
+
+
+def record_edits(task_id: str, commands: List[dict]):
+    """
+    실행에 성공한 편집 명령을 장면 상태에 누적
+    (작업별 편집은 워커 풀 세션 락 안에서 순서대로 실행되므로 읽고 다시 쓰는 방식으로 충분)
+    """
+    state = scene_state(task_id)
+    for command in commands:
+        name = command.get("command")
+        params = command.get("params") or {}
+        if name == "change_color":
+            state["color"] = [params.get("r", 0.0), params.get("g", 0.3), params.get("b", 1.0)]
+        elif name == "scale_model":
+            state["scale"] = round(state.get("scale", 1.0) * float(params.get("factor", 1.0)), 4)
+        elif name == "rotate_model":
+            rotation = state.setdefault("rotation", {})
+            axis = params.get("axis", "Z")
+            rotation[axis] = (rotation.get(axis, 0) + float(params.get("angle", 90))) % 360
+        elif name == "apply_smooth":
+            state["smooth"] = True
+        elif name == "subdivide":
+            state["subdivide_levels"] = state.get("subdivide_levels", 0) + int(params.get("levels", 2))
+        elif name == "change_material":
+            state["material"] = {"metallic": params.get("metallic", 0.0), "roughness": params.get("roughness", 0.5)}
+        elif name == "add_object":
+            state.setdefault("objects", []).append(
+                {"type": params.get("type", "CUBE"), "position": params.get("position", [0, 0, 0])}
+            )
+        elif name == "mirror":
+            axes = state.setdefault("mirror", [])
+            if params.get("axis", "X") not in axes:
+                axes.append(params.get("axis", "X"))
+        elif name == "array":
+            state["array"] = {"count": params.get("count", 3), "offset": params.get("offset", [2, 0, 0])}
+    state["edits"] = state.get("edits", 0) + len(commands)
+
+    pipe = redis_client.pipeline()
+    pipe.set(SCENE_KEY.format(task_id), json.dumps(state))
+    _expire(pipe, task_id)
+    pipe.execute()
+
+
+def reset_scene(task_id: str):
+    """원본 모델을 다시 로드했을 때 장면 상태 초기화"""
+    redis_client.delete(SCENE_KEY.format(task_id))
+
+
+def summarize_scene(state: Dict[str, Any]) -> Optional[str]:
+    """장면 상태를 LLM에 전달할 짧은 문장으로 변환 (편집 이력이 없으면 None)"""
+    if not state.get("edits"):
+        return None
+    parts = []
+    if "color" in state:
+        parts.append("색상 RGB({:.2f}, {:.2f}, {:.2f})".format(*state["color"]))
+    if state.get("scale", 1.0) != 1.0:
+        parts.append(f"원본 대비 크기 {state['scale']:g}배")
+    rotation = {axis: angle for axis, angle in (state.get("rotation") or {}).items() if angle}
+    if rotation:
+        parts.append("회전 " + ", ".join(f"{axis}축 {angle:g}도" for axis, angle in sorted(rotation.items())))
+    if "material" in state:
+        parts.append(f"재질 metallic {state['material']['metallic']} / roughness {state['material']['roughness']}")
+    if state.get("smooth"):
+        parts.append("스무딩 적용")
+    if state.get("subdivide_levels"):
+        parts.append(f"세분화 레벨 {state['subdivide_levels']}")
+    if state.get("mirror"):
+        parts.append("미러 " + ", ".join(f"{axis}축" for axis in state["mirror"]))
+    if "array" in state:
+        parts.append(f"배열 {state['array']['count']}개")
+    if state.get("objects"):
+        parts.append("추가한 객체 " + ", ".join(f"{obj['type']}{obj['position']}" for obj in state["objects"]))
+    return f"현재 모델 상태 (지금까지 편집 {state['edits']}회 누적): " + ("; ".join(parts) or "변경 없음")
+
+
+def build_context(task_id: str, system_prompt: str, user_message: str) -> Tuple[str, List[Dict[str, str]], int]:
+    """
+    LLM 요청용 (시스템 프롬프트, 메시지 목록, 추정 입력 토큰 수)
+    최근 K턴 중 토큰 예산(CONVERSATION_TOKEN_BUDGET)을 넘는 오래된 턴부터 제외하며,
+    제외된 턴을 포함한 이전 편집 결과는 장면 상태 요약으로 시스템 프롬프트에 덧붙임
+    """
+    pipe = redis_client.pipeline()
+    pipe.lrange(MESSAGES_KEY.format(task_id), 0, -1)
+    pipe.get(SCENE_KEY.format(task_id))
+    raw_messages, raw_scene = pipe.execute()
+
+    summary = summarize_scene(json.loads(raw_scene) if raw_scene else {})
+    if summary:
+        system_prompt = f"{system_prompt}\n\n{summary}"
+
+    current = {"role": "user", "content": user_message}
+    used = estimate_tokens(system_prompt) + estimate_tokens(user_message)
+    messages = [json.loads(message) for message in raw_messages]
+
+    # 최신 턴부터 예산 안에서 채우기 (user / assistant 한 쌍 단위)
+    kept: List[Dict[str, str]] = []
+    for index in range(len(messages) - 2, -1, -2):
+        pair = messages[index:index + 2]
+        if pair[0].get("role") != "user":
+            break
+        cost = sum(estimate_tokens(message["content"]) for message in pair)
+        if used + cost > settings.CONVERSATION_TOKEN_BUDGET:
+            break
+        kept[:0] = pair
+        used += cost
+
+    return system_prompt, kept + [current], used
+
+
+def record_usage(task_id: str, input_tokens: int, output_tokens: int, estimated_tokens: int):
+    """LLM 호출 한 번의 토큰 사용량 기록 (작업별 + 전체)"""
+    pipe = redis_client.pipeline()
+    for key in (USAGE_KEY.format(task_id), STATS_KEY):
+        pipe.hincrby(key, "calls", 1)
+        pipe.hincrby(key, "input_tokens", input_tokens)
+        pipe.hincrby(key, "output_tokens", output_tokens)
+        pipe.hincrby(key, "estimated_input_tokens", estimated_tokens)
+    pipe.hset(USAGE_KEY.format(task_id), "last_input_tokens", input_tokens)
+    _expire(pipe, task_id)
+    pipe.execute()
+
+
+def usage(task_id: Optional[str] = None) -> Dict[str, int]:
+    """토큰 사용량 (task_id가 없으면 전체)"""
+    counters = redis_client.hgetall(USAGE_KEY.format(task_id) if task_id else STATS_KEY)
+    return {key: int(value) for key, value in counters.items()}
+
+
+def reset(task_id: str):
+    """작업의 대화, 장면 상태, 사용량 기록 삭제"""
+    redis_client.delete(MESSAGES_KEY.format(task_id), SCENE_KEY.format(task_id), USAGE_KEY.format(task_id))
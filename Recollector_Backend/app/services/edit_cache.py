@@ -0,0 +1,223 @@
+"""
+Edit Cache
+채팅 편집 요청 -> LLM이 생성한 편집 명령(JSON) 캐시
+정규화한 메시지와 시스템 프롬프트 다이제스트로 키를 만들어 같은 요청은 LLM 호출 없이 재사용하고,
+정확히 일치하지 않아도 글자 3-gram 유사도가 높은 요청(띄어쓰기/어미 차이 등)은 근사 적중으로 재사용
+"""
+import re
+import json
+import time
+import hashlib
+import unicodedata
+import redis
+from typing import Dict, Optional, Set
+from app.core.config import settings
+from app.services import intent_parser
+
+ENTRY_KEY = "editcache:entry:{}"
+GRAM_KEY = "editcache:gram:{}:{}"  # (프롬프트 다이제스트, 3-gram) -> 항목 키 집합
+LRU_KEY = "editcache:lru"
+STATS_KEY = "editcache:stats"
+
+# 근사 적중 후보로 Jaccard 유사도를 계산할 최대 항목 수
+_MAX_CANDIDATES = 20
+
+# 이전 대화에 기대는 요청은 같은 문장이라도 결과가 달라지므로 캐시하지 않음
+_CONTEXTUAL = re.compile(r"다시|한 번 더|한번 더|아까|방금|이전|원래대로|되돌|취소|그거|그것|again|undo|revert|previous")
+
+redis_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    decode_responses=True
+)
+
+
+def prompt_digest(system_prompt: str, model: str) -> str:
+    """시스템 프롬프트나 모델이 바뀌면 기존 캐시를 쓰지 않도록 키에 포함할 다이제스트"""
+    return hashlib.sha256(f"{model}\n{system_prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+def normalize(message: str) -> str:
+    """대소문자, 전각/반각, 문장부호, 공백 차이를 없앤 메시지"""
+    text = unicodedata.normalize("NFKC", message).lower()
+    text = re.sub(r"[^\w\s#%.-]", " ", text)
+    text = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", text)
+    return " ".join(text.split())
+
+
+def cacheable(message: str) -> bool:
+    return settings.EDIT_CACHE_ENABLED and not _CONTEXTUAL.search(normalize(message))
+
+
+def _key(digest: str, normalized: str) -> str:
+    return hashlib.sha256(f"{digest}:{normalized}".encode("utf-8")).hexdigest()
+
+
+def _grams(normalized: str) -> Set[str]:
+    compact = normalized.replace(" ", "")
+    if len(compact) < 3:
+        return {compact} if compact else set()
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+def _signature(normalized: str) -> str:
+    """
+    근사 적중이 허용되려면 같아야 하는 값 (숫자, 축, 색상)
+    "2배로 키워줘"와 "3배로 키워줘"처럼 글자는 비슷해도 파라미터가 다른 요청을 구분
+    """
+    numbers = re.findall(r"\d+(?:\.\d+)?", normalized)
+    axes = re.findall(r"([xyz])\s*(?:축|axis)", normalized)
+    color = intent_parser.parse_color(normalized)
+    return json.dumps([numbers, sorted(axes), color], sort_keys=True)
+
+
+def lookup(message: str, digest: str) -> Optional[dict]:
+    """캐시된 편집 명령 반환 (정확 일치 -> 근사 일치 순, 없으면 None)"""
+    if not cacheable(message):
+        return None
+
+    normalized = normalize(message)
+    key = _key(digest, normalized)
+    entry = redis_client.hgetall(ENTRY_KEY.format(key))
+    tier = "hits"
+
+    if not entry and settings.EDIT_CACHE_SIMILARITY_ENABLED:
+        key, entry = _nearest(normalized, digest)
+        tier = "near_hits"
+
+    if not entry:
+        redis_client.hincrby(STATS_KEY, "misses", 1)
+        return None
+
+    pipe = redis_client.pipeline()
+    pipe.zadd(LRU_KEY, {key: time.time()})
+    pipe.expire(ENTRY_KEY.format(key), settings.EDIT_CACHE_TTL)
+    pipe.hincrby(STATS_KEY, tier, 1)
+    pipe.hincrbyfloat(STATS_KEY, "saved_ms", float(entry.get("llm_ms", 0)))
+    pipe.execute()
+    print(f"[EditCache] {'적중' if tier == 'hits' else '근사 적중'}: {message!r} -> {entry.get('message')!r}")
+    return json.loads(entry["plan"])
+
+
+def _nearest(normalized: str, digest: str):
+    """3-gram 역색인으로 후보를 모아 Jaccard 유사도가 가장 높은 항목 선택"""
+    grams = _grams(normalized)
+    if not grams:
+        return None, None
+
+    pipe = redis_client.pipeline()
+    for gram in grams:
+        pipe.smembers(GRAM_KEY.format(digest, gram))
+    shared: Dict[str, int] = {}
+    for members in pipe.execute():
+        for member in members:
+            shared[member] = shared.get(member, 0) + 1
+    if not shared:
+        return None, None
+
+    candidates = sorted(shared, key=shared.get, reverse=True)[:_MAX_CANDIDATES]
+    pipe = redis_client.pipeline()
+    for candidate in candidates:
+        pipe.hgetall(ENTRY_KEY.format(candidate))
+    entries = pipe.execute()
+
+    signature = _signature(normalized)
+    best_key, best_entry, best_score = None, None, settings.EDIT_CACHE_SIMILARITY_THRESHOLD
+    for candidate, entry in zip(candidates, entries):
+        if not entry:
+            # TTL로 만료된 항목의 색인은 여기서 정리
+            _drop(candidate, digest, grams)
+            continue
+        if entry.get("signature") != signature:
+            continue
+        score = shared[candidate] / (len(grams) + int(entry.get("grams", 0)) - shared[candidate])
+        if score >= best_score:
+            best_key, best_entry, best_score = candidate, entry, score
+    return best_key, best_entry
+
+
+def store(message: str, digest: str, plan: dict, llm_ms: float):
+    """LLM이 생성해 성공적으로 실행된 편집 명령을 캐시에 저장하고 최대 개수 초과분을 LRU 순으로 제거"""
+    if not cacheable(message):
+        return
+
+    normalized = normalize(message)
+    key = _key(digest, normalized)
+    grams = _grams(normalized)
+
+    pipe = redis_client.pipeline()
+    pipe.hset(ENTRY_KEY.format(key), mapping={
+        "digest": digest,
+        "message": normalized,
+        "plan": json.dumps(plan, ensure_ascii=False),
+        "signature": _signature(normalized),
+        "grams": len(grams),
+        "llm_ms": round(llm_ms, 1),
+        "created_at": time.time(),
+    })
+    pipe.expire(ENTRY_KEY.format(key), settings.EDIT_CACHE_TTL)
+    pipe.zadd(LRU_KEY, {key: time.time()})
+    if settings.EDIT_CACHE_SIMILARITY_ENABLED:
+        for gram in grams:
+            pipe.sadd(GRAM_KEY.format(digest, gram), key)
+            pipe.expire(GRAM_KEY.format(digest, gram), settings.EDIT_CACHE_TTL)
+    pipe.execute()
+
+    _evict()
+
+
+def record_llm_call(llm_ms: float):
+    """실제 LLM 호출 횟수와 시간 누적 (적중 시 절약한 시간과 비교용)"""
+    pipe = redis_client.pipeline()
+    pipe.hincrby(STATS_KEY, "llm_calls", 1)
+    pipe.hincrbyfloat(STATS_KEY, "llm_ms", llm_ms)
+    pipe.execute()
+
+
+def stats() -> dict:
+    """적중률 및 절약한 LLM 호출 시간 통계"""
+    pipe = redis_client.pipeline()
+    pipe.hgetall(STATS_KEY)
+    pipe.zcard(LRU_KEY)
+    counters, entries = pipe.execute()
+
+    hits = int(counters.get("hits", 0))
+    near_hits = int(counters.get("near_hits", 0))
+    misses = int(counters.get("misses", 0))
+    lookups = hits + near_hits + misses
+    saved_ms = float(counters.get("saved_ms", 0))
+    llm_calls = int(counters.get("llm_calls", 0))
+    return {
+        "enabled": settings.EDIT_CACHE_ENABLED,
+        "hits": hits,
+        "near_hits": near_hits,
+        "misses": misses,
+        "hit_ratio": round((hits + near_hits) / lookups, 4) if lookups else 0.0,
+        "saved_ms": round(saved_ms, 1),
+        "llm_calls": llm_calls,
+        "avg_llm_ms": round(float(counters.get("llm_ms", 0)) / llm_calls, 1) if llm_calls else 0.0,
+        "evictions": int(counters.get("evictions", 0)),
+        "entries": entries,
+        "max_entries": settings.EDIT_CACHE_MAX_ENTRIES,
+    }
+
+
+def _evict():
+    overflow = redis_client.zcard(LRU_KEY) - settings.EDIT_CACHE_MAX_ENTRIES
+    if overflow <= 0:
+        return
+    for key, _ in redis_client.zpopmin(LRU_KEY, overflow):
+        entry = redis_client.hgetall(ENTRY_KEY.format(key))
+        _drop(key, entry.get("digest"), _grams(entry.get("message", "")))
+        redis_client.hincrby(STATS_KEY, "evictions", 1)
+
+
+def _drop(key: str, digest: Optional[str], grams: Set[str]):
+    pipe = redis_client.pipeline()
+    pipe.delete(ENTRY_KEY.format(key))
+    pipe.zrem(LRU_KEY, key)
+    if digest:
+        for gram in grams:
+            pipe.srem(GRAM_KEY.format(digest, gram), key)
+    pipe.execute()
@@ -0,0 +1,171 @@
+"""
+Generation Cache
+이미지 바이트와 정규화된 AI 옵션의 해시로 이미 생성된 GLB를 재사용하는 콘텐츠 주소 기반 캐시
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import redis
+from typing import List, Optional
+from app.core.config import settings
+
+# 캐시 파일은 하드링크로 작업별 모델 파일과 같은 inode를 공유하므로 OUTPUT_DIR와 같은 파일시스템에 둠
+CACHE_DIR = settings.OUTPUT_DIR / ".cache"
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+# 캐시 키에 포함되는 옵션 (결과물에 영향을 주는 값만)
+CACHE_OPTION_FIELDS = ("enable_pbr", "should_remesh", "should_texture", "ai_model")
+
+ENTRY_KEY = "gencache:entry:{}"
+INFLIGHT_KEY = "gencache:inflight:{}"
+WAITERS_KEY = "gencache:waiters:{}"
+LRU_KEY = "gencache:lru"
+BYTES_KEY = "gencache:bytes"
+STATS_KEY = "gencache:stats"
+
+redis_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    decode_responses=True
+)
+
+
+def cache_key(image_digest: str, options: dict) -> str:
+    """이미지 SHA-256과 정규화된 옵션으로 캐시 키 생성"""
+    normalized = json.dumps({field: options.get(field) for field in CACHE_OPTION_FIELDS}, sort_keys=True)
+    return hashlib.sha256(f"{image_digest}:{normalized}".encode("utf-8")).hexdigest()
+
+
+def lookup(key: str) -> Optional[str]:
+    """캐시된 GLB 경로 반환 (없거나 파일이 사라졌으면 None)"""
+    if not settings.GENERATION_CACHE_ENABLED:
+        return None
+
+    entry = redis_client.hgetall(ENTRY_KEY.format(key))
+    if not entry:
+        return None
+
+    path = entry.get("path")
+    if not path or not os.path.exists(path):
+        _drop_entry(key, int(entry.get("size", 0)))
+        return None
+
+    pipe = redis_client.pipeline()
+    pipe.zadd(LRU_KEY, {key: time.time()})
+    pipe.hincrby(ENTRY_KEY.format(key), "hits", 1)
+    pipe.execute()
+    return path
+
+
+def link_model(source_path: str, dest_path: str):
+    """캐시된 모델을 작업 경로에 하드링크 (지원하지 않는 파일시스템이면 복사)"""
+    tmp_path = os.path.join(os.path.dirname(dest_path), f".{uuid.uuid4().hex}.part")
+    try:
+        os.link(source_path, tmp_path)
+    except OSError:
+        shutil.copyfile(source_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+
+
+def claim(key: str, task_id: str) -> bool:
+    """
+    같은 키의 외부 작업을 하나로 합치기 위해 선점 시도
+    True면 이 작업이 실제 생성을 담당하고, False면 진행 중인 작업의 결과를 기다리는 대기자로 등록됨
+    """
+    if redis_client.set(INFLIGHT_KEY.format(key), task_id, nx=True, ex=settings.GENERATION_CACHE_INFLIGHT_TTL):
+        return True
+
+    pipe = redis_client.pipeline()
+    pipe.rpush(WAITERS_KEY.format(key), task_id)
+    pipe.expire(WAITERS_KEY.format(key), settings.GENERATION_CACHE_INFLIGHT_TTL)
+    pipe.hincrby(STATS_KEY, "collapsed", 1)
+    pipe.execute()
+    return False
+
+
+def release(key: str) -> List[str]:
+    """선점 해제 후 결과를 기다리던 작업 ID 목록을 꺼내 반환"""
+    pipe = redis_client.pipeline()
+    pipe.delete(INFLIGHT_KEY.format(key))
+    pipe.lrange(WAITERS_KEY.format(key), 0, -1)
+    pipe.delete(WAITERS_KEY.format(key))
+    _, waiters, _ = pipe.execute()
+    return waiters
+
+
+def store(key: str, model_path: str):
+    """생성 완료된 모델을 캐시에 등록하고 용량 초과분을 LRU 순으로 제거"""
+    if not settings.GENERATION_CACHE_ENABLED:
+        return
+
+    cache_path = os.path.join(CACHE_DIR, f"{key}.glb")
+    link_model(model_path, cache_path)
+    size = os.path.getsize(cache_path)
+
+    previous_size = redis_client.hget(ENTRY_KEY.format(key), "size")
+    pipe = redis_client.pipeline()
+    pipe.hset(ENTRY_KEY.format(key), mapping={"path": cache_path, "size": size, "created_at": time.time(), "hits": 0})
+    pipe.zadd(LRU_KEY, {key: time.time()})
+    pipe.incrby(BYTES_KEY, size - int(previous_size or 0))
+    pipe.execute()
+
+    _evict()
+
+
+def record(hit: bool):
+    """캐시 적중/실패 카운터 증가"""
+    redis_client.hincrby(STATS_KEY, "hits" if hit else "misses", 1)
+
+
+def stats() -> dict:
+    """캐시 적중률 및 사용량 통계"""
+    pipe = redis_client.pipeline()
+    pipe.hgetall(STATS_KEY)
+    pipe.zcard(LRU_KEY)
+    pipe.get(BYTES_KEY)
+    counters, entries, total_bytes = pipe.execute()
+
+    hits = int(counters.get("hits", 0))
+    misses = int(counters.get("misses", 0))
+    lookups = hits + misses
+    return {
+        "enabled": settings.GENERATION_CACHE_ENABLED,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        "collapsed": int(counters.get("collapsed", 0)),
+        "evictions": int(counters.get("evictions", 0)),
+        "entries": entries,
+        "bytes": int(total_bytes or 0),
+        "max_bytes": settings.GENERATION_CACHE_MAX_BYTES,
+    }
+
+
+def _evict():
+    while int(redis_client.get(BYTES_KEY) or 0) > settings.GENERATION_CACHE_MAX_BYTES:
+        oldest = redis_client.zpopmin(LRU_KEY, 1)
+        if not oldest:
+            redis_client.set(BYTES_KEY, 0)
+            break
+
+        key, _ = oldest[0]
+        entry = redis_client.hgetall(ENTRY_KEY.format(key))
+        path = entry.get("path")
+        if path and os.path.exists(path):
+            # 작업별 모델 파일은 하드링크라서 캐시 파일을 지워도 남아 있음
+            os.remove(path)
+        _drop_entry(key, int(entry.get("size", 0)))
+        redis_client.hincrby(STATS_KEY, "evictions", 1)
+        print(f"[GenerationCache] LRU 제거: {key}")
+
+
+def _drop_entry(key: str, size: int):
+    pipe = redis_client.pipeline()
+    pipe.delete(ENTRY_KEY.format(key))
+    pipe.zrem(LRU_KEY, key)
+    pipe.decrby(BYTES_KEY, size)
+    pipe.execute()
@@ -0,0 +1,263 @@
+"""
+GLB Editor
+Blender 없이 GLB 파일의 JSON 청크만 고쳐 쓰는 경량 편집기
+노드 변환(크기/회전)과 재질 값(색상/금속성/거칠기)만 바꾸는 명령은 씬 import/export 없이
+JSON 청크를 패치하고 BIN 청크(메쉬/텍스처 데이터)는 그대로 복사하여 밀리초 단위로 처리
+
+편집 대상과 결과는 Blender 애드온(edit_targets / apply_edit)과 같게 맞춤
+- 대상: 메쉬가 있는 모든 노드 (Blender의 모든 MESH 객체)
+- scale_model: 노드 scale에 배율을 곱함 (obj.scale *= factor)
+- rotate_model: 부모 좌표계 기준 축 회전 (Blender Z-up 축을 glTF Y-up 축으로 변환)
+- change_color: 기존 재질 대신 (색상, metallic, roughness)마다 하나씩 공유하는 단색 재질 적용 (텍스처 연결 제거)
+- change_material: 각 메쉬의 첫 번째 재질의 metallic / roughness 값 변경 (공유 단색 재질이면 새 값의 단색 재질로 교체)
+어떤 프리미티브도 쓰지 않게 된 재질은 JSON에서 제거
+"""
+import os
+import json
+import math
+import mmap
+import struct
+import uuid
+import hashlib
+from typing import Any, Dict, List, Tuple
+
+GLB_MAGIC = b"glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+# Blender에서 씬을 다시 만들 필요 없이 JSON만 바꿔서 처리할 수 있는 명령
+FAST_PATH_COMMANDS = {"scale_model", "rotate_model", "change_color", "change_material"}
+
+# 애드온과 같은 공유 단색 재질 이름 규칙 (blender_mcp_addon.flat_material_name)
+FLAT_MATERIAL_PREFIX = "MCP_Flat_"
+
+# Blender 축(Z-up) -> glTF 축(Y-up) 단위 벡터
+_AXES = {"X": (1.0, 0.0, 0.0), "Y": (0.0, 0.0, -1.0), "Z": (0.0, 1.0, 0.0)}
+
+
+class GLBError(Exception):
+    """GLB 파일을 해석할 수 없거나 지원하지 않는 형식"""
+
+
+def supports(commands: List[dict]) -> bool:
+    """모든 명령이 JSON 패치만으로 처리 가능한지 여부"""
+    return bool(commands) and all(command.get("command") in FAST_PATH_COMMANDS for command in commands)
+
+
+def _quat_multiply(a, b):
+    ax, ay, az, aw = a
+    bx, by, bz, bw = b
+    return [
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+        aw * bw - ax * bx - ay * by - az * bz,
+    ]
+
+
+def _quat_from_matrix(m) -> List[float]:
+    """3x3 회전 행렬(행 우선) -> 쿼터니언 (x, y, z, w)"""
+    trace = m[0][0] + m[1][1] + m[2][2]
+    if trace > 0:
+        s = math.sqrt(trace + 1.0) * 2
+        return [(m[2][1] - m[1][2]) / s, (m[0][2] - m[2][0]) / s, (m[1][0] - m[0][1]) / s, 0.25 * s]
+    if m[0][0] > m[1][1] and m[0][0] > m[2][2]:
+        s = math.sqrt(1.0 + m[0][0] - m[1][1] - m[2][2]) * 2
+        return [0.25 * s, (m[0][1] + m[1][0]) / s, (m[0][2] + m[2][0]) / s, (m[2][1] - m[1][2]) / s]
+    if m[1][1] > m[2][2]:
+        s = math.sqrt(1.0 + m[1][1] - m[0][0] - m[2][2]) * 2
+        return [(m[0][1] + m[1][0]) / s, 0.25 * s, (m[1][2] + m[2][1]) / s, (m[0][2] - m[2][0]) / s]
+    s = math.sqrt(1.0 + m[2][2] - m[0][0] - m[1][1]) * 2
+    return [(m[0][2] + m[2][0]) / s, (m[1][2] + m[2][1]) / s, 0.25 * s, (m[1][0] - m[0][1]) / s]
+
+
+def _to_trs(node: Dict[str, Any]):
+    """matrix로 지정된 노드를 translation / rotation / scale로 분해 (전단 변형은 없다고 가정)"""
+    matrix = node.pop("matrix", None)
+    if matrix is None:
+        return
+    columns = [matrix[0:3], matrix[4:7], matrix[8:11]]  # glTF 행렬은 열 우선
+    scale = [math.sqrt(sum(value * value for value in column)) for column in columns]
+    if any(value == 0 for value in scale):
+        raise GLBError("크기가 0인 노드 행렬은 분해할 수 없습니다.")
+    rotation = [[columns[col][row] / scale[col] for col in range(3)] for row in range(3)]
+    node["translation"] = list(matrix[12:15])
+    node["rotation"] = _quat_from_matrix(rotation)
+    node["scale"] = scale
+
+
+def _mesh_nodes(gltf: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [node for node in gltf.get("nodes", []) if "mesh" in node]
+
+
+def _scale(gltf: Dict[str, Any], params: dict):
+    factor = float(params.get("factor", 1.0))
+    for node in _mesh_nodes(gltf):
+        _to_trs(node)
+        node["scale"] = [value * factor for value in node.get("scale", [1.0, 1.0, 1.0])]
+
+
+def _rotate(gltf: Dict[str, Any], params: dict):
+    axis = _AXES.get(str(params.get("axis", "Z")).upper())
+    if axis is None:
+        raise GLBError(f"알 수 없는 회전 축: {params.get('axis')}")
+    half = math.radians(float(params.get("angle", 90))) / 2
+    delta = [axis[0] * math.sin(half), axis[1] * math.sin(half), axis[2] * math.sin(half), math.cos(half)]
+    for node in _mesh_nodes(gltf):
+        _to_trs(node)
+        node["rotation"] = _quat_multiply(delta, node.get("rotation", [0.0, 0.0, 0.0, 1.0]))
+
+
+def _flat_material(gltf: Dict[str, Any], color: List[float], metallic: float, roughness: float) -> int:
+    """(색상, metallic, roughness)에 해당하는 공유 단색 재질의 인덱스 (없으면 추가)"""
+    key = tuple(round(float(value), 4) for value in (*color, metallic, roughness))
+    name = FLAT_MATERIAL_PREFIX + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:12]
+    materials = gltf.setdefault("materials", [])
+    for index, material in enumerate(materials):
+        if material.get("name") == name:
+            return index
+    materials.append({
+        "name": name,
+        "pbrMetallicRoughness": {"baseColorFactor": list(color), "metallicFactor": metallic, "roughnessFactor": roughness},
+    })
+    return len(materials) - 1
+
+
+def _change_color(gltf: Dict[str, Any], params: dict):
+    color = [float(params.get("r", 0.0)), float(params.get("g", 0.3)), float(params.get("b", 1.0)), float(params.get("a", 1.0))]
+    # Blender와 같이 Principled BSDF 기본값(metallic 0, roughness 0.5)의 단색 재질 하나를 모든 메쉬가 공유
+    material = _flat_material(gltf, color, 0.0, 0.5)
+    meshes = gltf.get("meshes", [])
+    for node in _mesh_nodes(gltf):
+        for primitive in meshes[node["mesh"]].get("primitives", []):
+            primitive["material"] = material
+
+
+def _change_material(gltf: Dict[str, Any], params: dict):
+    metallic = float(params.get("metallic", 0.0))
+    roughness = float(params.get("roughness", 0.5))
+    materials = gltf.get("materials", [])
+    meshes = gltf.get("meshes", [])
+    for node in _mesh_nodes(gltf):
+        primitives = meshes[node["mesh"]].get("primitives", [])
+        if not primitives or "material" not in primitives[0]:
+            continue
+        current = materials[primitives[0]["material"]]
+        pbr = current.setdefault("pbrMetallicRoughness", {})
+        if current.get("name", "").startswith(FLAT_MATERIAL_PREFIX):
+            # 공유 단색 재질은 직접 고치지 않고 같은 색상 + 새 값의 재질로 교체
+            primitives[0]["material"] = _flat_material(
+                gltf, pbr.get("baseColorFactor", [1.0, 1.0, 1.0, 1.0]), metallic, roughness
+            )
+        else:
+            pbr["metallicFactor"] = metallic
+            pbr["roughnessFactor"] = roughness
+
+
+def _prune_materials(gltf: Dict[str, Any]):
+    """어떤 프리미티브도 쓰지 않는 재질을 제거하고 인덱스를 다시 매김 (텍스처가 담긴 BIN 청크는 그대로)"""
+    materials = gltf.get("materials")
+    if not materials or "KHR_materials_variants" in gltf.get("extensionsUsed", []):
+        # 변형(variants) 확장은 프리미티브 밖에서 재질 인덱스를 참조하므로 건드리지 않음
+        return
+    primitives = [primitive for mesh in gltf.get("meshes", []) for primitive in mesh.get("primitives", [])]
+    used = sorted({primitive["material"] for primitive in primitives if "material" in primitive})
+    if len(used) == len(materials):
+        return
+    remap = {old: new for new, old in enumerate(used)}
+    gltf["materials"] = [materials[index] for index in used]
+    for primitive in primitives:
+        if "material" in primitive:
+            primitive["material"] = remap[primitive["material"]]
+
+
+_HANDLERS = {
+    "scale_model": _scale,
+    "rotate_model": _rotate,
+    "change_color": _change_color,
+    "change_material": _change_material,
+}
+
+
+def _read_header(data) -> Tuple[int, int]:
+    """GLB 헤더와 JSON 청크 헤더 검증 후 (JSON 청크 길이, BIN 청크 시작 위치) 반환"""
+    if len(data) < 20 or data[0:4] != GLB_MAGIC:
+        raise GLBError("GLB 파일이 아닙니다.")
+    version, length = struct.unpack_from("<II", data, 4)
+    if version != 2:
+        raise GLBError(f"지원하지 않는 glTF 버전: {version}")
+    if length > len(data):
+        raise GLBError("GLB 파일이 잘렸습니다.")
+    json_length, json_type = struct.unpack_from("<II", data, 12)
+    if json_type != CHUNK_JSON:
+        raise GLBError("첫 번째 청크가 JSON이 아닙니다.")
+    return json_length, 20 + json_length
+
+
+def _map(f) -> mmap.mmap:
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # 빈 파일은 mmap할 수 없음
+        raise GLBError("빈 파일입니다.")
+
+
+def _load_json(data, rest_offset: int) -> Dict[str, Any]:
+    try:
+        gltf = json.loads(bytes(data[20:rest_offset]))
+    except ValueError as e:
+        raise GLBError(f"JSON 청크를 해석할 수 없습니다: {e}")
+    if not isinstance(gltf, dict):
+        raise GLBError("JSON 청크가 객체가 아닙니다.")
+    return gltf
+
+
+def read_json(path: str) -> Dict[str, Any]:
+    """GLB의 JSON 청크만 해석 (BIN 청크는 읽지 않음)"""
+    with open(path, "rb") as f, _map(f) as data:
+        _, rest_offset = _read_header(data)
+        return _load_json(data, rest_offset)
+
+
+def apply_edits(source_path: str, dest_path: str, commands: List[dict]) -> Dict[str, Any]:
+    """
+    source_path의 GLB에 편집 명령을 적용해 dest_path에 저장 (source와 dest가 같아도 됨)
+    BIN 청크는 mmap으로 읽어 그대로 복사하고, 임시 파일에 쓴 뒤 교체하므로 실패해도 원본은 유지됨
+    교체는 원본의 mmap과 파일 핸들을 닫은 뒤에 함 (Windows는 열려 있는 파일을 교체할 수 없음)
+    """
+    tmp_path = os.path.join(os.path.dirname(dest_path) or ".", f".{uuid.uuid4().hex}.part")
+    try:
+        with open(source_path, "rb") as f, _map(f) as data:
+            _, rest_offset = _read_header(data)
+            total_length = struct.unpack_from("<I", data, 8)[0]
+            gltf = _load_json(data, rest_offset)
+
+            for command in commands:
+                handler = _HANDLERS.get(command.get("command"))
+                if handler is None:
+                    raise GLBError(f"지원하지 않는 명령: {command.get('command')}")
+                try:
+                    handler(gltf, command.get("params") or {})
+                except (ValueError, TypeError, KeyError, IndexError, AttributeError) as e:
+                    # 숫자가 아닌 파라미터, materials / meshes가 없거나 범위를 벗어난 인덱스 등
+                    raise GLBError(f"{command.get('command')} 명령을 적용할 수 없습니다: {e!r}") from e
+            try:
+                _prune_materials(gltf)
+            except (TypeError, KeyError, IndexError, AttributeError) as e:
+                raise GLBError(f"재질 인덱스를 정리할 수 없습니다: {e!r}") from e
+
+            # JSON 청크는 4바이트 정렬을 위해 공백으로 채움
+            json_bytes = json.dumps(gltf, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            json_bytes += b" " * (-len(json_bytes) % 4)
+            with open(tmp_path, "wb") as out, memoryview(data) as view, view[rest_offset:total_length] as rest:
+                out.write(struct.pack("<4sII", GLB_MAGIC, 2, 12 + 8 + len(json_bytes) + len(rest)))
+                out.write(struct.pack("<II", len(json_bytes), CHUNK_JSON))
+                out.write(json_bytes)
+                out.write(rest)  # BIN 청크 (헤더 포함) 그대로
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return {"json_bytes": len(json_bytes), "bin_bytes": total_length - rest_offset}
@@ -0,0 +1,309 @@
+"""
+GLB Optimizer
+gltfpack으로 원본 GLB 옆에 전송용 변형을 생성
+- 최적화 변형({이름}.opt.glb): 메쉬 양자화(KHR_mesh_quantization) + meshopt 압축(EXT_meshopt_compression),
+  텍스처는 KTX2(Basis Universal) 또는 WebP로 변환 (GLB_OPTIMIZE_TEXTURES)
+- LOD 체인({이름}.lod1.glb, {이름}.lod2.glb ...): meshoptimizer의 quadric error 단순화(-si)로 삼각형 수를 줄인 단계별 모델
+  (같은 압축 적용) + 매니페스트({이름}.lods.json), 뷰어는 가장 거친 단계부터 받아 점차 교체
+
+원본은 그대로 두므로 편집(Blender / GLB 직접 편집)은 항상 원본으로 하고, 클라이언트가 받을 변형을 선택
+gltfpack은 별도 프로세스로 실행하고 프로세스당 동시 실행 수를 제한함
+gltfpack이 설치되어 있지 않으면 아무것도 하지 않음 (변형 요청 시 원본을 내려줌)
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import redis
+from typing import Dict, List, Optional, Set
+from app.core.config import settings
+from app.services import glb_editor
+
+VARIANTS = ("original", "optimized")
+
+STATS_KEY = "glbopt:stats"
+
+_TEXTURE_FLAGS = {"ktx2": ["-tc"], "webp": ["-tw"], "": []}
+
+redis_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    decode_responses=True
+)
+
+# 프로세스당 동시에 실행하는 gltfpack 수 (텍스처 변환은 CPU를 많이 씀)
+_slots: Optional[asyncio.Semaphore] = None
+# 백그라운드 최적화: 경로 -> 실행 중인 태스크, 실행 중에 원본이 다시 바뀐 경로
+_running: Dict[str, asyncio.Task] = {}
+_rerun: Set[str] = set()
+
+
+def optimized_path(path) -> str:
+    root, ext = os.path.splitext(str(path))
+    return f"{root}.opt{ext}"
+
+
+def lod_path(path, level: int) -> str:
+    root, ext = os.path.splitext(str(path))
+    return f"{root}.lod{level}{ext}"
+
+
+def manifest_path(path) -> str:
+    root, _ = os.path.splitext(str(path))
+    return f"{root}.lods.json"
+
+
+def _gltfpack() -> Optional[str]:
+    return shutil.which(settings.GLTFPACK_PATH)
+
+
+def available() -> bool:
+    return (settings.GLB_OPTIMIZE_ENABLED or settings.GLB_LOD_ENABLED) and _gltfpack() is not None
+
+
+def _version(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def variant_path(path, variant: str) -> str:
+    """요청한 변형의 파일 경로 (최적화 변형이 없거나 원본보다 오래되었으면 원본)"""
+    path = str(path)
+    if variant == "optimized":
+        opt_path = optimized_path(path)
+        try:
+            if os.stat(opt_path).st_mtime_ns >= os.stat(path).st_mtime_ns:
+                return opt_path
+        except FileNotFoundError:
+            pass
+    return path
+
+
+def _record(fields: Dict[str, float]):
+    try:
+        pipe = redis_client.pipeline()
+        for field, value in fields.items():
+            if isinstance(value, int):
+                pipe.hincrby(STATS_KEY, field, value)
+            else:
+                pipe.hincrbyfloat(STATS_KEY, field, value)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(f"[GLBOptimizer] 통계 기록 실패: {e}")
+
+
+def _compression_flags() -> List[str]:
+    return ["-cc", "-kn", "-km", *_TEXTURE_FLAGS.get(settings.GLB_OPTIMIZE_TEXTURES, [])]
+
+
+async def _gltfpack_run(path: str, version: tuple, dest: str, flags: List[str]) -> Optional[float]:
+    """
+    gltfpack 한 번 실행 (성공하면 소요 시간(ms), 실패하면 None)
+    임시 파일에 만든 뒤 교체하며, 처리 중에 원본이 바뀌었으면 결과를 버림
+    """
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.GLB_OPTIMIZE_CONCURRENCY)
+
+    tmp_path = os.path.join(os.path.dirname(path), f".{uuid.uuid4().hex}{os.path.splitext(dest)[1]}")
+    try:
+        async with _slots:
+            started = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                _gltfpack(), "-i", path, "-o", tmp_path, *flags,
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                _, stderr = await asyncio.wait_for(process.communicate(), timeout=settings.GLB_OPTIMIZE_TIMEOUT)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                print(f"[GLBOptimizer] 시간 초과 ({settings.GLB_OPTIMIZE_TIMEOUT:.0f}초): {dest}")
+                _record({"failures": 1})
+                return None
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if process.returncode != 0:
+            print(f"[GLBOptimizer] gltfpack 실패 ({process.returncode}): {stderr.decode(errors='replace').strip()[:500]}")
+            _record({"failures": 1})
+            return None
+        if _version(path) != version:
+            print(f"[GLBOptimizer] 처리 중 원본이 바뀌어 결과를 버림: {path}")
+            return None
+
+        os.replace(tmp_path, dest)
+        return elapsed_ms
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+async def optimize(path) -> Optional[dict]:
+    """path의 최적화 변형 생성 (gltfpack이 없거나 실패하면 None)"""
+    if not (settings.GLB_OPTIMIZE_ENABLED and available()):
+        return None
+    path = str(path)
+    version = _version(path)
+    if version is None:
+        return None
+
+    elapsed_ms = await _gltfpack_run(path, version, optimized_path(path), _compression_flags())
+    if elapsed_ms is None:
+        return None
+
+    original_bytes = version[1]
+    optimized_bytes = os.path.getsize(optimized_path(path))
+    _record({"runs": 1, "original_bytes": original_bytes, "optimized_bytes": optimized_bytes, "optimize_ms": elapsed_ms})
+    print(f"[GLBOptimizer] {os.path.basename(path)}: {original_bytes // 1024}KB -> {optimized_bytes // 1024}KB "
+          f"({elapsed_ms:.0f}ms)")
+    return {
+        "path": optimized_path(path),
+        "original_bytes": original_bytes,
+        "optimized_bytes": optimized_bytes,
+        "optimize_ms": round(elapsed_ms, 1),
+    }
+
+
+def triangle_count(path) -> Optional[int]:
+    """GLB JSON의 접근자 개수로 계산한 삼각형 수 (메쉬 인스턴스 중복은 세지 않음, 해석할 수 없으면 None)"""
+    try:
+        gltf = glb_editor.read_json(str(path))
+    except (OSError, ValueError, glb_editor.GLBError):
+        return None
+    accessors = gltf.get("accessors", [])
+    triangles = 0
+    for mesh in gltf.get("meshes", []):
+        for primitive in mesh.get("primitives", []):
+            if primitive.get("mode", 4) != 4:  # TRIANGLES만
+                continue
+            accessor = primitive.get("indices", primitive.get("attributes", {}).get("POSITION"))
+            if accessor is not None:
+                triangles += accessors[accessor].get("count", 0) // 3
+    return triangles
+
+
+async def build_lods(path) -> Optional[dict]:
+    """
+    GLB_LOD_RATIOS 비율마다 단순화한 LOD 모델과 매니페스트 생성 (gltfpack이 없거나 하나라도 실패하면 None)
+    단계들은 동시에 실행되지만 gltfpack 동시 실행 수 제한을 함께 받음
+    """
+    if not (settings.GLB_LOD_ENABLED and settings.GLB_LOD_RATIOS and available()):
+        return None
+    path = str(path)
+    version = _version(path)
+    if version is None:
+        return None
+
+    ratios = sorted(settings.GLB_LOD_RATIOS, reverse=True)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        _gltfpack_run(path, version, lod_path(path, level), ["-si", f"{ratio:g}", *_compression_flags()])
+        for level, ratio in enumerate(ratios, start=1)
+    ))
+    if any(result is None for result in results):
+        return None
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    levels = [{"level": 0, "ratio": 1.0, "file": os.path.basename(path), "bytes": version[1],
+               "triangles": triangle_count(path)}]
+    for level, ratio in enumerate(ratios, start=1):
+        levels.append({"level": level, "ratio": ratio, "file": os.path.basename(lod_path(path, level)),
+                       "bytes": os.path.getsize(lod_path(path, level)), "triangles": triangle_count(lod_path(path, level))})
+    manifest = {"source": os.path.basename(path), "source_version": list(version), "levels": levels,
+                "build_ms": round(elapsed_ms, 1), "created_at": time.time()}
+
+    tmp_path = f"{manifest_path(path)}.{uuid.uuid4().hex}.part"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_path, manifest_path(path))
+    _record({"lod_builds": 1, "lod_ms": elapsed_ms})
+    print(f"[GLBOptimizer] {os.path.basename(path)} LOD {len(levels)}단계 생성 ({elapsed_ms:.0f}ms): "
+          + ", ".join(f"{level['triangles']}" for level in levels))
+    return manifest
+
+
+def lod_manifest(path) -> dict:
+    """
+    LOD 매니페스트 (아직 없거나 원본이 바뀌어 오래된 매니페스트면 원본만 0단계로 포함)
+    levels는 0단계(원본)부터 거친 순서
+    """
+    path = str(path)
+    version = _version(path)
+    try:
+        with open(manifest_path(path)) as f:
+            manifest = json.load(f)
+        if version is not None and manifest.get("source_version") == list(version):
+            return {**manifest, "stale": False}
+    except (OSError, ValueError):
+        pass
+    return {"source": os.path.basename(path), "source_version": list(version) if version else None, "stale": True,
+            "levels": [{"level": 0, "ratio": 1.0, "file": os.path.basename(path),
+                        "bytes": version[1] if version else None, "triangles": None}]}
+
+
+def schedule(path):
+    """
+    이벤트 루프를 막지 않도록 백그라운드에서 최적화 변형과 LOD 체인 생성
+    같은 파일의 처리가 진행 중이면 끝난 뒤 최신 원본으로 한 번 더 실행 (연속 편집은 한 번으로 합쳐짐)
+    """
+    if not available():
+        return
+    path = str(path)
+    if path in _running:
+        _rerun.add(path)
+        return
+    _running[path] = asyncio.create_task(_run(path))
+
+
+async def _run(path: str):
+    try:
+        while True:
+            _rerun.discard(path)
+            for step in (optimize, build_lods):
+                try:
+                    await step(path)
+                except Exception as e:
+                    print(f"[GLBOptimizer] {step.__name__} 오류: {path} {e}")
+            if path not in _rerun:
+                break
+    finally:
+        _running.pop(path, None)
+
+
+def remove(path) -> List[str]:
+    """원본을 삭제할 때 최적화 변형, LOD 모델, 매니페스트도 삭제 (삭제한 경로 목록 반환)"""
+    removed = []
+    candidates = [optimized_path(path), manifest_path(path)]
+    candidates += [lod_path(path, level) for level in range(1, len(settings.GLB_LOD_RATIOS) + 1)]
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            os.remove(candidate)
+            removed.append(candidate)
+    return removed
+
+
+def stats() -> dict:
+    counters = redis_client.hgetall(STATS_KEY)
+    runs = int(counters.get("runs", 0))
+    original_bytes = int(counters.get("original_bytes", 0))
+    optimized_bytes = int(counters.get("optimized_bytes", 0))
+    return {
+        "available": _gltfpack() is not None,
+        "textures": settings.GLB_OPTIMIZE_TEXTURES or None,
+        "runs": runs,
+        "failures": int(counters.get("failures", 0)),
+        "original_bytes": original_bytes,
+        "optimized_bytes": optimized_bytes,
+        "size_ratio": round(optimized_bytes / original_bytes, 4) if original_bytes else None,
+        "avg_optimize_ms": round(float(counters.get("optimize_ms", 0)) / runs, 1) if runs else 0.0,
+        "lod_ratios": settings.GLB_LOD_RATIOS if settings.GLB_LOD_ENABLED else [],
+        "lod_builds": int(counters.get("lod_builds", 0)),
+        "avg_lod_ms": round(float(counters.get("lod_ms", 0)) / int(counters["lod_builds"]), 1)
+        if counters.get("lod_builds") else 0.0,
+    }
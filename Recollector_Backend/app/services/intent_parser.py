@@ -0,0 +1,400 @@
+"""
+Intent Parser
+채팅 메시지에서 편집 명령을 규칙 기반으로 바로 추출하는 로컬 파서
+명확한 요청("2배로 키워줘", "빨간색으로 바꿔줘", "Z축으로 45도 회전")은 LLM을 거치지 않고 처리하고,
+신뢰도가 임계값보다 낮으면 LLM에 넘김
+"""
+import re
+import redis
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+STATS_KEY = "intent:stats"
+
+redis_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    decode_responses=True
+)
+
+COLOR_TABLE = {
+    "빨간": (1.0, 0.0, 0.0), "빨강": (1.0, 0.0, 0.0), "빨갛": (1.0, 0.0, 0.0), "red": (1.0, 0.0, 0.0),
+    "파란": (0.0, 0.3, 1.0), "파랑": (0.0, 0.3, 1.0), "파랗": (0.0, 0.3, 1.0), "blue": (0.0, 0.3, 1.0),
+    "초록": (0.0, 1.0, 0.0), "녹색": (0.0, 1.0, 0.0), "green": (0.0, 1.0, 0.0),
+    "노란": (1.0, 1.0, 0.0), "노랑": (1.0, 1.0, 0.0), "노랗": (1.0, 1.0, 0.0), "yellow": (1.0, 1.0, 0.0),
+    "보라": (0.5, 0.0, 1.0), "purple": (0.5, 0.0, 1.0),
+    "주황": (1.0, 0.5, 0.0), "orange": (1.0, 0.5, 0.0),
+    "분홍": (1.0, 0.4, 0.7), "핑크": (1.0, 0.4, 0.7), "pink": (1.0, 0.4, 0.7),
+    "하늘색": (0.5, 0.8, 1.0), "sky blue": (0.5, 0.8, 1.0),
+    "회색": (0.5, 0.5, 0.5), "gray": (0.5, 0.5, 0.5), "grey": (0.5, 0.5, 0.5),
+    "갈색": (0.4, 0.25, 0.1), "brown": (0.4, 0.25, 0.1),
+    "흰": (1.0, 1.0, 1.0), "하얀": (1.0, 1.0, 1.0), "하얗": (1.0, 1.0, 1.0), "white": (1.0, 1.0, 1.0),
+    "검은": (0.0, 0.0, 0.0), "검정": (0.0, 0.0, 0.0), "까만": (0.0, 0.0, 0.0), "black": (0.0, 0.0, 0.0),
+}
+
+# 로컬에서 바로 처리하는 값의 범위 (벗어나면 오타이거나 모델을 망가뜨릴 수 있으므로 LLM에 맡김)
+SCALE_FACTOR_RANGE = (0.01, 100.0)
+SUBDIVIDE_LEVELS_RANGE = (1, 6)
+ARRAY_COUNT_RANGE = (2, 50)
+MAX_ROTATION_ANGLE = 360
+
+KOREAN_NUMBERS = {"한": 1, "두": 2, "세": 3, "네": 4, "다섯": 5, "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10}
+
+OBJECT_TYPES = [
+    (r"정육면체|큐브|상자|cube|box", "CUBE"),
+    (r"원기둥|실린더|cylinder", "CYLINDER"),
+    (r"원뿔|cone", "CONE"),
+    (r"(?<![가-힣])(?:구|공)(?=체|를|가|\s|$)|sphere|ball", "SPHERE"),
+]
+
+# 한 메시지에 여러 요청이 있을 때 절 단위로 나누는 구분자
+_CLAUSE_SPLIT = re.compile(
+    r"\s*(?:,(?![^(]*\))|그리고|그 다음|한 다음|한 뒤|하고 나서|\band\b|\bthen\b|(?<=[하꾸우이리들칠넣])고\s)\s*"
+)
+
+# 앞에 숫자/영문/소수점이 붙은 숫자는 읽지 않음 ("1e9"의 "9", "1.5"의 "5")
+_NUMBER = r"(?<![a-z0-9.])(\d+(?:\.\d+)?)(?![0-9.]|e\d)"
+_COUNT_NUMBER = r"(?<![a-z0-9.])(\d+|" + "|".join(sorted(KOREAN_NUMBERS, key=len, reverse=True)) + r")"
+
+# 모델의 일부만 가리키는 말 ("눈만", "머리를") - 편집 명령은 항상 모델 전체에 적용되므로 LLM에 맡김
+_PART_TARGET = re.compile(
+    r"(?<![가-힣])(?:눈|머리|얼굴|귀|코|입|목|팔|다리|손|발|몸통|몸|꼬리|날개|뿔|모자|옷|신발|바닥|받침|지붕|창문|문|"
+    r"부분|일부|윗부분|아랫부분|앞면|뒷면|옆면|테두리)(?:만|을|를|이|가|은|는|의|도|쪽|에|\s|$)"
+    r"|[가-힣]만(?=\s|$)"
+    r"|\b(?:only|just the|head|eyes?|arms?|legs?|hands?|feet|foot|tail|wings?|hat|part)\b"
+)
+
+# 명령으로 표현할 수 없는 대상이나 효과 (배경, 무늬, 되돌리기 등)
+_UNSUPPORTED = re.compile(
+    r"배경|줄무늬|무늬|패턴|체크|그라데이션|그라디언트|텍스처|질감|조명|빛|그림자|투명|글자|로고|원래|되돌|취소|"
+    r"\b(?:background|stripes?|pattern|gradient|texture|light|lighting|shadow|transparent|original|undo|revert)\b"
+)
+
+# 정도를 숫자 없이 말하는 표현 (조금, 많이 등)
+_VAGUE_SMALL = re.compile(r"조금|약간|살짝|좀|\bslightly\b|\ba bit\b|\ba little\b")
+_VAGUE_LARGE = re.compile(r"많이|훨씬|엄청|아주|\bmuch\b|\ba lot\b")
+_SHRINK = re.compile(r"작게|줄여|줄이|축소|shrink|smaller")
+
+
+@dataclass
+class ParsedIntent:
+    """파싱 결과 (명령 목록과 0~1 사이 신뢰도)"""
+    commands: List[Dict[str, Any]] = field(default_factory=list)
+    descriptions: List[str] = field(default_factory=list)
+    confidence: float = 0.0
+
+    @property
+    def description(self) -> str:
+        return ", ".join(self.descriptions)
+
+    def to_plan(self) -> Dict[str, Any]:
+        """chat_edit이 Blender에 보내는 형식으로 변환"""
+        if len(self.commands) == 1:
+            return {**self.commands[0], "description": self.description}
+        return {"commands": self.commands, "description": self.description}
+
+
+def parse_color(text: str) -> Optional[Dict[str, float]]:
+    """색상 이름, #RRGGBB, rgb(r, g, b)에서 RGBA 값 추출"""
+    lowered = text.lower()
+
+    hex_match = re.search(r"#([0-9a-f]{6})\b", lowered)
+    if hex_match:
+        value = hex_match.group(1)
+        r, g, b = (int(value[i:i + 2], 16) / 255 for i in (0, 2, 4))
+        return {"r": round(r, 3), "g": round(g, 3), "b": round(b, 3), "a": 1.0}
+
+    rgb_match = re.search(r"rgb\s*\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)", lowered)
+    if rgb_match:
+        r, g, b = (min(int(value), 255) / 255 for value in rgb_match.groups())
+        return {"r": round(r, 3), "g": round(g, 3), "b": round(b, 3), "a": 1.0}
+
+    for keyword in sorted(COLOR_TABLE, key=len, reverse=True):
+        if keyword in lowered:
+            r, g, b = COLOR_TABLE[keyword]
+            return {"r": r, "g": g, "b": b, "a": 1.0}
+    return None
+
+
+def _color_names(text: str) -> List[Tuple[float, float, float]]:
+    """문장에 나온 서로 다른 색상 이름들 (긴 이름부터 찾고, 찾은 부분은 다시 세지 않음)"""
+    lowered = text.lower()
+    found = []
+    for keyword in sorted(COLOR_TABLE, key=len, reverse=True):
+        if keyword in lowered:
+            lowered = lowered.replace(keyword, " ")
+            if COLOR_TABLE[keyword] not in found:
+                found.append(COLOR_TABLE[keyword])
+    return found
+
+
+def _count(value: str) -> int:
+    return int(value) if value.isdigit() else KOREAN_NUMBERS[value]
+
+
+def _axis(text: str) -> Optional[str]:
+    match = re.search(r"\b([xyz])\s*(?:축|-?axis)", text) or re.search(r"([xyz])축", text)
+    return match.group(1).upper() if match else None
+
+
+def _parse_add_object(text: str) -> Optional[Tuple[dict, str, float]]:
+    if not re.search(r"추가|만들어|생성|넣어|\badd\b|\bcreate\b", text):
+        return None
+    obj_type, confidence = "CUBE", 0.6
+    for pattern, candidate in OBJECT_TYPES:
+        if re.search(pattern, text):
+            obj_type, confidence = candidate, 0.9
+            break
+    else:
+        if not re.search(r"추가|생성|넣어|\badd\b|\bcreate\b", text):
+            # "2배로 만들어줘", "대칭으로 만들어줘"처럼 객체 종류 없는 "만들어"는 추가 요청이 아님
+            return None
+
+    position = [0, 0, -1]  # 기본 위치 (모델 아래)
+    if "위" in text:
+        position = [0, 0, 1]
+    elif "오른쪽" in text or "옆" in text:
+        position = [1, 0, 0]
+    elif "왼쪽" in text:
+        position = [-1, 0, 0]
+
+    if parse_color(text):
+        # 색이 있는 객체 추가는 현재 명령 하나로 표현할 수 없으므로 LLM에 맡김
+        confidence = 0.5
+    return {"command": "add_object", "params": {"type": obj_type, "position": position, "scale": 1.0}}, \
+        f"{obj_type}를 추가했습니다", confidence
+
+
+def _parse_array(text: str) -> Optional[Tuple[dict, str, float]]:
+    if not re.search(r"배열|array|반복|복제|늘어놓", text):
+        return None
+    count, confidence = 3, 0.7
+    count_match = re.search(_COUNT_NUMBER + r"\s*개", text)
+    if count_match:
+        count, confidence = _count(count_match.group(1)), 0.9
+        if not ARRAY_COUNT_RANGE[0] <= count <= ARRAY_COUNT_RANGE[1]:
+            confidence = 0.3
+    axis = _axis(text) or "X"
+    offset = {"X": [2, 0, 0], "Y": [0, 2, 0], "Z": [0, 0, 2]}[axis]
+    return {"command": "array", "params": {"count": count, "offset": offset}}, \
+        f"{count}개로 배열 복제했습니다", confidence
+
+
+def _parse_mirror(text: str) -> Optional[Tuple[dict, str, float]]:
+    if not re.search(r"미러|대칭|거울|mirror", text):
+        return None
+    axis = _axis(text) or "X"
+    return {"command": "mirror", "params": {"axis": axis}}, f"{axis}축 기준으로 미러 복제했습니다", 0.9
+
+
+def _parse_subdivide(text: str) -> Optional[Tuple[dict, str, float]]:
+    if not re.search(r"세분화|subdivide|더 많은 면|세밀", text):
+        return None
+    levels, confidence = 2, 0.85
+    level_match = re.search(r"(?<![a-z0-9.])(\d+)\s*(?:단계|레벨|level)", text)
+    if level_match:
+        levels, confidence = int(level_match.group(1)), 0.95
+        if not SUBDIVIDE_LEVELS_RANGE[0] <= levels <= SUBDIVIDE_LEVELS_RANGE[1]:
+            confidence = 0.3
+    return {"command": "subdivide", "params": {"levels": levels}}, f"레벨 {levels}로 세분화했습니다", confidence
+
+
+def _parse_smooth(text: str) -> Optional[Tuple[dict, str, float]]:
+    if not re.search(r"부드럽|스무딩|스무스|smooth", text):
+        return None
+    return {"command": "apply_smooth", "params": {}}, "스무딩을 적용했습니다", 0.9
+
+
+def _parse_material(text: str) -> Optional[Tuple[dict, str, float]]:
+    if re.search(r"무광|매트|matte", text):
+        return {"command": "change_material", "params": {"metallic": 0.0, "roughness": 0.9}}, \
+            "무광 재질로 변경했습니다", 0.9
+    if re.search(r"금속|메탈|metallic|metal", text):
+        return {"command": "change_material", "params": {"metallic": 0.9, "roughness": 0.1}}, \
+            "금속 재질로 변경했습니다", 0.9
+    if re.search(r"광택|반짝|glossy|shiny", text):
+        return {"command": "change_material", "params": {"metallic": 0.9, "roughness": 0.1}}, \
+            "광택 있는 재질로 변경했습니다", 0.7
+    return None
+
+
+def _parse_rotate(text: str) -> Optional[Tuple[dict, str, float]]:
+    if not re.search(r"회전|돌려|돌리|rotate|바퀴", text):
+        return None
+    angle_match = re.search(r"(?<![a-z0-9.])(-?\d+(?:\.\d+)?)\s*(?:도|°|degree)", text)
+    turn = "반 바퀴" in text or "한 바퀴" in text
+    if not re.search(r"회전|rotate", text) and not (angle_match or turn or _axis(text)):
+        # "돌려줘"는 되돌리기("원래대로 돌려줘")일 수도 있으므로 각도나 축이 있을 때만 회전으로 봄
+        return None
+    angle, confidence = 90, 0.6
+    if angle_match:
+        angle, confidence = float(angle_match.group(1)), 0.95
+        angle = int(angle) if angle.is_integer() else angle
+        if abs(angle) > MAX_ROTATION_ANGLE:
+            confidence = 0.3
+    elif "반 바퀴" in text:
+        angle, confidence = 180, 0.9
+    elif "한 바퀴" in text:
+        angle, confidence = 360, 0.9
+    if re.search(r"반대|시계 방향|clockwise", text) and "반시계" not in text:
+        angle = -angle
+    axis = _axis(text) or "Z"
+    return {"command": "rotate_model", "params": {"axis": axis, "angle": angle}}, \
+        f"{axis}축으로 {angle}도 회전했습니다", confidence
+
+
+def _parse_scale(text: str) -> Optional[Tuple[dict, str, float]]:
+    factor_match = re.search(_NUMBER + r"\s*(?:배(?!열)|x\b|times\b)", text)
+    korean_match = re.search(_COUNT_NUMBER + r"\s*배(?!열)", text)
+    percent_match = re.search(_NUMBER + r"\s*%", text)
+    keyword = re.search(r"크기|키워|키우|늘려|줄여|줄이|크게|작게|확대|축소|scale|bigger|larger|smaller|shrink|절반|반으로", text)
+    if not (factor_match or korean_match or keyword):
+        return None
+    shrink = bool(_SHRINK.search(text))
+
+    if factor_match:
+        factor, confidence = float(factor_match.group(1)), 0.95
+    elif korean_match:
+        factor, confidence = float(_count(korean_match.group(1))), 0.95
+    elif percent_match:
+        percent = float(percent_match.group(1))
+        if re.search(_NUMBER + r"\s*%\s*(?:로|으로|크기|사이즈)", text):
+            # "50%로 줄여줘" -> 원래 크기의 50%
+            factor, confidence = percent / 100, 0.95
+        elif shrink and percent < 100:
+            # "10% 줄여줘" -> 10%만큼 줄임
+            factor, confidence = 1 - percent / 100, 0.9
+        elif keyword and not shrink:
+            # "20% 키워줘" -> 20%만큼 키움
+            factor, confidence = 1 + percent / 100, 0.9
+        else:
+            factor, confidence = percent / 100, 0.5
+        shrink = False
+    elif "절반" in text or "반으로" in text:
+        factor, confidence = 0.5, 0.95
+    else:
+        # 숫자 없이 정도만 말한 경우 ("조금 더 크게") 임의의 배율을 정하지 않고 LLM에 맡김
+        factor = 2.0 if _VAGUE_LARGE.search(text) else 1.2 if _VAGUE_SMALL.search(text) else 1.5
+        confidence = 0.5
+
+    if factor <= 0:
+        # "0배", "0%"는 모델이 사라지므로 로컬에서 처리하지 않음
+        confidence = 0.0
+    elif shrink and factor > 1:
+        # "2배 작게" -> 1/2
+        factor = 1 / factor
+    factor = round(factor, 4)
+    if not SCALE_FACTOR_RANGE[0] <= factor <= SCALE_FACTOR_RANGE[1]:
+        confidence = min(confidence, 0.3)
+    return {"command": "scale_model", "params": {"factor": factor}}, f"크기를 {factor:g}배로 조정했습니다", confidence
+
+
+def _parse_color_command(text: str) -> Optional[Tuple[dict, str, float]]:
+    color = parse_color(text)
+    if color is None and not re.search(r"색상|색깔|색을|색으로|color", text):
+        return None
+    if color is None:
+        # 색을 바꾸라는 말만 있고 어떤 색인지 알 수 없음
+        return {"command": "change_color", "params": {"r": 0.0, "g": 0.3, "b": 1.0, "a": 1.0}}, \
+            "색상을 변경했습니다", 0.3
+    if len(_color_names(text)) > 1:
+        # 여러 색 ("빨간색이랑 파란색 줄무늬", "빨간색에서 파란색으로")은 단색 하나로 표현할 수 없음
+        return {"command": "change_color", "params": color}, "색상을 변경했습니다", 0.4
+    return {"command": "change_color", "params": color}, "색상을 변경했습니다", 0.95
+
+
+# 한 절에서 여러 명령이 감지되면 앞의 명령이 우선 (예: "부드럽게 세분화" -> subdivide)
+_CLAUSE_PARSERS = [
+    _parse_add_object,
+    _parse_array,
+    _parse_mirror,
+    _parse_subdivide,
+    _parse_smooth,
+    _parse_material,
+    _parse_rotate,
+    _parse_scale,
+    _parse_color_command,
+]
+
+# 우선순위로 해결되는 조합 (함께 감지되어도 모호하지 않음)
+_COMPATIBLE = {
+    ("subdivide", "apply_smooth"),
+    ("add_object", "change_color"),
+    ("add_object", "scale_model"),
+    ("array", "scale_model"),
+    ("rotate_model", "scale_model"),
+}
+
+
+def _parse_clause(clause: str) -> Optional[Tuple[dict, str, float]]:
+    matches = [result for result in (parser(clause) for parser in _CLAUSE_PARSERS) if result]
+    if not matches:
+        return None
+
+    command, description, confidence = matches[0]
+    for other, _, other_confidence in matches[1:]:
+        if (command["command"], other["command"]) in _COMPATIBLE:
+            continue
+        if other["command"] == "rotate_model" or other["command"] == "scale_model":
+            if other_confidence < 0.9:
+                # 기본값만 있는 약한 신호 ("크게 회전" 등)
+                continue
+        # 한 절 안에 서로 다른 명령이 섞여 있으면 모호함
+        confidence = min(confidence, 0.5)
+    return command, description, confidence
+
+
+def parse(message: str) -> Optional[ParsedIntent]:
+    """메시지를 절 단위로 나눠 명령 목록과 신뢰도(절별 신뢰도의 최솟값)를 반환 (명령이 없으면 None)"""
+    text = message.strip().lower()
+    if not text:
+        return None
+
+    intent = ParsedIntent(confidence=1.0)
+    for clause in (part for part in _CLAUSE_SPLIT.split(text) if part and part.strip()):
+        result = _parse_clause(clause)
+        if result is None:
+            if re.search(r"[가-힣a-z]{2,}", clause) and not re.fullmatch(r"\s*(?:해\s*줘|해\s*주세요|please)?\s*[.!?]*\s*", clause):
+                # 해석할 수 없는 요청이 섞여 있으면 LLM에 맡김
+                intent.confidence = min(intent.confidence, 0.4)
+            continue
+        command, description, confidence = result
+        intent.commands.append(command)
+        intent.descriptions.append(description)
+        intent.confidence = min(intent.confidence, confidence)
+
+    if not intent.commands:
+        return None
+    if _PART_TARGET.search(text) or _UNSUPPORTED.search(text):
+        # 모델 일부만 가리키거나 명령에 없는 대상/효과가 있으면 모델 전체에 적용하면 안 되므로 LLM에 맡김
+        intent.confidence = min(intent.confidence, 0.4)
+    intent.confidence = round(intent.confidence, 2)
+    return intent
+
+
+def record(intent: Optional[ParsedIntent], hit: bool):
+    """로컬 처리(hit) / LLM 위임(miss) 카운터 증가"""
+    pipe = redis_client.pipeline()
+    pipe.hincrby(STATS_KEY, "hits" if hit else "misses", 1)
+    if hit and intent:
+        for command in intent.commands:
+            pipe.hincrby(STATS_KEY, f"command:{command['command']}", 1)
+    pipe.execute()
+
+
+def stats() -> dict:
+    """로컬 파서 적중률 통계"""
+    counters = redis_client.hgetall(STATS_KEY)
+    hits = int(counters.get("hits", 0))
+    misses = int(counters.get("misses", 0))
+    total = hits + misses
+    return {
+        "enabled": settings.INTENT_PARSER_ENABLED,
+        "threshold": settings.INTENT_PARSER_THRESHOLD,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+        "commands": {key.split(":", 1)[1]: int(value) for key, value in counters.items() if key.startswith("command:")},
+    }
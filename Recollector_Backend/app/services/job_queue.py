@@ -0,0 +1,131 @@
+"""
+Job Queue
+Redis 기반의 내구성 있는 생성 작업 큐
+워커가 작업을 꺼내면 processing 리스트로 옮기고 lease(가시성 타임아웃)를 잡으며,
+lease가 만료된 작업은 다른 워커에게 재전달됨
+"""
+import json
+import redis
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+PENDING_KEY = "jobs:pending"
+PROCESSING_KEY = "jobs:processing"
+ATTEMPTS_KEY = "jobs:attempts"
+PAYLOAD_PREFIX = "jobs:payload:"
+LEASE_PREFIX = "jobs:lease:"
+RESUME_LOCK_KEY = "jobs:resume-lock"
+
+redis_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    decode_responses=True
+)
+
+# pending -> processing 이동과 lease 설정을 원자적으로 처리
+_DEQUEUE_SCRIPT = redis_client.register_script("""
+local task_id = redis.call('RPOPLPUSH', KEYS[1], KEYS[2])
+if not task_id then
+    return nil
+end
+redis.call('SET', ARGV[1] .. task_id, ARGV[2], 'EX', ARGV[3])
+local attempts = redis.call('HINCRBY', KEYS[3], task_id, 1)
+local payload = redis.call('GET', ARGV[4] .. task_id)
+return {task_id, payload or '', attempts}
+""")
+
+# lease가 없는 processing 작업을 pending 맨 앞(다음에 꺼낼 위치)으로 되돌림
+_REQUEUE_EXPIRED_SCRIPT = redis_client.register_script("""
+local moved = 0
+for _, task_id in ipairs(redis.call('LRANGE', KEYS[1], 0, -1)) do
+    if redis.call('EXISTS', ARGV[1] .. task_id) == 0 then
+        redis.call('LREM', KEYS[1], 1, task_id)
+        redis.call('RPUSH', KEYS[2], task_id)
+        moved = moved + 1
+    end
+end
+return moved
+""")
+
+
+def enqueue(task_id: str, image_path: Optional[str], original_filename: Optional[str], options: dict,
+            cache_key: Optional[str] = None):
+    """생성 작업을 큐에 등록"""
+    payload = {
+        "task_id": task_id,
+        "image_path": image_path,
+        "original_filename": original_filename,
+        "options": options,
+        "cache_key": cache_key,
+    }
+    pipe = redis_client.pipeline()
+    pipe.set(PAYLOAD_PREFIX + task_id, json.dumps(payload))
+    pipe.lpush(PENDING_KEY, task_id)
+    pipe.execute()
+
+
+def dequeue(worker_id: str) -> Optional[Dict[str, Any]]:
+    """대기 중인 작업 하나를 꺼내 lease를 잡음 (없으면 None)"""
+    result = _DEQUEUE_SCRIPT(
+        keys=[PENDING_KEY, PROCESSING_KEY, ATTEMPTS_KEY],
+        args=[LEASE_PREFIX, worker_id, settings.JOB_VISIBILITY_TIMEOUT, PAYLOAD_PREFIX],
+    )
+    if not result:
+        return None
+
+    task_id, payload, attempts = result
+    job = json.loads(payload) if payload else {"task_id": task_id}
+    job["attempts"] = int(attempts)
+    return job
+
+
+def heartbeat(task_id: str, worker_id: str) -> bool:
+    """lease 연장. 이미 만료되어 다른 워커에게 넘어갔으면 False"""
+    lease_key = LEASE_PREFIX + task_id
+    if redis_client.get(lease_key) != worker_id:
+        return False
+    return bool(redis_client.set(lease_key, worker_id, xx=True, ex=settings.JOB_VISIBILITY_TIMEOUT))
+
+
+def ack(task_id: str):
+    """처리가 끝난 작업을 큐에서 제거"""
+    pipe = redis_client.pipeline()
+    pipe.lrem(PROCESSING_KEY, 1, task_id)
+    pipe.delete(LEASE_PREFIX + task_id, PAYLOAD_PREFIX + task_id)
+    pipe.hdel(ATTEMPTS_KEY, task_id)
+    pipe.execute()
+
+
+def release(task_id: str):
+    """워커 종료 시 처리 중이던 작업의 lease를 풀어 즉시 재전달되도록 함"""
+    pipe = redis_client.pipeline()
+    pipe.delete(LEASE_PREFIX + task_id)
+    pipe.lrem(PROCESSING_KEY, 1, task_id)
+    pipe.rpush(PENDING_KEY, task_id)
+    pipe.execute()
+
+
+def requeue_expired() -> int:
+    """lease가 만료된(워커가 죽은) 작업을 재전달 대기열로 이동"""
+    return _REQUEUE_EXPIRED_SCRIPT(keys=[PROCESSING_KEY, PENDING_KEY], args=[LEASE_PREFIX])
+
+
+def is_queued(task_id: str) -> bool:
+    """큐에 등록되어 있거나 처리 중인 작업인지 확인"""
+    return bool(redis_client.exists(PAYLOAD_PREFIX + task_id))
+
+
+def acquire_resume_lock(worker_id: str) -> bool:
+    """시작 시 재개 스캔을 한 워커만 수행하도록 잠금"""
+    return bool(redis_client.set(RESUME_LOCK_KEY, worker_id, nx=True, ex=settings.JOB_VISIBILITY_TIMEOUT))
+
+
+def stats() -> Dict[str, int]:
+    """큐 길이 통계"""
+    pipe = redis_client.pipeline()
+    pipe.llen(PENDING_KEY)
+    pipe.llen(PROCESSING_KEY)
+    pending, processing = pipe.execute()
+    return {"pending": pending, "processing": processing}
+
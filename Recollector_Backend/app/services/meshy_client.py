@@ -0,0 +1,223 @@
+"""
+Meshy HTTP Client
+모든 Meshy API 호출(작업 생성, 상태 조회, 모델 다운로드)이 공유하는 keep-alive 비동기 HTTP 클라이언트
+"""
+import os
+import asyncio
+import random
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+import anyio
+import anyio.to_thread
+import httpx
+from app.core.config import settings
+
+MESHY_API_BASE_URL = settings.MESHY_API_BASE_URL.rstrip("/")
+
+# 재시도해도 안전한 응답 코드
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class MeshyClient:
+    """
+    호스트별 커넥션 풀을 가진 httpx.AsyncClient 래퍼
+    API 호스트와 모델 다운로드(CDN) 호스트가 서로 다른 풀을 사용하도록 transport를 분리
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        """클라이언트 생성 (앱 lifespan 시작 시 호출)"""
+        if self._client:
+            return
+
+        api_host = httpx.URL(MESHY_API_BASE_URL).host
+        api_transport = httpx.AsyncHTTPTransport(
+            http2=settings.MESHY_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.MESHY_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.MESHY_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        download_transport = httpx.AsyncHTTPTransport(
+            http2=settings.MESHY_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.MESHY_DOWNLOAD_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.MESHY_DOWNLOAD_MAX_CONNECTIONS,
+            ),
+        )
+        self._client = httpx.AsyncClient(
+            mounts={
+                f"all://{api_host}": api_transport,
+                "all://": download_transport,
+            },
+            timeout=httpx.Timeout(settings.MESHY_REQUEST_TIMEOUT, connect=settings.MESHY_CONNECT_TIMEOUT),
+            follow_redirects=True,
+        )
+        print(f"[MeshyClient] HTTP 클라이언트 시작 (http2={settings.MESHY_HTTP2}, api_host={api_host})")
+
+    async def close(self):
+        """클라이언트 종료 (앱 lifespan 종료 시 호출)"""
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def request(self, method: str, url: str, *, idempotent: bool = True,
+                      body_factory: Optional[Callable[[], AsyncIterator[bytes]]] = None, **kwargs) -> httpx.Response:
+        """
+        429/5xx 응답과 연결 오류에 대해 지터가 포함된 지수 백오프로 재시도
+        멱등하지 않은 요청은 서버가 처리하지 않았다고 확신할 수 있는 경우(429, 연결 실패)만 재시도
+        body_factory를 주면 시도마다 새 스트리밍 본문을 만들어 전송
+        """
+        if not self._client:
+            await self.start()
+
+        attempt = 0
+        while True:
+            if body_factory:
+                kwargs["content"] = body_factory()
+            try:
+                response = await self._client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                if attempt >= settings.MESHY_MAX_RETRIES:
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"[MeshyClient] {method} {url} 연결 실패 ({e!r}), {delay:.2f}초 후 재시도")
+            except httpx.TransportError as e:
+                if not idempotent or attempt >= settings.MESHY_MAX_RETRIES:
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"[MeshyClient] {method} {url} 전송 오류 ({e!r}), {delay:.2f}초 후 재시도")
+            else:
+                retryable = response.status_code == 429 or (idempotent and response.status_code in RETRYABLE_STATUS_CODES)
+                if not retryable or attempt >= settings.MESHY_MAX_RETRIES:
+                    response.raise_for_status()
+                    return response
+                delay = self._retry_after(response) or self._backoff_delay(attempt)
+                print(f"[MeshyClient] {method} {url} -> {response.status_code}, {delay:.2f}초 후 재시도")
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def create_image_to_3d(self, body_factory: Callable[[], AsyncIterator[bytes]], content_length: int) -> str:
+        """스트리밍 JSON 본문으로 image-to-3d 작업 생성 후 외부 작업 ID 반환"""
+        headers = {
+            **self._auth_headers(),
+            "Content-Type": "application/json",
+            "Content-Length": str(content_length),
+        }
+        response = await self.request(
+            "POST", f"{MESHY_API_BASE_URL}/image-to-3d",
+            headers=headers, body_factory=body_factory, idempotent=False,
+        )
+        external_task_id = response.json().get("result")
+        if not external_task_id:
+            raise RuntimeError("외부 API에서 task_id를 받지 못했습니다.")
+        return external_task_id
+
+    async def get_image_to_3d(self, external_task_id: str) -> Dict[str, Any]:
+        """image-to-3d 작업 상태 조회"""
+        response = await self.request(
+            "GET", f"{MESHY_API_BASE_URL}/image-to-3d/{external_task_id}",
+            headers=self._auth_headers(), timeout=settings.MESHY_STATUS_TIMEOUT,
+        )
+        return response.json()
+
+    async def download(self, url: str, output_path: str,
+                       on_progress: Optional[Callable[[int, Optional[int]], None]] = None):
+        """
+        생성된 모델 파일을 고정 크기 청크로 임시 파일에 스트리밍한 뒤 fsync 후 원자적으로 rename
+        연결이 끊기면 Range 요청으로 받은 위치부터 이어받음 (서명된 URL이므로 인증 헤더를 보내지 않음)
+        """
+        if not self._client:
+            await self.start()
+
+        tmp_path = os.path.join(os.path.dirname(output_path), f".{uuid.uuid4().hex}.part")
+
+        received = 0
+        total: Optional[int] = None
+        attempt = 0
+        try:
+            async with await anyio.open_file(tmp_path, "wb") as f:
+                while total is None or received < total:
+                    headers = {"Accept-Encoding": "identity"}
+                    if received:
+                        headers["Range"] = f"bytes={received}-"
+                    try:
+                        async with self._client.stream("GET", url, headers=headers,
+                                                       timeout=settings.MESHY_DOWNLOAD_TIMEOUT) as response:
+                            # 오류 응답(5xx, 429 등)이면 받은 부분을 그대로 두고 다음 시도에서 이어받음
+                            response.raise_for_status()
+                            if received and response.status_code != 206:
+                                # 서버가 Range를 무시하고 전체 파일을 보내면 처음부터 다시 받음
+                                await f.seek(0)
+                                await f.truncate()
+                                received = 0
+                            total = self._content_total(response, received)
+
+                            async for chunk in response.aiter_raw(settings.MESHY_DOWNLOAD_CHUNK_SIZE):
+                                await f.write(chunk)
+                                received += len(chunk)
+                                if on_progress:
+                                    on_progress(received, total)
+
+                        if total is None:
+                            # 길이를 알 수 없는 응답은 스트림이 정상 종료되면 완료로 간주
+                            break
+                        if received < total:
+                            raise httpx.ReadError(f"응답이 조기 종료됨 ({received}/{total} bytes)")
+                    except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                        if isinstance(e, httpx.HTTPStatusError) and e.response.status_code not in RETRYABLE_STATUS_CODES:
+                            raise
+                        if attempt >= settings.MESHY_MAX_RETRIES:
+                            raise
+                        delay = self._backoff_delay(attempt)
+                        attempt += 1
+                        print(f"[MeshyClient] 다운로드 중단 ({received} bytes 수신, {e!r}), {delay:.2f}초 후 이어받기")
+                        await asyncio.sleep(delay)
+
+                await f.flush()
+                await anyio.to_thread.run_sync(os.fsync, f.wrapped.fileno())
+
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _content_total(response: httpx.Response, offset: int) -> Optional[int]:
+        """Content-Range 또는 Content-Length로 전체 파일 크기 계산"""
+        content_range = response.headers.get("Content-Range")
+        if response.status_code == 206 and content_range and "/" in content_range:
+            size = content_range.rsplit("/", 1)[1]
+            if size.isdigit():
+                return int(size)
+        content_length = response.headers.get("Content-Length")
+        if content_length and content_length.isdigit():
+            return int(content_length) + (offset if response.status_code == 206 else 0)
+        return None
+
+    @staticmethod
+    def _auth_headers() -> Dict[str, str]:
+        return {"Authorization": f"Bearer {settings.MESHY_API_KEY}"}
+
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        # full jitter: 0 ~ min(cap, base * 2^attempt)
+        cap = min(settings.MESHY_RETRY_BACKOFF_MAX, settings.MESHY_RETRY_BACKOFF * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return min(float(value), settings.MESHY_RETRY_BACKOFF_MAX)
+        except ValueError:
+            return None
+
+
+# 싱글톤 인스턴스
+meshy_client = MeshyClient()
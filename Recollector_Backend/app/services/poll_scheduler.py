@@ -0,0 +1,168 @@
+"""
+Meshy Poll Scheduler
+진행 중인 모든 외부 작업의 상태 조회를 하나의 힙 기반 타이머 큐에서 처리하는 스케줄러
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+import httpx
+from app.core.config import settings
+from app.services.meshy_client import RETRYABLE_STATUS_CODES
+
+# 더 이상 폴링할 필요가 없는 Meshy 작업 상태
+TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "CANCELED", "EXPIRED"}
+
+
+class _PollJob:
+    """스케줄러가 추적하는 외부 작업 하나"""
+    __slots__ = ("task_id", "external_task_id", "future", "on_progress", "interval", "last_progress", "errors")
+
+    def __init__(self, task_id: str, external_task_id: str, future: asyncio.Future,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]], interval: float):
+        self.task_id = task_id
+        self.external_task_id = external_task_id
+        self.future = future
+        self.on_progress = on_progress
+        self.interval = interval
+        self.last_progress = -1
+        self.errors = 0  # 연속된 일시적 조회 오류 수
+
+
+class MeshyPollScheduler:
+    """
+    외부 작업 ID를 다음 폴링 시각 순으로 힙에 넣고 단일 루프에서 깨어나 조회
+    진행률이 오르면 최소 간격으로, 정체되면 최대 간격까지 점점 느리게 폴링
+    일시적 조회 오류는 한 번 건너뛴 것으로 보고 간격을 늘려 다시 조회하며, 연속으로 max_errors번을 넘을 때만 실패 처리
+    """
+
+    def __init__(self, fetch_status: Callable[[str], Awaitable[Dict[str, Any]]],
+                 min_interval: float = settings.MESHY_POLL_MIN_INTERVAL,
+                 max_interval: float = settings.MESHY_POLL_MAX_INTERVAL,
+                 backoff: float = settings.MESHY_POLL_BACKOFF,
+                 concurrency: int = settings.MESHY_POLL_CONCURRENCY,
+                 max_errors: int = settings.MESHY_POLL_MAX_ERRORS):
+        self._fetch_status = fetch_status
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._backoff = backoff
+        self._concurrency = concurrency
+        self._max_errors = max_errors
+        self._heap = []  # (due_at, seq, job)
+        self._seq = itertools.count()
+        self._inflight = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._runner: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        """추적 중인 외부 작업 수"""
+        return len(self._heap) + len(self._inflight)
+
+    async def wait_for_completion(self, task_id: str, external_task_id: str,
+                                  on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """외부 작업이 종료 상태에 도달할 때까지 대기하고 마지막 상태 응답을 반환"""
+        self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        job = _PollJob(task_id, external_task_id, future, on_progress, self._min_interval)
+        self._schedule(job, 0)
+        return await future
+
+    async def stop(self):
+        """스케줄러 루프와 진행 중인 조회 중지"""
+        tasks = list(self._inflight)
+        if self._runner:
+            tasks.append(self._runner)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for _, _, job in self._heap:
+            if not job.future.done():
+                job.future.cancel()
+        self._heap.clear()
+        self._runner = None
+
+    def _ensure_running(self):
+        if self._runner and not self._runner.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._runner = asyncio.create_task(self._run())
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, httpx.TransportError)
+
+    def _schedule(self, job: _PollJob, delay: float):
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), job))
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.monotonic()
+            if delay > 0:
+                # 더 이른 작업이 추가되면 깨어나서 힙을 다시 확인
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, job = heapq.heappop(self._heap)
+            if job.future.done():
+                # 대기 중인 쪽이 취소된 작업
+                continue
+
+            task = asyncio.create_task(self._poll(job))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _poll(self, job: _PollJob):
+        try:
+            async with self._semaphore:
+                data = await self._fetch_status(job.external_task_id)
+        except Exception as e:
+            if self._is_transient(e) and job.errors < self._max_errors:
+                # 클라이언트 재시도 후에도 실패한 일시적 오류 (Meshy 5xx 폭주, 타임아웃 등) - 작업은 계속 진행 중일 수 있음
+                job.errors += 1
+                job.interval = min(max(job.interval, self._min_interval) * self._backoff, self._max_interval)
+                print(f"[{job.task_id}] 상태 조회 실패 ({job.errors}/{self._max_errors}), {job.interval:.1f}초 후 다시 조회: {e!r}")
+                self._schedule(job, job.interval)
+                return
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        job.errors = 0
+
+        external_status = data.get("status")
+        progress = data.get("progress") or 0
+        print(f"[{job.task_id}] 외부 작업 상태: {external_status}, 진행률: {progress}%")
+
+        if job.on_progress:
+            try:
+                job.on_progress(data)
+            except Exception as e:
+                print(f"[{job.task_id}] 진행률 갱신 실패: {e}")
+
+        if external_status in TERMINAL_STATUSES:
+            if not job.future.done():
+                job.future.set_result(data)
+            return
+
+        if progress > job.last_progress:
+            job.interval = self._min_interval
+        else:
+            job.interval = min(job.interval * self._backoff, self._max_interval)
+        job.last_progress = max(job.last_progress, progress)
+
+        self._schedule(job, job.interval)
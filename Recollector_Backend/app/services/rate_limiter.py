@@ -0,0 +1,63 @@
+"""
+Rate Limiter
+여러 워커 프로세스가 공유하는 Redis 토큰 버킷 (Meshy 작업 생성 요청 속도 제한)
+"""
+import asyncio
+import redis
+from app.core.config import settings
+
+redis_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    decode_responses=True
+)
+
+# 토큰을 하나 꺼내고, 부족하면 다음 토큰까지 기다려야 하는 시간(초)을 반환
+# (Redis 서버 시간을 기준으로 하므로 워커 간 시계 차이의 영향을 받지 않음)
+_TOKEN_BUCKET_SCRIPT = redis_client.register_script("""
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+""")
+
+
+class TokenBucket:
+    def __init__(self, key: str, rate: float, burst: int):
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+
+    async def acquire(self):
+        """토큰을 얻을 때까지 대기 (rate가 0 이하이면 제한 없음)"""
+        if self.rate <= 0:
+            return
+        while True:
+            wait = float(_TOKEN_BUCKET_SCRIPT(keys=[self.key], args=[self.rate, self.burst]))
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+# Meshy 작업 생성 요청 제한 (모든 워커 공유)
+meshy_submit_bucket = TokenBucket(
+    "ratelimit:meshy-submit",
+    rate=settings.MESHY_SUBMIT_RATE,
+    burst=settings.MESHY_SUBMIT_BURST,
+)
@@ -0,0 +1,136 @@
+"""
+Status Broker
+task_store가 발행하는 작업 상태 변경을 프로세스당 하나의 Redis pub/sub 연결로 받아
+SSE / WebSocket 구독자들에게 나눠주는 브로커
+
+구독자는 아직 전달하지 않은 변경 필드만 하나의 dict에 덮어써 두므로(최신 값만 유지),
+느린 클라이언트가 있어도 연결당 메모리는 일정함
+"""
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
+import redis.asyncio as aioredis
+from app.core.config import settings
+from app.services.task_store import EVENTS_CHANNEL
+
+# 구독 채널이 없을 때도 리스너가 대기할 수 있도록 항상 구독해 두는 채널
+_CONTROL_CHANNEL = EVENTS_CHANNEL.format("__broker__")
+
+
+class StatusSubscription:
+    """한 연결의 구독 상태 (전달 대기 중인 변경 필드 + 알림 이벤트)"""
+    __slots__ = ("pending", "event")
+
+    def __init__(self):
+        self.pending: Dict[str, str] = {}
+        self.event = asyncio.Event()
+
+    def push(self, fields: Dict[str, str]):
+        self.pending.update(fields)
+        self.event.set()
+
+    async def next(self, timeout: float) -> Optional[Dict[str, str]]:
+        """다음 변경분을 기다려 반환 (timeout 동안 변경이 없으면 None)"""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.event.clear()
+        fields, self.pending = self.pending, {}
+        return fields
+
+
+class StatusBroker:
+    def __init__(self):
+        self._redis: Optional[aioredis.Redis] = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribers: Dict[str, Set[StatusSubscription]] = {}
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """pub/sub 연결과 리스너 시작 (앱 lifespan 시작 시 호출)"""
+        if self._listener:
+            return
+        self._redis = aioredis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            decode_responses=True
+        )
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.subscribe(_CONTROL_CHANNEL)
+        self._listener = asyncio.create_task(self._listen())
+        print("[StatusBroker] 작업 상태 pub/sub 리스너 시작")
+
+    async def stop(self):
+        """리스너와 연결 종료 (앱 lifespan 종료 시 호출)"""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        if self._redis:
+            await self._redis.aclose()
+            self._redis = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[StatusSubscription]:
+        """작업 상태 변경 구독 (같은 작업의 구독자들은 하나의 Redis 채널 구독을 공유)"""
+        if not self._listener:
+            await self.start()
+
+        channel = EVENTS_CHANNEL.format(task_id)
+        subscription = StatusSubscription()
+        async with self._lock:
+            subscribers = self._subscribers.setdefault(channel, set())
+            if not subscribers:
+                await self._pubsub.subscribe(channel)
+            subscribers.add(subscription)
+        try:
+            yield subscription
+        finally:
+            async with self._lock:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+                        if self._pubsub:
+                            await self._pubsub.unsubscribe(channel)
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    subscribers = self._subscribers.get(message["channel"])
+                    if not subscribers:
+                        continue
+                    try:
+                        fields: Dict[str, Any] = json.loads(message["data"])
+                    except ValueError:
+                        continue
+                    for subscription in subscribers:
+                        subscription.push(fields)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Redis 연결이 끊기면 잠시 후 재구독 (redis-py가 재연결 시 채널을 다시 구독함)
+                print(f"[StatusBroker] 리스너 오류: {e!r}, 1초 후 재시도")
+                await asyncio.sleep(1)
+
+
+# 싱글톤 인스턴스
+status_broker = StatusBroker()
@@ -0,0 +1,205 @@
+"""
+Task Store
+작업 상태를 Redis 해시로 저장하고 필드 단위로 갱신
+(진행률 갱신과 이메일 설정이 서로의 값을 덮어쓰지 않도록 GET-수정-SET 대신 HSET 사용)
+"""
+import json
+import redis
+from typing import Any, Dict, List, Optional, Sequence
+from app.core.config import settings
+
+# 상태 변경 알림 채널 (변경된 필드를 JSON으로 발행, status_broker가 구독)
+EVENTS_CHANNEL = "task-events:{}"
+
+# JSON 문자열로 저장되는 필드와 정수 / 불리언 필드 (Redis 해시 값은 문자열이므로 읽을 때 타입을 되돌림)
+JSON_FIELDS = {"email_status"}
+INT_FIELDS = {"progress", "version"}
+BOOL_FIELDS = {"cached"}
+
+redis_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    decode_responses=True
+)
+
+# 현재 상태가 ARGV[1]일 때만 필드를 갱신하는 원자적 상태 전이 (예: processing -> completed)
+_TRANSITION_SCRIPT = redis_client.register_script("""
+if redis.call('HGET', KEYS[1], 'status') ~= ARGV[1] then
+    return nil
+end
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+local state = redis.call('HGETALL', KEYS[1])
+local changed = {}
+for i = 1, #state, 2 do
+    changed[state[i]] = state[i + 1]
+end
+redis.call('PUBLISH', ARGV[2], cjson.encode(changed))
+return state
+""")
+
+# 필드 갱신 + 버전 증가 + 변경 알림 발행을 한 번의 왕복으로 처리
+_UPDATE_SCRIPT = redis_client.register_script("""
+local changed = {}
+for i = 2, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    changed[ARGV[i]] = ARGV[i + 1]
+end
+changed['version'] = tostring(redis.call('HINCRBY', KEYS[1], 'version', 1))
+redis.call('PUBLISH', ARGV[1], cjson.encode(changed))
+return 1
+""")
+
+# 작업이 존재할 때만 필드를 설정 (삭제된 작업이 되살아나지 않도록)
+_SET_IF_EXISTS_SCRIPT = redis_client.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local changed = {}
+for i = 2, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    changed[ARGV[i]] = ARGV[i + 1]
+end
+changed['version'] = tostring(redis.call('HINCRBY', KEYS[1], 'version', 1))
+redis.call('PUBLISH', ARGV[1], cjson.encode(changed))
+return 1
+""")
+
+
+def _encode(fields: Dict[str, Any]) -> Dict[str, str]:
+    encoded = {}
+    for key, value in fields.items():
+        if value is None:
+            continue
+        if key in JSON_FIELDS or isinstance(value, (dict, list, bool)):
+            encoded[key] = json.dumps(value)
+        else:
+            encoded[key] = str(value)
+    return encoded
+
+
+def decode(raw: Dict[str, str]) -> Dict[str, Any]:
+    """Redis에 저장된 문자열 필드를 API 응답 형태로 변환"""
+    decoded = {}
+    for key, value in raw.items():
+        if key in JSON_FIELDS:
+            decoded[key] = json.loads(value)
+        elif key in INT_FIELDS:
+            decoded[key] = int(float(value))
+        elif key in BOOL_FIELDS:
+            # _encode가 json.dumps로 저장 ("true" / "false")
+            decoded[key] = value == "true"
+        else:
+            decoded[key] = value
+    return decoded
+
+
+def _flatten(fields: Dict[str, str]) -> list:
+    args = []
+    for key, value in fields.items():
+        args.extend((key, value))
+    return args
+
+
+def create(task_id: str, **fields):
+    """새 작업 상태 생성 (기존 키가 있으면 교체)"""
+    encoded = _encode({**fields, "version": 1})
+    pipe = redis_client.pipeline()
+    pipe.delete(task_id)
+    pipe.hset(task_id, mapping=encoded)
+    pipe.publish(EVENTS_CHANNEL.format(task_id), json.dumps(encoded))
+    pipe.execute()
+
+
+def update(task_id: str, **fields):
+    """지정한 필드만 갱신 (다른 필드는 건드리지 않음)"""
+    _UPDATE_SCRIPT(keys=[task_id], args=[EVENTS_CHANNEL.format(task_id)] + _flatten(_encode(fields)))
+
+
+def set_if_exists(task_id: str, **fields) -> bool:
+    """작업이 존재할 때만 필드 갱신"""
+    args = [EVENTS_CHANNEL.format(task_id)] + _flatten(_encode(fields))
+    return bool(_SET_IF_EXISTS_SCRIPT(keys=[task_id], args=args))
+
+
+def transition(task_id: str, from_status: str, **fields) -> Optional[Dict[str, Any]]:
+    """현재 상태가 from_status일 때만 필드를 갱신하고 갱신된 전체 상태를 반환 (아니면 None)"""
+    args = [from_status, EVENTS_CHANNEL.format(task_id)] + _flatten(_encode(fields))
+    result = _TRANSITION_SCRIPT(keys=[task_id], args=args)
+    if not result:
+        return None
+    return decode(dict(zip(result[::2], result[1::2])))
+
+
+def fail(task_id: str, error: str) -> Optional[Dict[str, Any]]:
+    """처리 중인 작업을 실패 상태로 전이하고 갱신된 전체 상태를 반환 (이미 끝난 작업이면 None)"""
+    return transition(task_id, "processing", status="failed", error=error)
+
+
+def get(task_id: str) -> Optional[Dict[str, Any]]:
+    """작업 상태 조회 (없으면 None)"""
+    try:
+        raw = redis_client.hgetall(task_id)
+    except redis.ResponseError:
+        # 해시 도입 이전에 JSON 문자열로 저장된 작업
+        status_json = redis_client.get(task_id)
+        return json.loads(status_json) if status_json else None
+    return decode(raw) if raw else None
+
+
+def get_many(task_ids: Sequence[str], fields: Optional[Sequence[str]] = None) -> List[Optional[Dict[str, Any]]]:
+    """
+    여러 작업 상태를 한 번의 파이프라인 왕복으로 조회 (task_ids 순서대로, 없는 작업은 None)
+    fields를 주면 해당 필드만 HMGET으로 가져옴
+    """
+    # 작업 존재 여부는 status 필드로 판단
+    hmget_fields = list(fields) if fields is not None else None
+    if hmget_fields is not None and "status" not in hmget_fields:
+        hmget_fields.append("status")
+
+    pipe = redis_client.pipeline(transaction=False)
+    for task_id in task_ids:
+        if hmget_fields is None:
+            pipe.hgetall(task_id)
+        else:
+            pipe.hmget(task_id, hmget_fields)
+    replies = pipe.execute(raise_on_error=False)
+
+    results: List[Optional[Dict[str, Any]]] = []
+    legacy = []
+    for index, reply in enumerate(replies):
+        if isinstance(reply, redis.ResponseError):
+            # 해시 도입 이전에 JSON 문자열로 저장된 작업은 아래에서 GET으로 다시 조회
+            legacy.append(index)
+            results.append(None)
+        elif hmget_fields is None:
+            results.append(decode(reply) if reply else None)
+        else:
+            raw = dict(zip(hmget_fields, reply))
+            if raw.get("status") is None:
+                results.append(None)
+            else:
+                results.append(decode({key: raw[key] for key in fields if raw[key] is not None}))
+
+    if legacy:
+        pipe = redis_client.pipeline(transaction=False)
+        for index in legacy:
+            pipe.get(task_ids[index])
+        for index, status_json in zip(legacy, pipe.execute()):
+            if status_json:
+                status_data = json.loads(status_json)
+                if fields is not None:
+                    status_data = {key: status_data[key] for key in fields if key in status_data}
+                results[index] = status_data
+    return results
+
+
+def exists(task_id: str) -> bool:
+    return bool(redis_client.exists(task_id))
+
+
+def delete(task_id: str):
+    redis_client.delete(task_id)
@@ -0,0 +1,179 @@
+"""
+Generation Worker
+Redis 작업 큐에서 생성 작업을 꺼내 run_ai_pipeline을 실행하는 워커 프로세스
+
+실행: python -m app.worker --processes 2 --concurrency 50
+여러 노드에서 같은 Redis를 바라보도록 실행하면 수평 확장됨
+"""
+import os
+import glob
+import signal
+import socket
+import asyncio
+import argparse
+import multiprocessing
+from app.core.config import settings
+from app.services import job_queue, task_store
+from app.services.ai_pipeline import run_ai_pipeline, poll_scheduler, load_meta, fail_task
+from app.services.meshy_client import meshy_client
+
+
+def _resume_recorded_jobs(worker_id: str) -> int:
+    """
+    METADATA_DIR에 외부 작업 ID가 기록되어 있지만 큐에 없고 아직 끝나지 않은 작업을 다시 등록
+    (큐 도입 이전에 BackgroundTasks로 돌던 작업이나 큐 데이터가 유실된 작업)
+    """
+    if not job_queue.acquire_resume_lock(worker_id):
+        return 0
+
+    resumed = 0
+    for meta_path in glob.glob(os.path.join(settings.METADATA_DIR, "*.json")):
+        task_id = os.path.splitext(os.path.basename(meta_path))[0]
+        if job_queue.is_queued(task_id):
+            continue
+        if os.path.exists(os.path.join(settings.OUTPUT_DIR, f"{task_id}.glb")):
+            continue
+
+        status = task_store.get(task_id)
+        if status and status.get("status") != "processing":
+            continue
+
+        meta = load_meta(task_id)
+        if not meta.get("external_task_id"):
+            continue
+
+        # 해시 도입 이전의 JSON 문자열 상태도 해시로 다시 기록
+        task_store.create(task_id, **{key: value for key, value in (status or {"status": "processing"}).items()
+                                      if key != "version"})
+
+        job_queue.enqueue(task_id, None, meta.get("original_filename"), meta.get("options", {}), meta.get("cache_key"))
+        resumed += 1
+        print(f"[Worker {worker_id}] 기록된 외부 작업 재등록: {task_id} ({meta['external_task_id']})")
+    return resumed
+
+
+async def _heartbeat(task_id: str, worker_id: str, job_task: asyncio.Task):
+    """처리 중인 작업의 lease를 주기적으로 연장하고, lease를 잃으면 작업을 중단"""
+    while True:
+        await asyncio.sleep(settings.JOB_VISIBILITY_TIMEOUT / 3)
+        if not job_queue.heartbeat(task_id, worker_id):
+            print(f"[Worker {worker_id}] lease 상실, 작업 중단: {task_id}")
+            job_task.cancel()
+            return
+
+
+async def _process(job: dict, worker_id: str):
+    task_id = job["task_id"]
+
+    if job["attempts"] > settings.JOB_MAX_ATTEMPTS:
+        print(f"[Worker {worker_id}] 최대 재시도 횟수 초과: {task_id}")
+        fail_task(task_id, "작업이 반복적으로 중단되어 처리를 포기했습니다.")
+        job_queue.ack(task_id)
+        return
+
+    pipeline_task = asyncio.create_task(run_ai_pipeline(
+        task_id=task_id,
+        image_path=job.get("image_path"),
+        original_filename=job.get("original_filename"),
+        options=job.get("options") or {},
+        cache_key=job.get("cache_key"),
+    ))
+    heartbeat_task = asyncio.create_task(_heartbeat(task_id, worker_id, pipeline_task))
+    try:
+        await pipeline_task
+    except asyncio.CancelledError:
+        if heartbeat_task.done():
+            # lease를 잃은 작업은 다른 워커가 이어서 처리
+            return
+        # 워커 종료: 즉시 재전달되도록 lease 반납
+        job_queue.release(task_id)
+        raise
+    finally:
+        heartbeat_task.cancel()
+    job_queue.ack(task_id)
+
+
+async def run_worker(worker_id: str, concurrency: int):
+    """작업 큐를 소비하는 워커 루프 (동시에 최대 concurrency개의 파이프라인 실행)"""
+    await meshy_client.start()
+    resumed = _resume_recorded_jobs(worker_id)
+    print(f"[Worker {worker_id}] 시작 (동시 작업 {concurrency}개, 재등록 {resumed}건, 큐 {job_queue.stats()})")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows 등 add_signal_handler를 지원하지 않는 환경
+            pass
+
+    slots = asyncio.Semaphore(concurrency)
+    running = set()
+    next_reap = 0.0
+
+    try:
+        while not stop_event.is_set():
+            if loop.time() >= next_reap:
+                requeued = job_queue.requeue_expired()
+                if requeued:
+                    print(f"[Worker {worker_id}] lease 만료 작업 {requeued}건 재전달")
+                next_reap = loop.time() + settings.JOB_VISIBILITY_TIMEOUT / 3
+
+            await slots.acquire()
+            job = job_queue.dequeue(worker_id)
+            if not job:
+                slots.release()
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=settings.WORKER_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(_process(job, worker_id))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            task.add_done_callback(lambda _: slots.release())
+    finally:
+        print(f"[Worker {worker_id}] 종료 중, 처리 중인 작업 {len(running)}건 반납")
+        for task in list(running):
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        await poll_scheduler.stop()
+        await meshy_client.close()
+
+
+def _worker_process(index: int, concurrency: int):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    try:
+        asyncio.run(run_worker(worker_id, concurrency))
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="3D 모델 생성 워커")
+    parser.add_argument("--processes", type=int, default=settings.WORKER_PROCESSES, help="워커 프로세스 수")
+    parser.add_argument("--concurrency", type=int, default=settings.WORKER_CONCURRENCY, help="프로세스당 동시 작업 수")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        _worker_process(0, args.concurrency)
+        return
+
+    processes = [
+        multiprocessing.Process(target=_worker_process, args=(index, args.concurrency))
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,26 +3,235 @@ Blender MCP Server Addon (Socket Server)
 Blender가 포트에서 대기하고 MCP 서버가 연결
 """
 import bpy
+import os
+import sys
+import tempfile
 import socket
 import threading
 import json
 import time
-from queue import Queue
+import hashlib
+from queue import Queue, Empty
 
 # Blender 소켓 서버 정보
 HOST = 'localhost'
 PORT = 9876  # Blender 애드온 포트 (MCP가 여기에 연결)
 
+
+def _parse_arg(argv, name: str, default):
+    """blender -b --python blender_mcp_addon.py -- --port 9877 처럼 '--' 뒤에 옵션을 받으면 사용"""
+    if "--" in argv:
+        args = argv[argv.index("--") + 1:]
+        if name in args:
+            return type(default)(args[args.index(name) + 1])
+    return default
+
+
+PORT = _parse_arg(sys.argv, "--port", PORT)
+
+# 작업별 씬 스냅샷(.blend) 캐시 (같은 파일을 다시 로드할 때 glTF import 대신 복원, 워커끼리 공유 가능)
+SNAPSHOT_DIR = _parse_arg(sys.argv, "--snapshot-dir", os.path.join(tempfile.gettempdir(), "mcp_snapshots"))
+SNAPSHOT_BUDGET = _parse_arg(sys.argv, "--snapshot-budget-mb", 2048) * 1024 * 1024
+
+# subdivide 후 예상 삼각형 수 상한 (넘으면 레벨을 낮춤)과 내보내기 전까지 사용할 뷰포트 레벨
+TRIANGLE_BUDGET = _parse_arg(sys.argv, "--triangle-budget", 500000)
+SUBDIVIDE_VIEWPORT_LEVELS = _parse_arg(sys.argv, "--subdivide-viewport-levels", 0)
+
+# execute_edit / execute_edits에서 지원하는 편집 명령
+EDIT_COMMANDS = {
+    "change_color", "scale_model", "rotate_model", "apply_smooth", "add_object",
+    "change_material", "subdivide", "mirror", "array",
+}
+
+# 메시지 한 줄의 최대 크기
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+# 단색 재질은 (색상, metallic, roughness)마다 하나만 만들어 공유 (이름은 값에서 결정되어 다시 로드해도 재사용)
+FLAT_MATERIAL_PREFIX = "MCP_Flat_"
+# 사용하지 않는 재질/이미지 정리 최소 간격 (초, 처리할 명령이 없을 때만 실행)
+ORPHAN_PURGE_INTERVAL = 30.0
+
 # 명령 큐 (메인 스레드에서 처리)
 command_queue = Queue()
 response_queue = {}  # request_id -> response
 
 
+def estimate_triangles(obj, extra_levels: int = 0) -> int:
+    """
+    모디파이어를 적용해 내보낼 때의 예상 삼각형 수 (extra_levels만큼 세분화를 더 했을 때)
+    Catmull-Clark 첫 레벨에서 n각형 하나가 사각형 n개가 되고 이후 레벨마다 4배
+    미러는 축마다 2배, 배열은 개수만큼 곱함
+    """
+    mesh = obj.data
+    corners = len(mesh.loops)
+    levels = extra_levels
+    multiplier = 1
+    for mod in obj.modifiers:
+        if mod.type == 'SUBSURF':
+            levels += mod.render_levels
+        elif mod.type == 'MIRROR':
+            multiplier *= 2 ** sum(1 for enabled in mod.use_axis if enabled)
+        elif mod.type == 'ARRAY':
+            multiplier *= mod.count
+    if levels <= 0:
+        triangles = corners - 2 * len(mesh.polygons)
+    else:
+        triangles = 2 * corners * 4 ** (levels - 1)
+    return triangles * multiplier
+
+
+def flat_material_name(color_rgba, metallic: float, roughness: float) -> str:
+    key = tuple(round(float(value), 4) for value in (*color_rgba, metallic, roughness))
+    return FLAT_MATERIAL_PREFIX + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:12]
+
+
+def scene_collections(collection=None) -> list:
+    """씬의 하위 컬렉션 전체 (자식이 부모보다 먼저 오는 순서)"""
+    collection = collection or bpy.context.scene.collection
+    result = []
+    for child in collection.children:
+        result.extend(scene_collections(child))
+        result.append(child)
+    return result
+
+
+def purge_orphan_data() -> int:
+    """
+    사용자가 없는 데이터블록(메쉬, 재질, 이미지 등)을 모두 삭제하고 삭제한 개수 반환
+    남아 있으면 같은 이름의 데이터를 다시 가져올 때 이름에 .001이 붙어 MCP_Flat_* 재질을 이름으로 찾지 못함
+    """
+    return bpy.data.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True) or 0
+
+
+class SceneSnapshots:
+    """
+    로드한 GLB 파일 버전(경로 + 수정 시각 + 크기)별 씬 스냅샷
+    bpy.data.libraries.write로 씬의 객체와 컬렉션, 그 데이터(메쉬, 재질, 이미지)만 .blend로 저장하고,
+    같은 버전을 다시 로드할 때 libraries.load로 가져와 glTF import를 건너뜀
+    디스크 사용량이 예산을 넘으면 가장 오래 사용하지 않은 스냅샷부터 삭제
+    """
+
+    def __init__(self, directory: str, budget_bytes: int):
+        self.directory = directory
+        self.budget_bytes = budget_bytes
+        self.stats = {"restores": 0, "imports": 0, "saves": 0, "evictions": 0,
+                      "restore_ms": 0.0, "import_ms": 0.0, "save_ms": 0.0}
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, file_path: str):
+        """파일 버전 키 (파일이 없으면 None)"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        version = f"{os.path.abspath(file_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+        return hashlib.sha1(version.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.blend")
+
+    def save(self, key: str):
+        """현재 씬을 스냅샷으로 저장 (임시 파일에 쓴 뒤 교체하므로 다른 워커가 읽는 중이어도 안전)"""
+        started = time.perf_counter()
+        objects = set(bpy.context.scene.objects)
+        # 객체가 어느 컬렉션에 있었는지 복원할 수 있도록 컬렉션도 함께 저장
+        collections = set(scene_collections())
+        tmp_path = f"{self.path(key)}.{os.getpid()}.tmp"
+        bpy.data.libraries.write(tmp_path, objects | collections, fake_user=False)
+        os.replace(tmp_path, self.path(key))
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["saves"] += 1
+        self.stats["save_ms"] += elapsed
+        print(f"📸 Snapshot saved: {key} ({len(objects)} objects, {elapsed:.0f}ms)")
+        self.evict()
+
+    def restore(self, key: str) -> bool:
+        """
+        스냅샷이 있으면 씬에 불러오고 True (없거나 읽을 수 없으면 False)
+        객체는 저장할 때 속해 있던 컬렉션으로 돌아가고, 컬렉션에 속하지 않았던 객체는 씬 최상위 컬렉션에 연결
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return False
+        started = time.perf_counter()
+        # 지운 씬의 메쉬/재질이 남아 있으면 가져온 데이터 이름이 바뀌므로 먼저 정리
+        purge_orphan_data()
+        try:
+            with bpy.data.libraries.load(path, link=False) as (data_from, data_to):
+                data_to.objects = data_from.objects
+                data_to.collections = data_from.collections
+        except Exception as e:
+            print(f"⚠️ Snapshot restore failed, falling back to import: {e}")
+            return False
+        root = bpy.context.scene.collection
+        collections = [coll for coll in data_to.collections if coll is not None]
+        nested = {child.name for coll in collections for child in coll.children}
+        for coll in collections:
+            if coll.name not in nested and coll.name not in root.children:
+                root.children.link(coll)
+        for obj in data_to.objects:
+            if obj is not None and not obj.users_collection:
+                root.objects.link(obj)
+        os.utime(path)  # LRU 순서 갱신
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats["restores"] += 1
+        self.stats["restore_ms"] += elapsed
+        print(f"📸 Snapshot restored: {key} ({elapsed:.0f}ms)")
+        return True
+
+    def record_import(self, elapsed_ms: float):
+        self.stats["imports"] += 1
+        self.stats["import_ms"] += elapsed_ms
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".blend"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.budget_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+            self.stats["evictions"] += 1
+            print(f"🗑️ Snapshot evicted: {name}")
+
+    def summary(self) -> dict:
+        """복원 vs import 평균 시간 비교"""
+        stats = dict(self.stats)
+        stats["avg_restore_ms"] = round(stats["restore_ms"] / stats["restores"], 1) if stats["restores"] else None
+        stats["avg_import_ms"] = round(stats["import_ms"] / stats["imports"], 1) if stats["imports"] else None
+        stats["avg_save_ms"] = round(stats["save_ms"] / stats["saves"], 1) if stats["saves"] else None
+        stats["budget_bytes"] = self.budget_bytes
+        return stats
+
+
 class BlenderMCPServer:
     def __init__(self):
         self.server_socket = None
         self.running = False
         self.connections = []  # 활성 연결 리스트
+        self.send_locks = {}  # 연결 -> 전송 잠금
+        self.snapshots = SceneSnapshots(SNAPSHOT_DIR, SNAPSHOT_BUDGET)
+        # 내보낸 파일과 씬이 같은 상태일 때 저장할 스냅샷 키 (응답을 보낸 뒤 큐가 비면 저장)
+        self.pending_snapshot = None
+        # 씬이 바뀔 때마다 증가하는 세대 번호와, 마지막으로 파일과 같았던 (세대, 파일 버전 키)
+        # 세대가 그대로이고 파일도 그대로면 내보내기를 건너뜀
+        self.generation = 0
+        self.synced = None
+        # 재질 캐시 통계와 정리 예약 (재질을 바꾸거나 모델을 다시 로드하면 사용하지 않는 데이터가 생김)
+        self.material_stats = {"reused": 0, "created": 0, "purged_materials": 0, "purged_images": 0}
+        self.orphans_pending = False
+        self.last_purge = time.monotonic()
         
     def start(self):
         """Blender에서 소켓 서버 시작 (MCP가 여기에 연결)"""
@@ -39,6 +248,8 @@ class BlenderMCPServer:
                 try:
                     self.server_socket.settimeout(1.0)
                     conn, addr = self.server_socket.accept()
+                    # 응답은 작은 메시지를 연이어 보내므로 Nagle 알고리즘(지연 ACK와 겹치면 ~40ms 대기)을 끔
+                    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                     print(f"✅ MCP connected from {addr}")
                     
                     # 연결 처리를 별도 스레드에서
@@ -56,84 +267,123 @@ class BlenderMCPServer:
             if self.server_socket:
                 self.server_socket.close()
     
+    def send_message(self, conn, message: dict):
+        """JSON 메시지 한 줄 전송 (메인 스레드와 연결 스레드가 같은 소켓에 동시에 쓰지 않도록 잠금)"""
+        data = (json.dumps(message) + "\n").encode('utf-8')
+        with self.send_locks.setdefault(conn, threading.Lock()):
+            conn.sendall(data)
+
     def handle_mcp_connection(self, conn):
-        """MCP 서버로부터의 연결 처리"""
+        """
+        MCP 서버로부터의 연결 처리
+        메시지는 줄바꿈으로 구분된 JSON이며, recv 한 번에 여러 메시지나 메시지 일부가 올 수 있으므로 버퍼에 모아 줄 단위로 처리
+        """
         self.connections.append(conn)
+        buffer = b""
         try:
             while True:
-                data = conn.recv(8192)
+                data = conn.recv(65536)
                 if not data:
                     break
-                    
-                # MCP 명령 처리
-                try:
-                    message = data.decode('utf-8').strip()
-                    print(f"📩 Received from MCP: {message[:100]}...")
-                    
-                    # JSON-RPC 파싱
-                    try:
-                        request = json.loads(message)
-                        method = request.get('method', 'unknown')
-                        params = request.get('params', {})
-                        request_id = request.get('id')
-                        
-                        print(f"📋 Command: {method}, Params: {params}")
-                        
-                        # 명령을 큐에 추가 (메인 스레드에서 처리)
-                        command_queue.put({
-                            'request_id': request_id,
-                            'method': method,
-                            'params': params,
-                            'conn': conn
-                        })
-                        
-                        print(f"📝 Command queued, waiting for processing...")
-                        
-                    except json.JSONDecodeError as e:
-                        # JSON 파싱 오류
-                        error_response = json.dumps({
-                            "jsonrpc": "2.0",
-                            "id": None,
-                            "error": {"code": -32700, "message": f"Parse error: {str(e)}"}
-                        }) + "\n"
-                        conn.sendall(error_response.encode('utf-8'))
-                    
-                except Exception as e:
-                    print(f"❌ Error processing message: {e}")
-                    error_response = json.dumps({
-                        "jsonrpc": "2.0",
-                        "id": None,
-                        "error": {"code": -32603, "message": f"Internal error: {str(e)}"}
-                    })
-                    try:
-                        conn.sendall(error_response.encode('utf-8'))
-                    except:
-                        pass
+                buffer += data
+
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    if line.strip():
+                        self.handle_message(conn, line)
+
+                if len(buffer) > MAX_MESSAGE_SIZE:
+                    raise ValueError(f"Message too large ({len(buffer)} bytes)")
                     
         except Exception as e:
             print(f"❌ Connection handler error: {e}")
         finally:
             if conn in self.connections:
                 self.connections.remove(conn)
+            self.send_locks.pop(conn, None)
             conn.close()
             print("🔌 MCP disconnected")
+
+    def handle_message(self, conn, line: bytes):
+        """JSON-RPC 메시지 한 개를 파싱해 명령 큐에 추가"""
+        try:
+            message = line.decode('utf-8').strip()
+            print(f"📩 Received from MCP: {message[:100]}...")
+            
+            # JSON-RPC 파싱
+            try:
+                request = json.loads(message)
+                method = request.get('method', 'unknown')
+                params = request.get('params', {})
+                request_id = request.get('id')
+                
+                print(f"📋 Command: {method}, Params: {params}")
+                
+                # 명령을 큐에 추가 (메인 스레드에서 처리)
+                command_queue.put({
+                    'request_id': request_id,
+                    'method': method,
+                    'params': params,
+                    'conn': conn,
+                    'received_at': time.perf_counter()
+                })
+                
+                print(f"📝 Command queued, waiting for processing...")
+                
+            except json.JSONDecodeError as e:
+                # JSON 파싱 오류
+                self.send_message(conn, {
+                    "jsonrpc": "2.0",
+                    "id": None,
+                    "error": {"code": -32700, "message": f"Parse error: {str(e)}"}
+                })
+            
+        except Exception as e:
+            print(f"❌ Error processing message: {e}")
+            try:
+                self.send_message(conn, {
+                    "jsonrpc": "2.0",
+                    "id": None,
+                    "error": {"code": -32603, "message": f"Internal error: {str(e)}"}
+                })
+            except:
+                pass
     
     def execute_command(self, method: str, params: dict) -> dict:
         """Blender 명령 실행"""
         try:
+            if method not in ("export_model", "snapshot_stats"):
+                # 씬이 바뀌면 내보낸 파일과 더 이상 같지 않음
+                self.pending_snapshot = None
+
             if method == "load_model":
                 file_path = params.get("file_path", "")
                 print(f"📂 Loading model: {file_path}")
                 
-                # Blender에서 모델 로드
+                if not (file_path.endswith('.glb') or file_path.endswith('.gltf')):
+                    return {"status": "error", "message": "Unsupported file format"}
+
+                # Blender에서 모델 로드 (비워진 컬렉션도 지워 다시 가져온 컬렉션 이름이 바뀌지 않도록 함)
                 bpy.ops.object.select_all(action='SELECT')
                 bpy.ops.object.delete()
-                
-                if file_path.endswith('.glb') or file_path.endswith('.gltf'):
-                    bpy.ops.import_scene.gltf(filepath=file_path)
-                    return {"status": "success", "message": f"Model loaded: {file_path}"}
-                else:
-                    return {"status": "error", "message": "Unsupported file format"}
+                for coll in scene_collections():
+                    if not coll.all_objects:
+                        bpy.data.collections.remove(coll)
+                self.orphans_pending = True
+
+                # 같은 버전의 파일을 로드한 적이 있으면 스냅샷에서 복원
+                self.generation += 1
+                key = self.snapshots.key(file_path)
+                self.synced = (self.generation, key)
+                if key and self.snapshots.restore(key):
+                    return {"status": "success", "message": f"Model restored from snapshot: {file_path}", "source": "snapshot"}
+
+                started = time.perf_counter()
+                bpy.ops.import_scene.gltf(filepath=file_path)
+                self.snapshots.record_import((time.perf_counter() - started) * 1000)
+                if key:
+                    self.snapshots.save(key)
+                return {"status": "success", "message": f"Model loaded: {file_path}", "source": "import"}
             
             elif method == "execute_edit":
                 command = params.get("command", "")
@@ -141,99 +391,14 @@ class BlenderMCPServer:
                 print(f"✏️ Executing edit: {command}")
                 print(f"✏️ Params: {edit_params}")
                 
-                # 선택된 모든 객체에 대해 편집 실행
-                selected_objects = bpy.context.selected_objects
-                if not selected_objects:
-                    # 모든 메쉬 객체 선택
-                    for obj in bpy.data.objects:
-                        if obj.type == 'MESH':
-                            obj.select_set(True)
-                    selected_objects = bpy.context.selected_objects
-                
-                # 명령별 처리
-                if command == "change_color":
-                    r = edit_params.get("r", 0.0)
-                    g = edit_params.get("g", 0.3)
-                    b = edit_params.get("b", 1.0)
-                    a = edit_params.get("a", 1.0)
-                    print(f"🎨 Applying color: R={r}, G={g}, B={b}, A={a}")
-                    self.change_object_color(selected_objects, (r, g, b, a))
-                    return {"status": "success", "message": f"색상이 변경되었습니다"}
-                
-                elif command == "add_object":
-                    obj_type = edit_params.get("type", "CUBE")
-                    position = edit_params.get("position", [0, 0, 0])
-                    scale = edit_params.get("scale", 1.0)
-                    
-                    # 객체 추가
-                    if obj_type == "CUBE":
-                        bpy.ops.mesh.primitive_cube_add(location=position, scale=(scale, scale, scale))
-                    elif obj_type == "SPHERE":
-                        bpy.ops.mesh.primitive_uv_sphere_add(location=position, radius=scale)
-                    elif obj_type == "CYLINDER":
-                        bpy.ops.mesh.primitive_cylinder_add(location=position, radius=scale)
-                    elif obj_type == "CONE":
-                        bpy.ops.mesh.primitive_cone_add(location=position, radius1=scale)
-                    
-                    new_obj = bpy.context.active_object
-                    return {"status": "success", "message": f"{obj_type}가 추가되었습니다"}
-                
-                elif command == "scale_model":
-                    factor = edit_params.get("factor", 1.0)
-                    for obj in selected_objects:
-                        obj.scale *= factor
-                    return {"status": "success", "message": f"크기를 {factor}배로 변경했습니다"}
-                
-                elif command == "rotate_model":
-                    axis = edit_params.get("axis", "Z")
-                    angle = edit_params.get("angle", 90)
-                    import math
-                    angle_rad = math.radians(angle)
-                    
-                    for obj in selected_objects:
-                        if axis == "X":
-                            obj.rotation_euler[0] += angle_rad
-                        elif axis == "Y":
-                            obj.rotation_euler[1] += angle_rad
-                        elif axis == "Z":
-                            obj.rotation_euler[2] += angle_rad
-                    
-                    return {"status": "success", "message": f"{axis}축으로 {angle}도 회전했습니다"}
-                
-                elif command == "apply_smooth":
-                    for obj in selected_objects:
-                        if obj.type == 'MESH':
-                            bpy.context.view_layer.objects.active = obj
-                            bpy.ops.object.shade_smooth()
-                    return {"status": "success", "message": "스무딩이 적용되었습니다"}
-                
-                elif command == "subdivide":
-                    levels = edit_params.get("levels", 2)
-                    for obj in selected_objects:
-                        if obj.type == 'MESH':
-                            # Subdivision Surface 모디파이어 추가
-                            mod = obj.modifiers.new(name="Subdivision", type='SUBSURF')
-                            mod.levels = levels
-                            mod.render_levels = levels
-                    return {"status": "success", "message": f"레벨 {levels}로 세분화했습니다"}
-                
-                elif command == "change_material":
-                    metallic = edit_params.get("metallic", 0.0)
-                    roughness = edit_params.get("roughness", 0.5)
-                    
-                    for obj in selected_objects:
-                        if obj.type == 'MESH' and obj.data.materials:
-                            mat = obj.data.materials[0]
-                            if mat.use_nodes:
-                                bsdf = mat.node_tree.nodes.get("Principled BSDF")
-                                if bsdf:
-                                    bsdf.inputs['Metallic'].default_value = metallic
-                                    bsdf.inputs['Roughness'].default_value = roughness
-                    
-                    return {"status": "success", "message": f"재질을 변경했습니다 (Metallic: {metallic}, Roughness: {roughness})"}
-                
-                else:
-                    return {"status": "success", "message": f"명령을 수신했습니다: {command}"}
+                return self.mark_changed(self.apply_edit(command, edit_params, self.edit_targets()))
+            
+            elif method == "execute_edits":
+                return self.mark_changed(self.execute_edits(params.get("commands", [])))
+
+            elif method == "snapshot_stats":
+                return {"status": "success", "stats": self.snapshots.summary(),
+                        "materials": {**self.material_stats, "total": len(bpy.data.materials)}}
             
             elif method == "export_model":
                 file_path = params.get("file_path", "")
@@ -241,8 +406,20 @@ class BlenderMCPServer:
                 print(f"💾 Exporting model: {file_path}")
                 
                 if format_type == "GLB":
-                    bpy.ops.export_scene.gltf(filepath=file_path, export_format='GLB')
-                    return {"status": "success", "message": f"Model exported: {file_path}"}
+                    # if_changed면 마지막 로드/내보내기 이후 씬도 파일도 바뀌지 않았을 때 건너뜀
+                    if params.get("if_changed") and self.synced == (self.generation, self.snapshots.key(file_path)):
+                        print(f"💾 Export skipped (generation {self.generation} unchanged)")
+                        return {"status": "success", "message": f"Model unchanged: {file_path}", "skipped": True}
+
+                    started = time.perf_counter()
+                    self.export_glb(file_path)
+                    export_ms = round((time.perf_counter() - started) * 1000, 2)
+                    key = self.snapshots.key(file_path)
+                    self.synced = (self.generation, key)
+                    # 다음에 이 파일을 다시 로드할 때 import 대신 복원할 수 있도록 스냅샷 예약
+                    self.pending_snapshot = key
+                    return {"status": "success", "message": f"Model exported: {file_path}", "export_ms": export_ms,
+                            "bytes": os.path.getsize(file_path)}
                 else:
                     return {"status": "error", "message": "Unsupported export format"}
             
@@ -255,45 +432,320 @@ class BlenderMCPServer:
             traceback.print_exc()
             return {"status": "error", "message": str(e)}
     
-    def change_object_color(self, objects, color_rgba):
-        """객체의 색상 변경"""
+    def mark_changed(self, result: dict) -> dict:
+        """씬을 바꾼 편집이면 세대 번호 증가 (실패했거나 changed가 False인 결과는 그대로)"""
+        if result.get("status") == "success" and result.pop("changed", True):
+            self.generation += 1
+        return result
+
+    @property
+    def dirty(self) -> bool:
+        """마지막으로 로드/내보낸 파일 이후 씬이 바뀌었는지 여부"""
+        return self.synced is None or self.synced[0] != self.generation
+
+    def edit_targets(self):
+        """편집 대상 객체 (선택된 객체가 없으면 모든 메쉬 객체를 선택)"""
+        selected_objects = bpy.context.selected_objects
+        if not selected_objects:
+            # 모든 메쉬 객체 선택
+            for obj in bpy.data.objects:
+                if obj.type == 'MESH':
+                    obj.select_set(True)
+            selected_objects = bpy.context.selected_objects
+        return selected_objects
+
+    def apply_edit(self, command: str, edit_params: dict, selected_objects) -> dict:
+        """편집 명령 하나를 실행"""
+        if command == "change_color":
+            r = edit_params.get("r", 0.0)
+            g = edit_params.get("g", 0.3)
+            b = edit_params.get("b", 1.0)
+            a = edit_params.get("a", 1.0)
+            print(f"🎨 Applying color: R={r}, G={g}, B={b}, A={a}")
+            changed = self.change_object_color(selected_objects, (r, g, b, a))
+            # 이미 같은 색상이면 씬이 바뀌지 않음 (내보낼 필요 없음)
+            return {"status": "success", "message": f"색상이 변경되었습니다", "changed": changed > 0}
+        
+        elif command == "add_object":
+            obj_type = edit_params.get("type", "CUBE")
+            position = edit_params.get("position", [0, 0, 0])
+            scale = edit_params.get("scale", 1.0)
+        
+            # 객체 추가
+            if obj_type == "CUBE":
+                bpy.ops.mesh.primitive_cube_add(location=position, scale=(scale, scale, scale))
+            elif obj_type == "SPHERE":
+                bpy.ops.mesh.primitive_uv_sphere_add(location=position, radius=scale)
+            elif obj_type == "CYLINDER":
+                bpy.ops.mesh.primitive_cylinder_add(location=position, radius=scale)
+            elif obj_type == "CONE":
+                bpy.ops.mesh.primitive_cone_add(location=position, radius1=scale)
+        
+            new_obj = bpy.context.active_object
+            return {"status": "success", "message": f"{obj_type}가 추가되었습니다"}
+        
+        elif command == "scale_model":
+            factor = edit_params.get("factor", 1.0)
+            for obj in selected_objects:
+                obj.scale *= factor
+            return {"status": "success", "message": f"크기를 {factor}배로 변경했습니다"}
+        
+        elif command == "rotate_model":
+            axis = edit_params.get("axis", "Z")
+            angle = edit_params.get("angle", 90)
+            import math
+            angle_rad = math.radians(angle)
+        
+            for obj in selected_objects:
+                if axis == "X":
+                    obj.rotation_euler[0] += angle_rad
+                elif axis == "Y":
+                    obj.rotation_euler[1] += angle_rad
+                elif axis == "Z":
+                    obj.rotation_euler[2] += angle_rad
+        
+            return {"status": "success", "message": f"{axis}축으로 {angle}도 회전했습니다"}
+        
+        elif command == "apply_smooth":
+            for obj in selected_objects:
+                if obj.type == 'MESH':
+                    bpy.context.view_layer.objects.active = obj
+                    bpy.ops.object.shade_smooth()
+            return {"status": "success", "message": "스무딩이 적용되었습니다"}
+        
+        elif command == "subdivide":
+            requested = max(0, int(edit_params.get("levels", 2)))
+            meshes = [obj for obj in selected_objects if obj.type == 'MESH']
+
+            # 예상 삼각형 수가 예산을 넘지 않는 가장 높은 레벨로 낮춤
+            levels = requested
+            while levels > 0 and sum(estimate_triangles(obj, levels) for obj in meshes) > TRIANGLE_BUDGET:
+                levels -= 1
+            stats = {
+                "requested_levels": requested,
+                "levels": levels,
+                "triangles_before": sum(estimate_triangles(obj) for obj in meshes),
+                "triangles_after": sum(estimate_triangles(obj, levels) for obj in meshes),
+                "triangle_budget": TRIANGLE_BUDGET,
+            }
+            print(f"🔺 Subdivide: {stats}")
+            if levels == 0:
+                return {"status": "success", "changed": False, "subdivide": stats,
+                        "message": f"삼각형 수가 예산({TRIANGLE_BUDGET:,}개)을 넘어 세분화하지 않았습니다"}
+
+            for obj in meshes:
+                # Subdivision Surface 모디파이어 추가 (뷰포트는 낮은 레벨로 두고 내보낼 때만 최종 레벨로 평가)
+                mod = obj.modifiers.new(name="Subdivision", type='SUBSURF')
+                mod.levels = min(levels, SUBDIVIDE_VIEWPORT_LEVELS)
+                mod.render_levels = levels
+            message = f"레벨 {levels}로 세분화했습니다"
+            if levels < requested:
+                message += f" (레벨 {requested}은 삼각형 예산 {TRIANGLE_BUDGET:,}개 초과)"
+            return {"status": "success", "message": message, "subdivide": stats}
+        
+        elif command == "change_material":
+            metallic = edit_params.get("metallic", 0.0)
+            roughness = edit_params.get("roughness", 0.5)
+        
+            for obj in selected_objects:
+                if obj.type == 'MESH' and obj.data.materials:
+                    mat = obj.data.materials[0]
+                    if mat is None or not mat.use_nodes:
+                        continue
+                    bsdf = mat.node_tree.nodes.get("Principled BSDF")
+                    if not bsdf:
+                        continue
+                    if mat.name.startswith(FLAT_MATERIAL_PREFIX):
+                        # 공유하는 단색 재질은 직접 고치지 않고 같은 색상 + 새 값의 재질로 교체
+                        obj.data.materials[0] = self.flat_material(
+                            tuple(bsdf.inputs['Base Color'].default_value), metallic, roughness
+                        )
+                        self.orphans_pending = True
+                    else:
+                        bsdf.inputs['Metallic'].default_value = metallic
+                        bsdf.inputs['Roughness'].default_value = roughness
+        
+            return {"status": "success", "message": f"재질을 변경했습니다 (Metallic: {metallic}, Roughness: {roughness})"}
+
+        elif command == "mirror":
+            axis = edit_params.get("axis", "X")
+            for obj in selected_objects:
+                if obj.type == 'MESH':
+                    # Mirror 모디파이어 추가 (지정한 축 하나만 대칭)
+                    mod = obj.modifiers.new(name="Mirror", type='MIRROR')
+                    mod.use_axis = [axis == "X", axis == "Y", axis == "Z"]
+            return {"status": "success", "message": f"{axis}축 기준으로 미러 복제했습니다"}
+
+        elif command == "array":
+            count = edit_params.get("count", 3)
+            offset = edit_params.get("offset", [2, 0, 0])
+            for obj in selected_objects:
+                if obj.type == 'MESH':
+                    # Array 모디파이어 추가 (월드 단위 고정 간격)
+                    mod = obj.modifiers.new(name="Array", type='ARRAY')
+                    mod.count = count
+                    mod.use_relative_offset = False
+                    mod.use_constant_offset = True
+                    mod.constant_offset_displacement = offset
+            return {"status": "success", "message": f"{count}개로 배열 복제했습니다"}
+
+        else:
+            # 알 수 없는 명령은 씬을 바꾸지 않음 (내보낼 필요 없음)
+            return {"status": "success", "message": f"명령을 수신했습니다: {command}", "changed": False}
+
+    def execute_edits(self, commands: list) -> dict:
+        """
+        여러 편집 명령을 순서대로 한 번에 실행 (메인 스레드 한 틱 안에서 처리)
+        하나라도 실패하면 실행 전 체크포인트로 되돌려 일부만 적용된 상태가 남지 않도록 함
+        """
+        if not commands:
+            return {"status": "error", "message": "No commands"}
+        unknown = [cmd.get("command") for cmd in commands if cmd.get("command") not in EDIT_COMMANDS]
+        if unknown:
+            return {"status": "error", "message": f"Unknown edit commands: {unknown}"}
+
+        checkpoint = self.create_checkpoint()
+        results = []
+        try:
+            selected_objects = self.edit_targets()
+            for index, cmd in enumerate(commands):
+                print(f"✏️ Executing edit {index + 1}/{len(commands)}: {cmd.get('command')} {cmd.get('params', {})}")
+                try:
+                    result = self.apply_edit(cmd["command"], cmd.get("params", {}), selected_objects)
+                except Exception as e:
+                    result = {"status": "error", "message": str(e)}
+                if result.get("status") != "success":
+                    print(f"❌ Edit {index + 1} failed, rolling back: {result.get('message')}")
+                    self.rollback(checkpoint)
+                    return {
+                        "status": "error",
+                        "message": f"{index + 1}번째 명령({cmd['command']}) 실패로 전체 편집을 되돌렸습니다: {result.get('message')}",
+                        "failed_index": index,
+                        "results": results,
+                    }
+                results.append(result)
+        finally:
+            self.discard_checkpoint(checkpoint)
+
+        return {"status": "success", "message": f"{len(results)}개 명령을 적용했습니다", "results": results}
+
+    def create_checkpoint(self):
+        """롤백용 체크포인트 (UI가 있으면 undo 스택, 헤드리스 등 undo를 쓸 수 없으면 .blend 사본)"""
+        if not bpy.app.background and bpy.ops.ed.undo_push.poll() and bpy.ops.ed.undo.poll():
+            bpy.ops.ed.undo_push(message="MCP execute_edits")
+            return ("undo", None)
+        path = os.path.join(tempfile.gettempdir(), f"mcp_checkpoint_{os.getpid()}_{time.time_ns()}.blend")
+        bpy.ops.wm.save_as_mainfile(filepath=path, copy=True)
+        return ("blend", path)
+
+    def rollback(self, checkpoint):
+        kind, path = checkpoint
+        if kind == "undo":
+            # 데이터 API로 바꾼 편집은 undo 단계를 남기지 않으므로, 실패한 편집을 한 단계로 쌓은 뒤 되돌려야
+            # 체크포인트 단계로 돌아감 (바로 undo하면 체크포인트 이전 단계까지 넘어감)
+            bpy.ops.ed.undo_push(message="MCP execute_edits (failed)")
+            bpy.ops.ed.undo()
+        else:
+            # UI 레이아웃은 그대로 두고 데이터만 다시 읽음 (타이머는 persistent로 등록되어 있어 유지됨)
+            bpy.ops.wm.open_mainfile(filepath=path, load_ui=False)
+
+    def discard_checkpoint(self, checkpoint):
+        kind, path = checkpoint
+        if kind == "blend" and path and os.path.exists(path):
+            os.remove(path)
+
+    def export_glb(self, file_path: str):
+        """모디파이어를 적용해 GLB로 내보내기 (세분화는 뷰포트 레벨 대신 최종 레벨로 평가한 뒤 되돌림)"""
+        swapped = []
+        for obj in bpy.context.scene.objects:
+            for mod in getattr(obj, "modifiers", []):
+                if mod.type == 'SUBSURF' and mod.levels != mod.render_levels:
+                    swapped.append((mod, mod.levels))
+                    mod.levels = mod.render_levels
+        try:
+            bpy.ops.export_scene.gltf(filepath=file_path, export_format='GLB', export_apply=True)
+        finally:
+            for mod, levels in swapped:
+                mod.levels = levels
+
+    def flat_material(self, color_rgba, metallic: float = 0.0, roughness: float = 0.5):
+        """
+        (색상, metallic, roughness)에 해당하는 공유 단색 재질 (있으면 재사용, 없으면 생성)
+        use_nodes가 만드는 기본 Principled BSDF -> Material Output 노드를 그대로 사용
+        """
+        name = flat_material_name(color_rgba, metallic, roughness)
+        mat = bpy.data.materials.get(name)
+        if mat is not None and mat.use_nodes and mat.node_tree.nodes.get("Principled BSDF"):
+            self.material_stats["reused"] += 1
+            return mat
+
+        if mat is None:
+            mat = bpy.data.materials.new(name=name)
+        mat.use_nodes = True
+        nodes = mat.node_tree.nodes
+        bsdf = nodes.get("Principled BSDF")
+        if bsdf is None:
+            # 노드가 지워진 재질이면 기본 구성으로 다시 만듦
+            nodes.clear()
+            bsdf = nodes.new(type='ShaderNodeBsdfPrincipled')
+            output = nodes.new(type='ShaderNodeOutputMaterial')
+            output.location = (400, 0)
+            mat.node_tree.links.new(bsdf.outputs['BSDF'], output.inputs['Surface'])
+
+        bsdf.inputs['Base Color'].default_value = color_rgba
+        bsdf.inputs['Metallic'].default_value = metallic
+        bsdf.inputs['Roughness'].default_value = roughness
+        self.material_stats["created"] += 1
+        return mat
+
+    def change_object_color(self, objects, color_rgba) -> int:
+        """객체의 색상 변경 (같은 색상의 객체들은 단색 재질 하나를 공유), 재질을 바꾼 객체 수 반환"""
+        mat = self.flat_material(color_rgba)
+        changed = 0
         for obj in objects:
             if obj.type == 'MESH':
+                materials = obj.data.materials
+                if len(materials) == 1 and materials[0] == mat:
+                    continue
                 print(f"🎨 Changing color for object: {obj.name}")
-                
-                # 기존 재질이 있으면 모두 제거
-                obj.data.materials.clear()
-                
-                # 새 재질 생성
-                mat = bpy.data.materials.new(name=f"Material_{obj.name}")
-                mat.use_nodes = True
-                obj.data.materials.append(mat)
-                
-                # 노드 트리 가져오기
-                nodes = mat.node_tree.nodes
-                links = mat.node_tree.links
-                
-                # 기존 노드 모두 제거
-                nodes.clear()
-                
-                # Principled BSDF 노드 생성
-                bsdf = nodes.new(type='ShaderNodeBsdfPrincipled')
-                bsdf.location = (0, 0)
-                
-                # Material Output 노드 생성
-                output = nodes.new(type='ShaderNodeOutputMaterial')
-                output.location = (400, 0)
-                
-                # 노드 연결
-                links.new(bsdf.outputs['BSDF'], output.inputs['Surface'])
-                
-                # 색상 적용
-                bsdf.inputs['Base Color'].default_value = color_rgba
-                bsdf.inputs['Metallic'].default_value = 0.0
-                bsdf.inputs['Roughness'].default_value = 0.5
-                
+                # 기존 재질을 모두 떼어내고 공유 재질 하나만 연결 (떼어낸 재질은 유휴 시간에 정리)
+                materials.clear()
+                materials.append(mat)
+                self.orphans_pending = True
+                changed += 1
                 print(f"✅ Color applied to {obj.name}: RGBA={color_rgba}")
-    
+        return changed
+
+    def purge_orphans(self):
+        """
+        어떤 객체도 사용하지 않는 재질과 이미지 삭제
+        응답 지연에 포함되지 않도록 처리할 명령이 없을 때, ORPHAN_PURGE_INTERVAL 간격으로 실행
+        """
+        if not self.orphans_pending or time.monotonic() - self.last_purge < ORPHAN_PURGE_INTERVAL:
+            return
+        self.orphans_pending = False
+        self.last_purge = time.monotonic()
+        materials = [mat for mat in bpy.data.materials if mat.users == 0]
+        for mat in materials:
+            bpy.data.materials.remove(mat)
+        # 재질이 지워지면서 사용하지 않게 된 텍스처 이미지
+        images = [image for image in bpy.data.images if image.users == 0]
+        for image in images:
+            bpy.data.images.remove(image)
+        self.material_stats["purged_materials"] += len(materials)
+        self.material_stats["purged_images"] += len(images)
+        if materials or images:
+            print(f"🧹 Purged {len(materials)} materials, {len(images)} images")
+
+    def flush_snapshot(self):
+        """예약된 스냅샷 저장 (응답 지연에 포함되지 않도록 처리할 명령이 없을 때 실행)"""
+        key, self.pending_snapshot = self.pending_snapshot, None
+        if key:
+            try:
+                self.snapshots.save(key)
+            except Exception as e:
+                print(f"⚠️ Snapshot save failed: {e}")
+
     def stop(self):
         """서버 중지"""
         self.running = False
@@ -301,6 +753,102 @@ class BlenderMCPServer:
             self.server_socket.close()
 
 # 서버 인스턴스 생성 및 시작
+class CommandDispatcher:
+    """
+    메인 스레드에서 명령 큐를 처리하는 적응형 디스패처
+    - 큐에 명령이 남아 있으면 바로 다시 실행되고, 한 번에 TICK_BUDGET 이상 붙잡지 않아 UI가 멈추지 않음
+    - 명령이 없으면 실행 간격을 IDLE_INTERVAL까지 늘려 유휴 상태에서 덜 깨어남
+      (연결 스레드가 타이머를 바로 깨울 수 없으므로 유휴 후 첫 명령은 최대 IDLE_INTERVAL만큼 기다림)
+    """
+    TICK_BUDGET = 0.05  # 한 번 실행할 때 명령 처리에 쓰는 최대 시간 (초)
+    BUSY_INTERVAL = 0.0  # 처리할 명령이 남아 있을 때 (UI 이벤트 처리 후 바로 재실행)
+    ACTIVE_INTERVAL = 0.005  # 명령을 막 처리한 직후 (연속 명령 대비)
+    IDLE_INTERVAL = 0.05  # 오래 유휴 상태일 때의 최대 간격 (이전 고정 간격 0.1초보다 짧게 유지)
+    HEADLESS_POLL = 0.5  # 헤드리스 루프에서 서버 스레드 종료를 확인하는 간격
+    BACKOFF = 2.0
+
+    def __init__(self, server: BlenderMCPServer):
+        self.server = server
+        self.interval = self.ACTIVE_INTERVAL
+
+    def run_command(self, cmd: dict):
+        """명령 하나 실행 후 응답 전송 (큐 대기 시간과 실행 시간을 응답에 기록)"""
+        request_id = cmd['request_id']
+        method = cmd['method']
+        params = cmd['params']
+        conn = cmd['conn']
+
+        print(f"⚙️ Processing command in main thread: {method}")
+
+        # Blender 명령 실행 (메인 스레드에서만 가능, execute_command는 오류도 결과로 반환)
+        started_at = time.perf_counter()
+        result = self.server.execute_command(method, params)
+        finished_at = time.perf_counter()
+        if isinstance(result, dict):
+            result["timing"] = {
+                "queue_wait_ms": round((started_at - cmd['received_at']) * 1000, 2),
+                "exec_ms": round((finished_at - started_at) * 1000, 2),
+            }
+            result["generation"] = self.server.generation
+            result["dirty"] = self.server.dirty
+
+        # 응답 전송
+        response = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": result
+        }
+
+        try:
+            self.server.send_message(conn, response)
+            print(f"✅ Response sent: {str(response)[:100]}...")
+        except Exception as e:
+            print(f"❌ Failed to send response: {e}")
+
+    def drain(self) -> int:
+        """TICK_BUDGET 안에서 큐에 쌓인 명령을 처리하고 처리한 개수 반환"""
+        deadline = time.perf_counter() + self.TICK_BUDGET
+        processed = 0
+        while time.perf_counter() < deadline:
+            try:
+                cmd = command_queue.get_nowait()
+            except Empty:
+                break
+            self.run_command(cmd)
+            processed += 1
+        if command_queue.empty():
+            self.server.flush_snapshot()
+            self.server.purge_orphans()
+        return processed
+
+    def next_interval(self, processed: int) -> float:
+        if not command_queue.empty():
+            self.interval = self.ACTIVE_INTERVAL
+            return self.BUSY_INTERVAL
+        if processed:
+            self.interval = self.ACTIVE_INTERVAL
+        else:
+            self.interval = min(self.IDLE_INTERVAL, self.interval * self.BACKOFF)
+        return self.interval
+
+    def timer_tick(self) -> float:
+        """bpy.app.timers 콜백 (반환값이 다음 실행까지의 간격)"""
+        return self.next_interval(self.drain())
+
+    def run_forever(self, server_thread: threading.Thread):
+        """
+        헤드리스 실행용 루프: 큐에서 블로킹 대기하므로 명령이 도착하면 즉시 처리하고,
+        유휴 상태에서는 HEADLESS_POLL마다 한 번만 깨어남
+        """
+        while server_thread.is_alive():
+            try:
+                cmd = command_queue.get(timeout=self.HEADLESS_POLL)
+            except Empty:
+                continue
+            self.run_command(cmd)
+            self.drain()
+
+
 if __name__ == "__main__":
     blender_mcp_server = BlenderMCPServer()
     server_thread = threading.Thread(target=blender_mcp_server.start, daemon=True)
@@ -308,41 +856,16 @@ if __name__ == "__main__":
     print("🚀 Blender MCP Server started in background")
     print(f"⏳ Waiting for MCP to connect on port {PORT}...")
     
-    # 메인 스레드에서 명령 처리를 위한 타이머 등록
-    def process_commands():
-        """메인 스레드에서 명령 큐 처리"""
-        while not command_queue.empty():
-            try:
-                cmd = command_queue.get_nowait()
-                request_id = cmd['request_id']
-                method = cmd['method']
-                params = cmd['params']
-                conn = cmd['conn']
-                
-                print(f"⚙️ Processing command in main thread: {method}")
-                
-                # Blender 명령 실행 (메인 스레드에서만 가능)
-                result = blender_mcp_server.execute_command(method, params)
-                
-                # 응답 전송
-                response = json.dumps({
-                    "jsonrpc": "2.0",
-                    "id": request_id,
-                    "result": result
-                }) + "\n"
-                
-                try:
-                    conn.sendall(response.encode('utf-8'))
-                    print(f"✅ Response sent: {response[:100]}...")
-                except Exception as e:
-                    print(f"❌ Failed to send response: {e}")
-                    
-            except Exception as e:
-                print(f"❌ Error processing command: {e}")
-                import traceback
-                traceback.print_exc()
-        
-        return 0.1  # 0.1초마다 재실행
-    
-    # Blender 타이머 등록 (메인 스레드에서 주기적으로 실행)
-    bpy.app.timers.register(process_commands, first_interval=0.1)
+    dispatcher = CommandDispatcher(blender_mcp_server)
+
+    if bpy.app.background:
+        # 헤드리스 실행(blender -b, 백엔드 워커 풀)에서는 스크립트가 끝나면 Blender가 종료되고
+        # 타이머도 돌지 않으므로 메인 스레드에서 직접 명령 큐를 처리
+        try:
+            dispatcher.run_forever(server_thread)
+        except KeyboardInterrupt:
+            blender_mcp_server.stop()
+    else:
+        # Blender 타이머 등록 (메인 스레드에서 실행, 간격은 큐 상태에 따라 조절)
+        # 롤백이 .blend를 다시 열어도 해제되지 않도록 persistent로 등록
+        bpy.app.timers.register(dispatcher.timer_tick, first_interval=dispatcher.ACTIVE_INTERVAL, persistent=True)
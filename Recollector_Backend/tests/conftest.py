@@ -0,0 +1,52 @@
+"""
+테스트 공통 설정
+앱 모듈을 불러오기 전에 필수 환경 변수와 임시 저장 경로를 채우고,
+Redis 클라이언트를 fakeredis로 바꿔 Redis 서버 없이 실행
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import fakeredis
+import redis
+import redis.asyncio as aioredis
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(__file__).resolve().parent / "data"
+sys.path.insert(0, str(BACKEND_DIR))
+# app.main이 static 디렉터리를 현재 경로 기준으로 마운트
+os.chdir(BACKEND_DIR)
+
+_TMP_DIR = Path(tempfile.mkdtemp(prefix="recollector_tests_"))
+for name, value in {
+    "MESHY_API_KEY": "test",
+    "MESHY_API_BASE_URL": "http://127.0.0.1:9/v2",
+    "MAIL_USERNAME": "test",
+    "MAIL_PASSWORD": "test",
+    "MAIL_FROM": "test@example.com",
+    "MAIL_SERVER": "localhost",
+    "MAIL_PORT": "25",
+    "MAIL_FROM_NAME": "test",
+    "OUTPUT_DIR": str(_TMP_DIR / "models"),
+    "METADATA_DIR": str(_TMP_DIR / "metadata"),
+    "UPLOAD_DIR": str(_TMP_DIR / "uploads"),
+    "BLENDER_EXECUTABLE": "",
+}.items():
+    os.environ[name] = value
+
+# 모듈 수준 redis_client들이 모두 같은 가짜 서버를 보도록 함
+_redis_server = fakeredis.FakeServer()
+
+
+def _fake_redis(*args, **kwargs):
+    return fakeredis.FakeRedis(server=_redis_server, decode_responses=kwargs.get("decode_responses", False))
+
+
+def _fake_async_redis(*args, **kwargs):
+    return fakeredis.FakeAsyncRedis(server=_redis_server, decode_responses=kwargs.get("decode_responses", False))
+
+
+redis.Redis = _fake_redis
+aioredis.Redis = _fake_async_redis
+
@@ -0,0 +1,88 @@
+"""테스트 / 벤치마크 공용 도구"""
+import json
+import math
+import os
+import struct
+
+
+def percentile(values, pct: float) -> float:
+    """측정값의 pct 백분위 값 (최근접 순위)"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, -(-len(ordered) * pct // 100) - 1))
+    return ordered[int(index)]
+
+
+def summarize(values, unit: str = "ms", scale: float = 1000.0) -> str:
+    """초 단위 측정값 목록을 p50 / p99 / 최대 문자열로"""
+    return (f"p50={percentile(values, 50) * scale:.2f}{unit} p99={percentile(values, 99) * scale:.2f}{unit} "
+            f"max={max(values) * scale:.2f}{unit} (n={len(values)})")
+
+
+def make_glb(path, bin_size: int = 1024, gltf=None) -> bytes:
+    """
+    노드 두 개(루트 -> 메쉬), 재질 하나, BIN 청크를 가진 최소 GLB 파일을 만들고 BIN 내용을 반환
+    gltf를 주면 그 JSON을 그대로 씀 (잘못된 구조의 파일 확인용)
+    """
+    gltf = gltf if gltf is not None else {
+        "asset": {"version": "2.0"}, "scene": 0, "scenes": [{"nodes": [0]}],
+        "nodes": [{"name": "root", "children": [1]}, {"name": "mesh", "mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0}, "material": 0}]}],
+        "materials": [{"name": "material", "pbrMetallicRoughness": {"baseColorFactor": [1, 1, 1, 1]}}],
+        "buffers": [{"byteLength": bin_size}],
+    }
+    json_chunk = json.dumps(gltf).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    bin_chunk = os.urandom(bin_size)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sII", b"glTF", 2, 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)))
+        f.write(struct.pack("<II", len(json_chunk), 0x4E4F534A) + json_chunk)
+        f.write(struct.pack("<II", len(bin_chunk), 0x004E4942) + bin_chunk)
+    return bin_chunk
+
+
+def make_mesh_glb(path, grid: int = 256) -> int:
+    """
+    grid x grid 정점의 물결 모양 높이맵 메쉬(위치 / 법선 float32, 인덱스 uint32) GLB를 만들고 삼각형 수를 반환
+    gltfpack 양자화 / 압축 / 단순화를 실제 형상으로 확인하기 위한 모델
+    """
+    positions, normals, indices = bytearray(), bytearray(), bytearray()
+    for row in range(grid):
+        for col in range(grid):
+            x, z = col / (grid - 1) * 2 - 1, row / (grid - 1) * 2 - 1
+            height = 0.1 * math.sin(x * 6) * math.cos(z * 6)
+            dx, dz = 0.6 * math.cos(x * 6) * math.cos(z * 6), -0.6 * math.sin(x * 6) * math.sin(z * 6)
+            length = math.sqrt(dx * dx + 1 + dz * dz)
+            positions += struct.pack("<3f", x, height, z)
+            normals += struct.pack("<3f", -dx / length, 1 / length, -dz / length)
+    for row in range(grid - 1):
+        for col in range(grid - 1):
+            a = row * grid + col
+            indices += struct.pack("<6I", a, a + grid, a + 1, a + 1, a + grid, a + grid + 1)
+    vertices, triangles = grid * grid, 2 * (grid - 1) ** 2
+
+    bin_chunk = bytes(positions + normals + indices)
+    gltf = {
+        "asset": {"version": "2.0"}, "scene": 0, "scenes": [{"nodes": [0]}],
+        "nodes": [{"name": "terrain", "mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0, "NORMAL": 1}, "indices": 2, "material": 0}]}],
+        "materials": [{"name": "material", "pbrMetallicRoughness": {"baseColorFactor": [0.6, 0.6, 0.6, 1]}}],
+        "buffers": [{"byteLength": len(bin_chunk)}],
+        "bufferViews": [
+            {"buffer": 0, "byteOffset": 0, "byteLength": len(positions), "target": 34962},
+            {"buffer": 0, "byteOffset": len(positions), "byteLength": len(normals), "target": 34962},
+            {"buffer": 0, "byteOffset": len(positions) + len(normals), "byteLength": len(indices), "target": 34963},
+        ],
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": vertices, "type": "VEC3",
+             "min": [-1, -0.1, -1], "max": [1, 0.1, 1]},
+            {"bufferView": 1, "componentType": 5126, "count": vertices, "type": "VEC3"},
+            {"bufferView": 2, "componentType": 5125, "count": triangles * 3, "type": "SCALAR"},
+        ],
+    }
+    json_chunk = json.dumps(gltf).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sII", b"glTF", 2, 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)))
+        f.write(struct.pack("<II", len(json_chunk), 0x4E4F534A) + json_chunk)
+        f.write(struct.pack("<II", len(bin_chunk), 0x004E4942) + bin_chunk)
+    return triangles
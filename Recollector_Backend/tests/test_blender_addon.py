@@ -0,0 +1,248 @@
+"""
+Blender 애드온 씬 처리 (bpy 모듈로 같은 프로세스에서 실행, bpy가 없으면 건너뜀)
+- 스냅샷 복원 vs glTF import 시간과 복원 후 데이터 이름 / 컬렉션 유지
+- subdivide 삼각형 예산: 예상 삼각형 수와 실제 내보낸 수, 예산 적용 전후 내보내기 시간 / 파일 크기
+- 색상 편집 1,000번의 시간과 재질 수 (공유 단색 재질 vs 편집마다 객체별 재질을 새로 만드는 방식)
+- GUI 타이머 디스패처가 유휴 상태로 간격을 늘린 뒤 도착한 명령의 큐 대기 시간
+"""
+import json
+import select
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+bpy = pytest.importorskip("bpy")
+
+import blender_mcp_addon as addon  # noqa: E402  (bpy가 있을 때만 불러올 수 있음)
+
+from helpers import summarize  # noqa: E402
+
+RELOADS = 5
+COLOR_EDITS = 1000
+COLORS = [(1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0), (1.0, 1.0, 0.0), (0.2, 0.2, 0.2)]
+
+
+@pytest.fixture
+def server(tmp_path):
+    """빈 씬과 테스트 전용 스냅샷 디렉터리를 쓰는 애드온 서버 (소켓은 열지 않고 execute_command만 사용)"""
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    server = addon.BlenderMCPServer()
+    server.snapshots = addon.SceneSnapshots(str(tmp_path / "snapshots"), 1 << 30)
+    yield server
+    # 다음 테스트가 이전 씬의 데이터 정리 시간에 영향받지 않도록 비움
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+
+
+def _call(server, method: str, **params) -> dict:
+    result = server.execute_command(method, params)
+    assert result["status"] == "success", result
+    return result
+
+
+def _make_model(path: str, objects: int = 12, subdivisions: int = 4):
+    """재질이 있는 구 여러 개로 된 GLB를 만들고 씬을 비움"""
+    for index in range(objects):
+        bpy.ops.mesh.primitive_ico_sphere_add(subdivisions=subdivisions, location=(index * 2.5, 0, 0))
+        material = bpy.data.materials.new(name=f"Material{index}")
+        bpy.context.active_object.data.materials.append(material)
+    bpy.ops.export_scene.gltf(filepath=path, export_format='GLB')
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+
+
+def test_snapshot_restore_vs_import(server, tmp_path):
+    model = str(tmp_path / "model.glb")
+    _make_model(model)
+
+    assert _call(server, "load_model", file_path=model)["source"] == "import"
+    restore_samples = []
+    for _ in range(RELOADS):
+        started = time.perf_counter()
+        assert _call(server, "load_model", file_path=model)["source"] == "snapshot"
+        restore_samples.append(time.perf_counter() - started)
+
+    stats = server.snapshots.summary()
+    print(f"\nglTF import {stats['avg_import_ms']}ms, snapshot restore {summarize(restore_samples)}, "
+          f"snapshot save {stats['avg_save_ms']}ms")
+    assert len(bpy.context.scene.objects) == 12
+    # 다시 로드해도 데이터가 쌓이거나 이름에 .001이 붙지 않음
+    assert len(bpy.data.meshes) == 12
+    assert sorted(material.name for material in bpy.data.materials) == sorted(f"Material{i}" for i in range(12))
+    assert stats["avg_restore_ms"] < stats["avg_import_ms"]
+
+
+def test_restore_keeps_flat_material_names_and_collections(server, tmp_path):
+    model = str(tmp_path / "model.glb")
+    edited = str(tmp_path / "edited.glb")
+    _make_model(model, objects=3, subdivisions=2)
+    _call(server, "load_model", file_path=model)
+
+    root = bpy.context.scene.collection
+    parts = bpy.data.collections.new("Parts")
+    root.children.link(parts)
+    moved = root.objects[0]
+    root.objects.unlink(moved)
+    parts.objects.link(moved)
+    moved_name = moved.name
+    others = sorted(obj.name for obj in root.objects)
+    _call(server, "execute_edit", command="change_color", params={"r": 1.0, "g": 0.0, "b": 0.0})
+    flat_name = addon.flat_material_name((1.0, 0.0, 0.0, 1.0), 0.0, 0.5)
+    _call(server, "export_model", file_path=edited)
+    server.flush_snapshot()
+
+    for _ in range(2):
+        assert _call(server, "load_model", file_path=edited)["source"] == "snapshot"
+        # 지운 씬의 데이터가 먼저 정리되어 공유 재질이 같은 이름으로 복원됨
+        assert [material.name for material in bpy.data.materials] == [flat_name]
+        assert [collection.name for collection in root.children] == ["Parts"]
+        assert [obj.name for obj in bpy.data.collections["Parts"].objects] == [moved_name]
+        assert sorted(obj.name for obj in root.objects) == others
+        # 이름으로 찾은 공유 재질을 그대로 다시 사용
+        created = server.material_stats["created"]
+        _call(server, "execute_edit", command="change_color", params={"r": 1.0, "g": 0.0, "b": 0.0})
+        assert server.material_stats["created"] == created
+
+
+def _exported_triangles(path: str) -> int:
+    """GLB의 인덱스 accessor로 센 삼각형 수"""
+    with open(path, "rb") as f:
+        data = f.read()
+    json_length = struct.unpack_from("<I", data, 12)[0]
+    gltf = json.loads(data[20:20 + json_length])
+    return sum(gltf["accessors"][primitive["indices"]]["count"] // 3
+               for mesh in gltf["meshes"] for primitive in mesh["primitives"])
+
+
+def _subdivide_and_export(server, tmp_path, budget: int, levels: int, monkeypatch):
+    monkeypatch.setattr(addon, "TRIANGLE_BUDGET", budget)
+    model = str(tmp_path / "model.glb")
+    _make_model(model, objects=1, subdivisions=2)
+    _call(server, "load_model", file_path=model)
+    result = _call(server, "execute_edit", command="subdivide", params={"levels": levels})
+    output = str(tmp_path / f"subdivided_{budget}.glb")
+    exported = _call(server, "export_model", file_path=output)
+    return result, exported, output
+
+
+def test_subdivide_budget_clamps_levels(server, tmp_path, monkeypatch):
+    """삼각형 80개 구에 레벨 5(약 12만 삼각형) 요청을 예산 2만으로 낮추고, 예상 삼각형 수가 실제로 내보낸 수와 같은지 확인"""
+    result, exported, output = _subdivide_and_export(server, tmp_path, 20000, 5, monkeypatch)
+    stats = result["subdivide"]
+    assert (stats["requested_levels"], stats["levels"]) == (5, 3)
+    assert stats["triangles_after"] <= 20000
+    assert _exported_triangles(output) == stats["triangles_after"]
+    # 내보내기 전까지 뷰포트는 낮은 레벨로 유지
+    modifier = bpy.context.scene.objects[0].modifiers["Subdivision"]
+    assert (modifier.levels, modifier.render_levels) == (addon.SUBDIVIDE_VIEWPORT_LEVELS, 3)
+
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    unclamped, unclamped_export, unclamped_output = _subdivide_and_export(server, tmp_path, 10 ** 7, 5, monkeypatch)
+    assert unclamped["subdivide"]["levels"] == 5
+    assert _exported_triangles(unclamped_output) == unclamped["subdivide"]["triangles_after"]
+    print(f"\nsubdivide level 5 -> {stats['levels']} (budget 20k): {stats['triangles_after']} triangles, "
+          f"export {exported['export_ms']:.0f}ms, {exported['bytes'] / 1024:.0f}KB; "
+          f"unclamped: {unclamped['subdivide']['triangles_after']} triangles, "
+          f"export {unclamped_export['export_ms']:.0f}ms, {unclamped_export['bytes'] / 1024:.0f}KB")
+    assert exported["bytes"] < unclamped_export["bytes"]
+    assert exported["export_ms"] < unclamped_export["export_ms"]
+
+
+def test_subdivide_over_budget_is_not_applied(server, tmp_path, monkeypatch):
+    result, _, _ = _subdivide_and_export(server, tmp_path, 100, 2, monkeypatch)
+    assert result["subdivide"]["levels"] == 0
+    assert not bpy.context.scene.objects[0].modifiers
+    # 씬이 바뀌지 않았으므로 세대 번호가 그대로여서 다시 내보낼 필요 없음
+    assert not server.dirty
+
+
+def _rebuild_material_per_object(objects, color_rgba):
+    """비교 기준: 편집마다 객체별 재질과 노드 트리를 새로 만드는 방식 (떼어낸 재질은 그대로 남음)"""
+    for obj in objects:
+        obj.data.materials.clear()
+        mat = bpy.data.materials.new(name=f"Material_{obj.name}")
+        mat.use_nodes = True
+        obj.data.materials.append(mat)
+        nodes = mat.node_tree.nodes
+        nodes.clear()
+        bsdf = nodes.new(type='ShaderNodeBsdfPrincipled')
+        output = nodes.new(type='ShaderNodeOutputMaterial')
+        mat.node_tree.links.new(bsdf.outputs['BSDF'], output.inputs['Surface'])
+        bsdf.inputs['Base Color'].default_value = color_rgba
+
+
+def test_color_edits_share_materials(server, tmp_path, monkeypatch):
+    model = str(tmp_path / "model.glb")
+    _make_model(model, objects=4, subdivisions=1)
+    _call(server, "load_model", file_path=model)
+
+    started = time.perf_counter()
+    for index in range(COLOR_EDITS):
+        r, g, b = COLORS[index % len(COLORS)]
+        _call(server, "execute_edit", command="change_color", params={"r": r, "g": g, "b": b})
+    shared_s = time.perf_counter() - started
+    materials_before_purge = len(bpy.data.materials)
+    monkeypatch.setattr(addon, "ORPHAN_PURGE_INTERVAL", 0.0)
+    server.purge_orphans()
+    materials_after_purge = len(bpy.data.materials)
+    shared_export = _call(server, "export_model", file_path=str(tmp_path / "shared.glb"))
+
+    # 공유 재질은 색상마다 하나만 만들고 이후 편집은 모두 재사용
+    assert server.material_stats["created"] == len(COLORS)
+    assert server.material_stats["reused"] == COLOR_EDITS - len(COLORS)
+    assert materials_before_purge == len(COLORS) + 4
+    # 정리하면 원래 재질 4개와 지금 쓰지 않는 색상 재질이 지워지고 마지막 색상 재질만 남음
+    assert server.material_stats["purged_materials"] == 4 + len(COLORS) - 1
+    assert [mat.name for mat in bpy.data.materials] == [addon.flat_material_name((*COLORS[-1], 1.0), 0.0, 0.5)]
+
+    _call(server, "load_model", file_path=model)
+    objects = [obj for obj in bpy.context.scene.objects if obj.type == 'MESH']
+    started = time.perf_counter()
+    for index in range(COLOR_EDITS):
+        _rebuild_material_per_object(objects, (*COLORS[index % len(COLORS)], 1.0))
+    rebuild_s = time.perf_counter() - started
+    rebuild_materials = len(bpy.data.materials)
+    rebuild_export = _call(server, "export_model", file_path=str(tmp_path / "rebuild.glb"))
+
+    print(f"\n{COLOR_EDITS} color edits on {len(objects)} objects: shared materials {shared_s * 1000:.0f}ms, "
+          f"{materials_before_purge} materials ({materials_after_purge} after purge), export {shared_export['export_ms']:.0f}ms; "
+          f"rebuild per object {rebuild_s * 1000:.0f}ms, {rebuild_materials} materials, "
+          f"export {rebuild_export['export_ms']:.0f}ms")
+    assert rebuild_materials >= COLOR_EDITS * len(objects)
+    assert shared_s < rebuild_s
+
+
+def test_dispatcher_wait_after_idle_backoff(server):
+    """bpy.app.timers처럼 timer_tick의 반환값만큼 쉬며 실행하고, 간격이 최대로 늘어난 뒤 다른 스레드에서 명령을 넣음"""
+    dispatcher = addon.CommandDispatcher(server)
+    backend, addon_side = socket.socketpair()
+    waits = []
+
+    def send_after_idle():
+        for index in range(5):
+            # 간격이 IDLE_INTERVAL까지 늘어날 만큼 기다린 뒤 타이머 주기와 어긋나게 명령 도착
+            time.sleep(max(0.3, dispatcher.IDLE_INTERVAL * 3) + index * 0.013)
+            addon.command_queue.put({"request_id": index, "method": "snapshot_stats", "params": {},
+                                     "conn": addon_side, "received_at": time.perf_counter()})
+
+    sender = threading.Thread(target=send_after_idle)
+    sender.start()
+    reader = backend.makefile("rb")
+    intervals = []
+    try:
+        while len(waits) < 5:
+            intervals.append(dispatcher.timer_tick())
+            time.sleep(intervals[-1])
+            while select.select([backend], [], [], 0)[0]:
+                waits.append(json.loads(reader.readline())["result"]["timing"]["queue_wait_ms"])
+    finally:
+        sender.join()
+        reader.close()
+        backend.close()
+        addon_side.close()
+
+    print(f"\nqueue wait after idle backoff: {waits} ms (IDLE_INTERVAL {dispatcher.IDLE_INTERVAL * 1000:g}ms)")
+    assert max(intervals) == dispatcher.IDLE_INTERVAL
+    # 이전 고정 간격(100ms)보다 오래 기다리지 않음
+    assert max(waits) < 100
@@ -0,0 +1,169 @@
+"""
+백엔드 <-> Blender 애드온 JSON-RPC 전송 처리량
+실제 애드온(blender_mcp_addon.py)을 bpy 모듈로 헤드리스 실행하고, 연결 하나에서
+명령을 하나씩 주고받을 때와 여러 명령을 동시에(파이프라인) 보낼 때의 처리량 / 지연을 비교
+bpy 모듈(pip install bpy)이 없으면 건너뜀
+"""
+import asyncio
+import importlib.util
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import BACKEND_DIR
+from helpers import percentile, summarize
+from app.services.blender_mcp_service import BlenderMCPService
+
+pytestmark = pytest.mark.skipif(importlib.util.find_spec("bpy") is None, reason="bpy 모듈이 없음")
+
+COMMANDS = 300
+NETWORK_DELAY = 0.001  # 지연 프록시의 단방향 지연 (초, 워커가 다른 호스트/컨테이너에 있을 때)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def addon_port(tmp_path_factory):
+    """헤드리스 애드온 프로세스를 띄우고 포트가 열릴 때까지 대기"""
+    tmp_path = tmp_path_factory.mktemp("addon")
+    port = _free_port()
+    with open(tmp_path / "addon.log", "w") as log:
+        process = subprocess.Popen(
+            [sys.executable, str(BACKEND_DIR / "blender_mcp_addon.py"), "--",
+             "--port", str(port), "--snapshot-dir", str(tmp_path / "snapshots")],
+            stdout=log, stderr=subprocess.STDOUT,
+        )
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                socket.create_connection(("localhost", port), timeout=1).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    pytest.fail(f"addon did not start: {(tmp_path / 'addon.log').read_text()[-2000:]}")
+                time.sleep(0.1)
+        yield port
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+class LatencyProxy:
+    """양방향으로 받은 데이터를 NETWORK_DELAY 뒤에 전달하는 TCP 프록시 (순서 유지, 지연끼리 겹침)"""
+
+    def __init__(self, upstream_port: int):
+        self.upstream_port = upstream_port
+        self._tasks = set()
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "localhost", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _handle(self, client_reader, client_writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection("localhost", self.upstream_port)
+        for reader, writer in ((client_reader, upstream_writer), (upstream_reader, client_writer)):
+            task = asyncio.create_task(self._pump(reader, writer))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _pump(reader, writer):
+        queue = asyncio.Queue()
+
+        async def deliver():
+            while (item := await queue.get()) is not None:
+                deliver_at, data = item
+                await asyncio.sleep(max(0.0, deliver_at - time.perf_counter()))
+                writer.write(data)
+                await writer.drain()
+            writer.close()
+
+        delivery = asyncio.create_task(deliver())
+        try:
+            while data := await reader.read(65536):
+                queue.put_nowait((time.perf_counter() + NETWORK_DELAY, data))
+        finally:
+            queue.put_nowait(None)
+            await delivery
+
+
+async def _timed_command(service: BlenderMCPService, latencies: list, method: str = "snapshot_stats", params=None):
+    started = time.perf_counter()
+    response = await service.send_command(method, params)
+    latencies.append(time.perf_counter() - started)
+    return response
+
+
+async def _measure(port: int):
+    service = BlenderMCPService(port=port)
+    await service.connect()
+    try:
+        sequential = []
+        started = time.perf_counter()
+        for _ in range(COMMANDS):
+            await _timed_command(service, sequential)
+        sequential_s = time.perf_counter() - started
+
+        pipelined = []
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(_timed_command(service, pipelined) for _ in range(COMMANDS)))
+        pipelined_s = time.perf_counter() - started
+    finally:
+        await service.disconnect()
+    return sequential, sequential_s, pipelined, pipelined_s, responses
+
+
+async def _measure_via_proxy(port: int):
+    async with LatencyProxy(port) as proxy:
+        return await _measure(proxy.port)
+
+
+def test_pipelined_throughput(addon_port):
+    """같은 호스트에서는 왕복이 짧아 차이가 작으므로 측정값만 출력하고, 네트워크 지연이 있을 때 파이프라인 효과를 확인"""
+    for label, measure in (("localhost", _measure), (f"+{NETWORK_DELAY * 1000:g}ms each way", _measure_via_proxy)):
+        sequential, sequential_s, pipelined, pipelined_s, responses = asyncio.run(measure(addon_port))
+        print(f"\n[{label}] sequential: {COMMANDS / sequential_s:.0f} req/s, {summarize(sequential)}")
+        print(f"[{label}] pipelined:  {COMMANDS / pipelined_s:.0f} req/s, {summarize(pipelined)}")
+
+        assert all(response["result"]["status"] == "success" for response in responses)
+        assert len({response["id"] for response in responses}) == COMMANDS
+    # 하나씩 보내면 명령마다 왕복 지연을 기다리지만, 파이프라인은 왕복 지연을 한 번만 기다림
+    assert sequential_s >= COMMANDS * 2 * NETWORK_DELAY
+    assert pipelined_s < sequential_s / 5
+
+
+async def _large_and_small(port: int):
+    """큰 메시지 뒤에 보낸 작은 명령들도 모두 자기 응답을 받는지 (줄 단위 프레이밍이 섞이지 않는지)"""
+    service = BlenderMCPService(port=port)
+    try:
+        latencies = []
+        large = _timed_command(service, latencies, "snapshot_stats", {"padding": "x" * (4 * 1024 * 1024)})
+        small = [_timed_command(service, latencies, "execute_edits", {"commands": [{"command": f"bogus{i}"}]})
+                 for i in range(20)]
+        return await asyncio.gather(large, *small)
+    finally:
+        await service.disconnect()
+
+
+def test_large_message_framing(addon_port):
+    responses = asyncio.run(_large_and_small(addon_port))
+    assert responses[0]["result"]["status"] == "success"
+    for index, response in enumerate(responses[1:]):
+        # 알 수 없는 명령은 실행 전에 거절되며 메시지에 자기 명령 이름이 담김
+        assert f"bogus{index}" in response["result"]["message"]
+    assert percentile([r["result"]["timing"]["exec_ms"] for r in responses], 99) < 1000
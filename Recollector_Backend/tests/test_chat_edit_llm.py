@@ -0,0 +1,135 @@
+"""
+채팅 편집 LLM 호출이 이벤트 루프를 막지 않는지
+스텁 Anthropic 스트림(토큰마다 지연)으로 여러 작업의 채팅 편집을 동시에 실행하면서 10ms 주기 타이머의 지연을 측정하고,
+같은 스트림을 블로킹(동기 클라이언트처럼 time.sleep)으로 받을 때와 비교
+"""
+import asyncio
+import gc
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from helpers import make_glb
+from app.core.config import settings
+from app.services import blender_mcp_service, conversation_store
+from app.services.blender_mcp_service import ChatEditor
+from app.services.blender_pool import BlenderPool
+
+EDITS = 16
+TOKEN_DELAY = 0.02  # 스트림 조각 사이 지연 (초)
+PLAN_CHUNKS = ['{"command": "scale_model", ', '"params": {"factor": 2}', ', "description": "크게"}', " 키웠습니다."]
+
+
+class StubStream:
+    """anthropic messages.stream() 컨텍스트 매니저 흉내 (blocking이면 조각 사이에 스레드를 멈춤)"""
+
+    def __init__(self, blocking: bool = False, fail_after_plan: bool = False):
+        self.blocking = blocking
+        self.fail_after_plan = fail_after_plan
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for index, chunk in enumerate(PLAN_CHUNKS):
+            if self.blocking:
+                time.sleep(TOKEN_DELAY)
+            else:
+                await asyncio.sleep(TOKEN_DELAY)
+            if self.fail_after_plan and index == 3:
+                raise RuntimeError("stream interrupted")
+            yield chunk
+
+    async def get_final_message(self):
+        return SimpleNamespace(usage=SimpleNamespace(input_tokens=100, output_tokens=20))
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    """LLM 경로를 타도록 로컬 파서 / 명령 캐시를 끄고 스트림을 스텁으로 교체"""
+    options = {}
+    monkeypatch.setattr(settings, "INTENT_PARSER_ENABLED", False)
+    monkeypatch.setattr(settings, "EDIT_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "ANTHROPIC_STREAMING", True)
+    monkeypatch.setattr(blender_mcp_service.anthropic_client.messages, "stream", lambda **kwargs: StubStream(**options))
+    return options
+
+
+def _model(task_id: str) -> str:
+    path = os.path.join(settings.OUTPUT_DIR, f"{task_id}.glb")
+    make_glb(path)
+    edited = blender_mcp_service.edited_model_path(task_id)
+    if os.path.exists(edited):
+        os.remove(edited)
+    return path
+
+
+async def _concurrent_edits(prefix: str):
+    """동시 채팅 편집 EDITS개를 실행하며 10ms 타이머의 최대 지연(초)을 측정"""
+    pool = BlenderPool()
+    lags = []
+
+    async def ticker():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - started - 0.01)
+
+    async def edit(index: int):
+        task_id = f"{prefix}-{index}"
+        async with pool.edit_session(task_id) as session:
+            return await ChatEditor(session).chat_edit(f"분위기 있게 {index}", _model(task_id), task_id)
+
+    # 앞선 테스트(bpy 등)가 남긴 객체를 전체 GC가 훑는 시간이 지연에 섞이지 않도록 기존 힙은 고정
+    gc.collect()
+    gc.freeze()
+    ticker_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(edit(i) for i in range(EDITS)))
+    finally:
+        ticker_task.cancel()
+        gc.unfreeze()
+    return results, time.perf_counter() - started, max(lags)
+
+
+def test_streaming_llm_keeps_event_loop_responsive(stub_llm):
+    results, elapsed, max_lag = asyncio.run(_concurrent_edits("llm-async"))
+    stub_llm["blocking"] = True
+    blocking_results, blocking_elapsed, blocking_lag = asyncio.run(_concurrent_edits("llm-blocking"))
+
+    stream_s = TOKEN_DELAY * len(PLAN_CHUNKS)
+    print(f"\n{EDITS} concurrent LLM edits (stream {stream_s * 1000:.0f}ms each, "
+          f"ANTHROPIC_MAX_CONCURRENCY={settings.ANTHROPIC_MAX_CONCURRENCY}):")
+    print(f"  async stream:    {elapsed * 1000:.0f}ms total, max event-loop lag {max_lag * 1000:.1f}ms")
+    print(f"  blocking stream: {blocking_elapsed * 1000:.0f}ms total, max event-loop lag {blocking_lag * 1000:.1f}ms")
+
+    assert all(result["success"] for result in results + blocking_results)
+    assert results[0]["tools_used"] == [{"tool": "blender_edit", "command": "scale_model", "params": {"factor": 2}}]
+    # 동시 요청 수 제한 단위로 겹쳐 실행되고, 그동안 다른 코루틴도 계속 실행됨
+    waves = -(-EDITS // settings.ANTHROPIC_MAX_CONCURRENCY)
+    assert elapsed < stream_s * waves + 1.0
+    assert max_lag < 0.05
+    assert blocking_lag > max_lag
+
+
+def test_stream_failure_after_early_dispatch_is_recorded(stub_llm):
+    """JSON 명령이 완성되어 먼저 실행한 뒤 스트림이 끊기면, 적용된 편집을 대화와 장면 상태에 남김"""
+    stub_llm["fail_after_plan"] = True
+    task_id = "llm-interrupted"
+
+    async def run():
+        async with BlenderPool().edit_session(task_id) as session:
+            return await ChatEditor(session).chat_edit("분위기 있게", _model(task_id), task_id)
+
+    result = asyncio.run(run())
+    assert result["success"] is False
+    assert os.path.exists(blender_mcp_service.edited_model_path(task_id))
+    assert conversation_store.history(task_id)[-1]["role"] == "assistant"
+    assert conversation_store.scene_state(task_id) == {"scale": 2.0, "edits": 1}
@@ -0,0 +1,85 @@
+"""
+GLB 직접 편집이 해석할 수 없는 파일 / 파라미터를 GLBError로 알리고, 채팅 편집이 Blender로 넘기는지
+"""
+import asyncio
+import os
+
+import pytest
+
+from helpers import make_glb
+from app.services import blender_mcp_service, glb_editor
+from app.services.blender_mcp_service import ChatEditor
+
+MESH_NODE = {"asset": {"version": "2.0"}, "nodes": [{"mesh": 0}]}
+PRIMITIVE = {"attributes": {"POSITION": 0}, "material": 0}
+
+MALFORMED = {
+    "empty file": (None, {"command": "scale_model", "params": {"factor": 2}}),
+    "json array": ([], {"command": "scale_model", "params": {"factor": 2}}),
+    "non-numeric factor": (None, {"command": "scale_model", "params": {"factor": "big"}}),
+    "non-numeric color": (None, {"command": "change_color", "params": {"r": None}}),
+    "no meshes": (MESH_NODE, {"command": "change_color", "params": {"r": 1, "g": 0, "b": 0}}),
+    "mesh index out of range": ({**MESH_NODE, "nodes": [{"mesh": 3}], "meshes": [{"primitives": [PRIMITIVE]}]},
+                                {"command": "change_color", "params": {"r": 1, "g": 0, "b": 0}}),
+    "no materials": ({**MESH_NODE, "meshes": [{"primitives": [PRIMITIVE]}]},
+                     {"command": "change_material", "params": {"metallic": 1.0}}),
+}
+
+
+def _malformed_model(tmp_path, case: str) -> str:
+    gltf, _ = MALFORMED[case]
+    path = tmp_path / "model.glb"
+    if case == "empty file":
+        path.write_bytes(b"")
+    else:
+        make_glb(path, gltf=gltf)
+    return str(path)
+
+
+@pytest.mark.parametrize("case", MALFORMED)
+def test_malformed_input_raises_glb_error(tmp_path, case):
+    path = _malformed_model(tmp_path, case)
+    with pytest.raises(glb_editor.GLBError):
+        glb_editor.apply_edits(path, str(tmp_path / "edited.glb"), [MALFORMED[case][1]])
+    assert not os.path.exists(tmp_path / "edited.glb")
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".part")] == []
+
+
+class StubSession:
+    """Blender 워커 대신 run_edits 호출을 기록하는 편집 세션"""
+
+    def __init__(self):
+        self.calls = []
+
+    def has_unsaved_edits(self) -> bool:
+        return False
+
+    async def blender(self):
+        return self
+
+    async def run_edits(self, commands, task_id, model_path):
+        self.calls.append(commands)
+        return commands, {"result": {"status": "success", "message": "Blender 편집 완료"}}
+
+
+@pytest.mark.parametrize("case", MALFORMED)
+def test_malformed_glb_falls_back_to_blender(tmp_path, case):
+    path = _malformed_model(tmp_path, case)
+    task_id = f"glb-fallback-{case.replace(' ', '-')}"
+    session = StubSession()
+    command = MALFORMED[case][1]
+    commands, result = asyncio.run(ChatEditor(session)._dispatch_edit(command, task_id, path))
+    assert session.calls == [[command]]
+    assert result["result"]["message"] == "Blender 편집 완료"
+    assert not os.path.exists(blender_mcp_service.edited_model_path(task_id))
+
+
+def test_valid_glb_stays_on_fast_path(tmp_path):
+    path = str(tmp_path / "model.glb")
+    make_glb(path)
+    task_id = "glb-fast-path"
+    session = StubSession()
+    _, result = asyncio.run(ChatEditor(session)._dispatch_edit(
+        {"command": "change_color", "params": {"r": 1, "g": 0, "b": 0}}, task_id, path))
+    assert session.calls == []
+    assert result["result"]["message"] == "GLB 직접 편집 완료"
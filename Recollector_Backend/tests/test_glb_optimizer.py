@@ -0,0 +1,266 @@
+"""
+gltfpack 전송용 변형 / LOD 체인
+- 스텁 gltfpack(인자를 기록하고 GLB를 복사, -si면 인덱스 수를 비율만큼 줄임)으로 optimize / build_lods / schedule의
+  gltfpack 인자, 임시 파일 교체, 실패 / 원본 변경 시 결과 폐기, 연속 요청 합치기를 확인
+- 실제 gltfpack이 있으면 높이맵 메쉬 GLB(약 13만 삼각형)의 원본 대비 크기와 실행 시간, LOD 단계별 삼각형 수를 측정
+- 실제 gltfpack과 Node의 meshoptimizer 패키지(뷰어가 쓰는 MeshoptDecoder, NODE_PATH로 찾음)가 있으면
+  .opt.glb 디코딩 시간과 원본 파싱 시간을 비교 (없으면 건너뜀)
+"""
+import asyncio
+import json
+import os
+import shutil
+import stat
+import subprocess
+import sys
+
+import pytest
+
+from helpers import make_mesh_glb, summarize
+from app.core.config import settings
+from app.services import glb_optimizer
+
+RUNS = 3
+LINK_BYTES_PER_S = 10 * 1024 * 1024  # 디코딩 비용과 비교할 전송 속도 가정 (80Mbps)
+
+needs_gltfpack = pytest.mark.skipif(shutil.which(settings.GLTFPACK_PATH) is None, reason="gltfpack이 없음")
+
+STUB_GLTFPACK = '''#!{python}
+import json, os, struct, sys, time
+args = sys.argv[1:]
+with open(os.environ["GLTFPACK_STUB_LOG"], "a") as log:
+    log.write(json.dumps(args) + "\\n")
+time.sleep(float(os.environ.get("GLTFPACK_STUB_DELAY", "0")))
+src, dst = args[args.index("-i") + 1], args[args.index("-o") + 1]
+if os.environ.get("GLTFPACK_STUB_TOUCH"):
+    with open(src, "ab") as f:
+        f.write(b"\\0\\0\\0\\0")
+if os.environ.get("GLTFPACK_STUB_FAIL"):
+    sys.exit("stub failure")
+ratio = float(args[args.index("-si") + 1]) if "-si" in args else 1.0
+with open(src, "rb") as f:
+    data = f.read()
+json_length = struct.unpack_from("<I", data, 12)[0]
+gltf = json.loads(data[20:20 + json_length])
+for mesh in gltf["meshes"]:
+    for primitive in mesh["primitives"]:
+        accessor = gltf["accessors"][primitive["indices"]]
+        accessor["count"] = int(accessor["count"] // 3 * ratio) * 3
+chunk = json.dumps(gltf).encode()
+chunk += b" " * (-len(chunk) % 4)
+rest = data[20 + json_length:]
+with open(dst, "wb") as f:
+    f.write(struct.pack("<4sII", b"glTF", 2, 20 + len(chunk) + len(rest)))
+    f.write(struct.pack("<II", len(chunk), 0x4E4F534A) + chunk + rest)
+'''
+
+# 원본은 버퍼 뷰를 복사, .opt.glb는 EXT_meshopt_compression 버퍼 뷰를 MeshoptDecoder로 해제 (폴백 버퍼는 비어 있음)
+DECODE_SCRIPT = '''
+const { readFileSync } = require("fs");
+const { MeshoptDecoder } = require("meshoptimizer");
+function decode(data) {
+  const started = performance.now();
+  const jsonLength = data.readUInt32LE(12);
+  const gltf = JSON.parse(data.subarray(20, 20 + jsonLength).toString());
+  const bin = data.subarray(20 + jsonLength + 8);
+  let bytes = 0;
+  for (const view of gltf.bufferViews) {
+    const ext = (view.extensions || {}).EXT_meshopt_compression;
+    const buffer = gltf.buffers[view.buffer];
+    if (ext) {
+      const target = new Uint8Array(ext.count * ext.byteStride);
+      const offset = ext.byteOffset || 0;
+      MeshoptDecoder.decodeGltfBuffer(target, ext.count, ext.byteStride, bin.subarray(offset, offset + ext.byteLength),
+                                      ext.mode, ext.filter || "NONE");
+      bytes += target.length;
+    } else if (!((buffer.extensions || {}).EXT_meshopt_compression || {}).fallback) {
+      const offset = view.byteOffset || 0;
+      bytes += new Uint8Array(bin.subarray(offset, offset + view.byteLength)).length;
+    }
+  }
+  return { ms: performance.now() - started, bytes };
+}
+MeshoptDecoder.ready.then(() => {
+  const results = {};
+  for (const path of process.argv.slice(1)) {
+    const data = readFileSync(path);
+    const samples = [];
+    for (let i = 0; i < 20; i++) samples.push(decode(data));
+    samples.sort((a, b) => a.ms - b.ms);
+    results[path] = samples[samples.length >> 1];
+  }
+  console.log(JSON.stringify(results));
+});
+'''
+
+
+def _meshopt_decoder_available() -> bool:
+    if shutil.which("node") is None:
+        return False
+    return subprocess.run(["node", "-e", "require.resolve('meshoptimizer')"], capture_output=True).returncode == 0
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    """텍스처가 없는 메쉬 모델 (텍스처 변환 없이 메쉬 압축만 확인)"""
+    monkeypatch.setattr(settings, "GLB_OPTIMIZE_TEXTURES", "")
+    # 세마포어는 처음 사용한 이벤트 루프에 묶이므로 asyncio.run마다 새로 만듦
+    monkeypatch.setattr(glb_optimizer, "_slots", None)
+    path = tmp_path / "terrain.glb"
+    return str(path), make_mesh_glb(path)
+
+
+@pytest.fixture
+def stub_gltfpack(tmp_path, monkeypatch):
+    """GLTFPACK_PATH를 스텁 스크립트로 바꾸고, 실행마다 기록된 인자 목록을 돌려주는 함수를 반환"""
+    stub = tmp_path / "bin" / "gltfpack"
+    stub.parent.mkdir()
+    stub.write_text(STUB_GLTFPACK.format(python=sys.executable))
+    stub.chmod(stub.stat().st_mode | stat.S_IXUSR)
+    log = tmp_path / "gltfpack.log"
+    monkeypatch.setattr(settings, "GLTFPACK_PATH", str(stub))
+    monkeypatch.setattr(glb_optimizer, "_slots", None)
+    monkeypatch.setenv("GLTFPACK_STUB_LOG", str(log))
+    model_dir = tmp_path / "models"
+    model_dir.mkdir()
+    path = model_dir / "small.glb"
+    triangles = make_mesh_glb(path, grid=32)
+
+    def calls():
+        return [json.loads(line) for line in log.read_text().splitlines()] if log.exists() else []
+
+    return str(path), triangles, calls
+
+
+def _leftovers(path: str):
+    """gltfpack 임시 출력(.{uuid}.glb)이 남았는지"""
+    return [name for name in os.listdir(os.path.dirname(path)) if name.startswith(".")]
+
+
+@pytest.mark.parametrize("textures, texture_flags", [("ktx2", ["-tc"]), ("webp", ["-tw"]), ("", [])])
+def test_optimize_gltfpack_arguments(stub_gltfpack, monkeypatch, textures, texture_flags):
+    path, triangles, calls = stub_gltfpack
+    monkeypatch.setattr(settings, "GLB_OPTIMIZE_TEXTURES", textures)
+    result = asyncio.run(glb_optimizer.optimize(path))
+
+    [args] = calls()
+    assert args[:2] == ["-i", path]
+    # 원본과 같은 디렉터리의 숨김 임시 파일에 만든 뒤 교체
+    assert args[2] == "-o" and os.path.dirname(args[3]) == os.path.dirname(path)
+    assert os.path.basename(args[3]).startswith(".") and args[3].endswith(".glb")
+    assert args[4:] == ["-cc", "-kn", "-km", *texture_flags]
+    assert result["path"] == glb_optimizer.optimized_path(path)
+    assert glb_optimizer.variant_path(path, "optimized") == result["path"]
+    assert glb_optimizer.triangle_count(result["path"]) == triangles
+    assert not _leftovers(path)
+
+
+def test_build_lods_gltfpack_arguments(stub_gltfpack, monkeypatch):
+    path, triangles, calls = stub_gltfpack
+    monkeypatch.setattr(settings, "GLB_OPTIMIZE_TEXTURES", "ktx2")
+    manifest = asyncio.run(glb_optimizer.build_lods(path))
+
+    ratios = sorted(settings.GLB_LOD_RATIOS, reverse=True)
+    assert sorted(args[args.index("-si") + 1] for args in calls()) == sorted(f"{ratio:g}" for ratio in ratios)
+    # 단순화 비율 뒤에 최적화 변형과 같은 압축 인자
+    assert all(args[4:5] == ["-si"] and args[6:] == ["-cc", "-kn", "-km", "-tc"] for args in calls())
+    assert [level["triangles"] for level in manifest["levels"]] == \
+        [triangles] + [int(triangles * ratio) for ratio in ratios]
+    for level in manifest["levels"][1:]:
+        assert os.path.exists(glb_optimizer.lod_path(path, level["level"]))
+    assert glb_optimizer.lod_manifest(path)["stale"] is False
+    assert not _leftovers(path)
+
+
+@pytest.mark.parametrize("failure", ["GLTFPACK_STUB_FAIL", "GLTFPACK_STUB_TOUCH"])
+def test_failed_or_outdated_result_is_discarded(stub_gltfpack, monkeypatch, failure):
+    """gltfpack이 실패하거나 처리 중에 원본이 바뀌면 결과를 버리고 원본을 내려줌"""
+    path, _, calls = stub_gltfpack
+    monkeypatch.setenv(failure, "1")
+    assert asyncio.run(glb_optimizer.optimize(path)) is None
+    assert len(calls()) == 1
+    assert not os.path.exists(glb_optimizer.optimized_path(path))
+    assert glb_optimizer.variant_path(path, "optimized") == path
+    assert not _leftovers(path)
+
+
+def test_schedule_coalesces_repeated_edits(stub_gltfpack, monkeypatch):
+    """처리 중에 같은 파일이 여러 번 바뀌면 끝난 뒤 한 번만 다시 실행"""
+    path, _, calls = stub_gltfpack
+    monkeypatch.setenv("GLTFPACK_STUB_DELAY", "0.2")
+
+    async def run():
+        glb_optimizer.schedule(path)
+        task = glb_optimizer._running[path]
+        await asyncio.sleep(0.05)
+        glb_optimizer.schedule(path)
+        glb_optimizer.schedule(path)
+        await task
+
+    asyncio.run(run())
+    per_round = 1 + len(settings.GLB_LOD_RATIOS)
+    assert len(calls()) == 2 * per_round
+    assert path not in glb_optimizer._running
+    assert os.path.exists(glb_optimizer.optimized_path(path))
+
+
+@needs_gltfpack
+def test_optimized_variant_size_and_time(model, monkeypatch):
+    path, triangles = model
+    samples = []
+    for _ in range(RUNS):
+        monkeypatch.setattr(glb_optimizer, "_slots", None)
+        result = asyncio.run(glb_optimizer.optimize(path))
+        assert result is not None
+        samples.append(result["optimize_ms"] / 1000)
+
+    ratio = result["optimized_bytes"] / result["original_bytes"]
+    print(f"\n{triangles} triangles: {result['original_bytes'] // 1024}KB -> {result['optimized_bytes'] // 1024}KB "
+          f"({ratio:.0%}), gltfpack {summarize(samples)}")
+    # 양자화 + meshopt 압축으로 형상은 그대로 두고 크기만 줄어듦
+    assert glb_optimizer.triangle_count(result["path"]) == triangles
+    assert ratio < 0.5
+    assert glb_optimizer.variant_path(path, "optimized") == result["path"]
+
+
+@needs_gltfpack
+def test_lod_chain_triangles(model):
+    path, triangles = model
+    manifest = asyncio.run(glb_optimizer.build_lods(path))
+    assert manifest is not None
+    levels = manifest["levels"]
+    print(f"\nLOD chain ({manifest['build_ms']:.0f}ms): "
+          + ", ".join(f"{level['ratio']:g} -> {level['triangles']} triangles / {level['bytes'] // 1024}KB" for level in levels))
+
+    assert levels[0]["triangles"] == triangles
+    for previous, level in zip(levels, levels[1:]):
+        assert level["triangles"] < previous["triangles"]
+        assert level["triangles"] <= triangles * level["ratio"] * 1.1
+    assert glb_optimizer.lod_manifest(path)["stale"] is False
+
+
+@needs_gltfpack
+@pytest.mark.skipif(not _meshopt_decoder_available(), reason="node / meshoptimizer 패키지가 없음")
+def test_optimized_variant_decode_time(model):
+    """뷰어가 .opt.glb를 해제하는 시간이 줄어든 전송 시간보다 짧은지"""
+    path, _ = model
+    result = asyncio.run(glb_optimizer.optimize(path))
+    output = subprocess.run(["node", "-e", DECODE_SCRIPT, path, result["path"]],
+                            capture_output=True, text=True, check=True).stdout
+    decoded = json.loads(output)
+    original, optimized = decoded[path], decoded[result["path"]]
+    saved_s = (result["original_bytes"] - result["optimized_bytes"]) / LINK_BYTES_PER_S
+    print(f"\noriginal parse {original['ms']:.2f}ms ({original['bytes'] // 1024}KB), "
+          f"optimized decode {optimized['ms']:.2f}ms ({optimized['bytes'] // 1024}KB), "
+          f"transfer saved at {LINK_BYTES_PER_S // (1024 * 1024)}MB/s: {saved_s * 1000:.0f}ms")
+    assert (optimized["ms"] - original["ms"]) / 1000 < saved_s
+
+
+def test_without_gltfpack_serves_original(model, monkeypatch):
+    path, _ = model
+    monkeypatch.setattr(settings, "GLTFPACK_PATH", "gltfpack-not-installed")
+    assert not glb_optimizer.available()
+    assert asyncio.run(glb_optimizer.optimize(path)) is None
+    assert glb_optimizer.variant_path(path, "optimized") == path
+    assert glb_optimizer.lod_manifest(path)["stale"] is True
+    assert not os.path.exists(glb_optimizer.optimized_path(path))
@@ -0,0 +1,61 @@
+"""
+로컬 의도 파서 정확도 / 지연 시간
+data/intent_corpus.jsonl의 각 문장에 기대 결과(명령 목록, 또는 LLM에 맡겨야 하면 "llm")를 달아 두고
+로컬 처리 적중률과 오파싱(로컬에서 처리했는데 틀린 경우) 수를 측정
+"""
+import json
+import time
+
+import pytest
+
+from conftest import DATA_DIR
+from helpers import percentile, summarize
+from app.core.config import settings
+from app.services import intent_parser
+
+CORPUS = [json.loads(line) for line in (DATA_DIR / "intent_corpus.jsonl").read_text(encoding="utf-8").splitlines() if line]
+
+
+def handled_locally(intent) -> bool:
+    return intent is not None and intent.confidence >= settings.INTENT_PARSER_THRESHOLD
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["text"] for case in CORPUS])
+def test_corpus_case(case):
+    intent = intent_parser.parse(case["text"])
+    if case["expect"] == "llm":
+        assert not handled_locally(intent), intent
+    else:
+        assert handled_locally(intent), intent
+        assert intent.commands == case["expect"]
+
+
+def test_corpus_hit_rate():
+    """로컬 처리 대상 중 맞게 처리한 비율과 오파싱 수 (오파싱은 LLM보다 나쁘므로 0이어야 함)"""
+    local_cases = [case for case in CORPUS if case["expect"] != "llm"]
+    hits, misparses = 0, []
+    for case in CORPUS:
+        intent = intent_parser.parse(case["text"])
+        if not handled_locally(intent):
+            continue
+        if intent.commands == case["expect"]:
+            hits += 1
+        else:
+            misparses.append((case["text"], intent.commands))
+    hit_rate = hits / len(local_cases)
+    print(f"\nintent corpus: {len(CORPUS)} cases, local hit rate {hit_rate:.1%} ({hits}/{len(local_cases)}), "
+          f"misparses {len(misparses)}, LLM-bound {len(CORPUS) - len(local_cases)}")
+    assert not misparses, misparses
+    assert hit_rate >= 0.95
+
+
+def test_parse_latency():
+    """문장당 파싱 시간 (LLM 호출 수백 ms에 비해 무시할 수 있어야 함)"""
+    samples = []
+    for _ in range(50):
+        for case in CORPUS:
+            started = time.perf_counter()
+            intent_parser.parse(case["text"])
+            samples.append(time.perf_counter() - started)
+    print(f"\nintent_parser.parse: {summarize(samples, 'us', 1e6)}")
+    assert percentile(samples, 99) < 0.005
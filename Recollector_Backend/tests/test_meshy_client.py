@@ -0,0 +1,245 @@
+"""
+Meshy 공용 HTTP 클라이언트 커넥션 재사용 / 지연 시간
+연결 수를 세는 스텁 Meshy 서버(HTTP/1.1 keep-alive)에 작업 생성 -> 상태 조회 -> 다운로드를 동시에 실행해
+작업당 새로 연 연결 수와 작업 생성 p99 지연을, 요청마다 클라이언트를 새로 만드는 방식과 비교
+다운로드가 끊긴 뒤 이어받기 요청이 일시적 오류를 받아도 받은 부분을 버리지 않는지도 확인
+"""
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from helpers import percentile, summarize
+from app.core.config import settings
+from app.main import app
+from app.services import meshy_client as meshy_client_module
+from app.services.meshy_client import MeshyClient, meshy_client
+
+JOBS = 40
+POLLS_PER_JOB = 3
+MODEL_BYTES = 256 * 1024
+RESPONSE_DELAY = 0.005  # 스텁 서버 처리 시간 (초)
+
+
+class StubMeshyServer:
+    """image-to-3d 생성/조회와 모델 다운로드만 흉내 내는 최소 HTTP/1.1 서버"""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+        self.model = b"g" * MODEL_BYTES
+        self._server = None
+        self._writers = set()
+        self._jobs = 0
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        while self._writers:
+            await asyncio.sleep(0.01)
+        await self._server.wait_closed()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v2"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = request_line.split(" ", 2)
+                headers = {k.strip().lower(): v.strip() for k, v in
+                           (line.split(":", 1) for line in header_lines if ":" in line)}
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                await asyncio.sleep(RESPONSE_DELAY)
+                writer.write(self._respond(method, path, body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self._writers.discard(writer)
+
+    def _respond(self, method: str, path: str, body: bytes) -> bytes:
+        if method == "POST" and path == "/v2/image-to-3d":
+            json.loads(body)
+            self._jobs += 1
+            payload = json.dumps({"result": f"job{self._jobs}"}).encode()
+        elif path.startswith("/v2/image-to-3d/"):
+            payload = json.dumps({"status": "SUCCEEDED", "progress": 100,
+                                  "model_urls": {"glb": f"http://127.0.0.1:{self.port}/files/model.glb"}}).encode()
+        elif path == "/files/model.glb":
+            payload = self.model
+        else:
+            return b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n"
+        return b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(payload) + payload
+
+
+def _body_factory():
+    payload = json.dumps({"image_url": "data:image/png;base64," + "A" * 4096}).encode()
+
+    async def body():
+        yield payload
+
+    return body, len(payload)
+
+
+async def _run_job(client: MeshyClient, tmp_path, index: int, submit_latencies: list):
+    body_factory, content_length = _body_factory()
+    started = time.perf_counter()
+    job_id = await client.create_image_to_3d(body_factory, content_length)
+    submit_latencies.append(time.perf_counter() - started)
+    for _ in range(POLLS_PER_JOB):
+        status = await client.get_image_to_3d(job_id)
+    await client.download(status["model_urls"]["glb"], str(tmp_path / f"model{index}.glb"))
+
+
+async def _pooled(tmp_path, monkeypatch):
+    async with StubMeshyServer() as server:
+        monkeypatch.setattr(meshy_client_module, "MESHY_API_BASE_URL", server.base_url)
+        client = MeshyClient()
+        await client.start()
+        latencies = []
+        try:
+            await asyncio.gather(*(_run_job(client, tmp_path, i, latencies) for i in range(JOBS)))
+        finally:
+            await client.close()
+        return server.connections, server.requests, latencies
+
+
+async def _client_per_request(monkeypatch):
+    """비교 기준: 요청마다 httpx 클라이언트를 새로 만들어 연결도 매번 새로 맺는 방식"""
+    async with StubMeshyServer() as server:
+        latencies = []
+
+        async def job():
+            body_factory, content_length = _body_factory()
+            started = time.perf_counter()
+            async with httpx.AsyncClient() as client:
+                response = await client.post(f"{server.base_url}/image-to-3d", content=body_factory(),
+                                             headers={"Content-Length": str(content_length)})
+            latencies.append(time.perf_counter() - started)
+            job_id = response.json()["result"]
+            for _ in range(POLLS_PER_JOB):
+                async with httpx.AsyncClient() as client:
+                    status = (await client.get(f"{server.base_url}/image-to-3d/{job_id}")).json()
+            async with httpx.AsyncClient() as client:
+                await client.get(status["model_urls"]["glb"])
+
+        await asyncio.gather(*(job() for _ in range(JOBS)))
+        return server.connections, server.requests, latencies
+
+
+def test_connection_reuse_and_submit_latency(tmp_path, monkeypatch):
+    connections, requests, latencies = asyncio.run(_pooled(tmp_path, monkeypatch))
+    base_connections, base_requests, base_latencies = asyncio.run(_client_per_request(monkeypatch))
+
+    print(f"\npooled client:      {requests} requests over {connections} connections "
+          f"({connections / JOBS:.2f} per job), submit {summarize(latencies)}")
+    print(f"client per request: {base_requests} requests over {base_connections} connections "
+          f"({base_connections / JOBS:.2f} per job), submit {summarize(base_latencies)}")
+
+    assert requests == JOBS * (POLLS_PER_JOB + 2)
+    # 요청이 몰려도 풀 크기를 넘는 연결은 열지 않고, 반납한 연결을 닫지 않고 재사용
+    # (API와 다운로드 호스트가 같아 API 풀 하나만 사용)
+    assert connections <= settings.MESHY_MAX_CONNECTIONS
+    assert base_connections == base_requests
+    assert percentile(latencies, 99) < 1.0
+    assert all((tmp_path / f"model{i}.glb").stat().st_size == MODEL_BYTES for i in range(JOBS))
+
+
+class FlakyDownloadServer:
+    """
+    다운로드 요청마다 미리 정한 응답을 보내는 서버
+    "cut": 200 헤더 후 절반만 보내고 연결 종료, "503": 일시적 오류, "206": Range 위치부터 끝까지, "200": 전체 파일
+    """
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.ranges = []
+        self.model = bytes(range(256)) * (MODEL_BYTES // 256)
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.url = f"http://127.0.0.1:{self._server.sockets[0].getsockname()[1]}/files/model.glb"
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while self.script:
+                head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+                headers = {k.strip().lower(): v.strip() for k, v in
+                           (line.split(":", 1) for line in head.split("\r\n")[1:] if ":" in line)}
+                self.ranges.append(headers.get("range"))
+                action = self.script.pop(0)
+                if action == "cut":
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(self.model)
+                                 + self.model[:len(self.model) // 2])
+                    await writer.drain()
+                    break
+                if action == "503":
+                    writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n")
+                elif action == "206":
+                    start = int(headers["range"].split("=")[1].rstrip("-"))
+                    body = self.model[start:]
+                    writer.write(b"HTTP/1.1 206 Partial Content\r\nContent-Length: %d\r\n"
+                                 b"Content-Range: bytes %d-%d/%d\r\n\r\n"
+                                 % (len(body), start, len(self.model) - 1, len(self.model)) + body)
+                else:
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(self.model) + self.model)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _download(script, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MESHY_RETRY_BACKOFF", 0.01)
+    monkeypatch.setattr(settings, "MESHY_DOWNLOAD_CHUNK_SIZE", 16 * 1024)
+    async with FlakyDownloadServer(script) as server:
+        client = MeshyClient()
+        await client.start()
+        progress = []
+        try:
+            await client.download(server.url, str(tmp_path / "model.glb"), lambda received, total: progress.append(received))
+        finally:
+            await client.close()
+        return server, progress
+
+
+def test_resume_survives_transient_error(tmp_path, monkeypatch):
+    server, progress = asyncio.run(_download(["cut", "503", "206"], tmp_path, monkeypatch))
+    half = MODEL_BYTES // 2
+    assert server.ranges == [None, f"bytes={half}-", f"bytes={half}-"]
+    # 503 뒤에도 받은 절반을 유지하고 나머지만 받음
+    assert min(progress[progress.index(half) + 1:]) > half
+    assert (tmp_path / "model.glb").read_bytes() == server.model
+
+
+def test_resume_restarts_when_range_is_ignored(tmp_path, monkeypatch):
+    server, _ = asyncio.run(_download(["cut", "200"], tmp_path, monkeypatch))
+    assert server.ranges == [None, f"bytes={MODEL_BYTES // 2}-"]
+    assert (tmp_path / "model.glb").read_bytes() == server.model
+
+
+def test_api_lifespan_manages_shared_client():
+    with TestClient(app):
+        assert meshy_client._client is not None
+    assert meshy_client._client is None
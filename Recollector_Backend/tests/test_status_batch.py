@@ -0,0 +1,88 @@
+"""
+일괄 상태 조회(/api/status:batch) vs 작업마다 GET /api/status/{task_id}
+Redis 왕복마다 지연(REDIS_RTT)을 넣은 fakeredis로 대시보드 한 번 갱신에 드는 Redis 왕복 수와 시간을 비교
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services import task_store
+
+TASKS = 300
+REDIS_RTT = 0.0005  # 같은 데이터센터 Redis 왕복 시간 가정 (초)
+
+
+@pytest.fixture
+def redis_round_trips(monkeypatch):
+    """task_store의 Redis 명령 전송(단일 명령 또는 파이프라인 한 번)마다 REDIS_RTT만큼 지연하고 횟수를 셈"""
+    connection_class = task_store.redis_client.connection_pool.connection_class
+    original = connection_class.send_packed_command
+    counter = {"round_trips": 0}
+
+    def send_packed_command(self, command, check_health=True):
+        packed = b"".join(command) if isinstance(command, list) else command
+        if b"CLIENT" not in packed[:32] and b"HELLO" not in packed[:32]:
+            # 새 연결의 핸드셰이크는 조회 왕복에서 제외
+            counter["round_trips"] += 1
+            time.sleep(REDIS_RTT)
+        return original(self, command, check_health)
+
+    monkeypatch.setattr(connection_class, "send_packed_command", send_packed_command)
+    return counter
+
+
+@pytest.fixture(scope="module")
+def task_ids():
+    ids = [f"status-batch-{i}" for i in range(TASKS)]
+    for i, task_id in enumerate(ids):
+        task_store.create(task_id, status="processing", progress=i % 100, email_status={"sent": False})
+    yield ids
+    for task_id in ids:
+        task_store.delete(task_id)
+
+
+def test_batch_matches_single_lookups(task_ids):
+    with TestClient(app) as client:
+        batch = client.post("/api/status:batch", json={"task_ids": task_ids[:5] + ["missing"]}).json()["tasks"]
+        for task_id in task_ids[:5]:
+            assert batch[task_id] == client.get(f"/api/status/{task_id}").json()
+        assert batch["missing"] is None
+
+        partial = client.post("/api/status:batch", json={"task_ids": task_ids[:2], "fields": ["progress"]}).json()
+        assert partial["tasks"] == {task_ids[0]: {"progress": 0}, task_ids[1]: {"progress": 1}}
+
+
+def test_batch_vs_sequential_round_trips(task_ids, redis_round_trips):
+    with TestClient(app) as client:
+        redis_round_trips["round_trips"] = 0
+        started = time.perf_counter()
+        for task_id in task_ids:
+            assert client.get(f"/api/status/{task_id}").status_code == 200
+        sequential_s = time.perf_counter() - started
+        sequential_trips = redis_round_trips["round_trips"]
+
+        redis_round_trips["round_trips"] = 0
+        started = time.perf_counter()
+        response = client.post("/api/status:batch", json={"task_ids": task_ids, "fields": ["status", "progress"]})
+        batch_s = time.perf_counter() - started
+        batch_trips = redis_round_trips["round_trips"]
+
+    assert len(response.json()["tasks"]) == TASKS
+    print(f"\n{TASKS} tasks: sequential GET {sequential_trips} Redis round trips {sequential_s * 1000:.0f}ms, "
+          f"status:batch {batch_trips} round trips {batch_s * 1000:.1f}ms ({sequential_s / batch_s:.0f}x)")
+    assert sequential_trips >= TASKS
+    assert batch_trips == -(-TASKS // settings.STATUS_BATCH_CHUNK_SIZE)
+    assert batch_s < sequential_s
+
+
+def test_large_batch_streams_one_pipeline_per_chunk(task_ids, redis_round_trips, monkeypatch):
+    monkeypatch.setattr(settings, "STATUS_BATCH_CHUNK_SIZE", 100)
+    with TestClient(app) as client:
+        redis_round_trips["round_trips"] = 0
+        response = client.post("/api/status:batch", json={"task_ids": task_ids, "fields": ["status"]})
+    tasks = response.json()["tasks"]
+    assert list(tasks) == task_ids
+    assert redis_round_trips["round_trips"] == TASKS // 100
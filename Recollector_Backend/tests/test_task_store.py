@@ -0,0 +1,52 @@
+"""
+task_store 필드 타입 왕복 (Redis 해시 값은 문자열이므로 읽을 때 원래 타입으로 되돌아와야 함)
+"""
+import json
+
+import pytest
+
+from app.services import task_store
+
+TASK_ID = "task-store-roundtrip"
+
+
+@pytest.fixture
+def task_id():
+    yield TASK_ID
+    task_store.delete(TASK_ID)
+
+
+def test_bool_fields_round_trip(task_id):
+    task_store.create(task_id, status="processing", progress=0, cached=False)
+    state = task_store.get(task_id)
+    assert state["cached"] is False
+    assert state["progress"] == 0 and state["version"] == 1
+
+    completed = task_store.transition(task_id, "processing", status="completed", progress=100, cached=True)
+    assert completed["cached"] is True
+    assert task_store.get(task_id)["cached"] is True
+    assert task_store.get_many([task_id])[0]["cached"] is True
+    assert task_store.get_many([task_id], fields=["cached"])[0] == {"cached": True}
+
+    task_store.update(task_id, cached=False)
+    assert not task_store.get(task_id)["cached"]
+
+
+def test_published_changes_decode_to_typed_values(task_id):
+    pubsub = task_store.redis_client.pubsub()
+    pubsub.subscribe(task_store.EVENTS_CHANNEL.format(task_id))
+    try:
+        pubsub.get_message(timeout=1)  # 구독 확인 메시지
+        task_store.create(task_id, status="processing", progress=0, cached=False)
+        task_store.update(task_id, progress=40, email_status={"sent": True, "recipient": "a@example.com"})
+
+        changes = []
+        while (message := pubsub.get_message(timeout=1)) is not None:
+            if message["type"] == "message":
+                changes.append(task_store.decode(json.loads(message["data"])))
+    finally:
+        pubsub.close()
+
+    assert changes[0]["cached"] is False
+    assert changes[1] == {"progress": 40, "version": 2,
+                          "email_status": {"sent": True, "recipient": "a@example.com"}}
@@ -0,0 +1,91 @@
+"""
+업로드 본문 크기 제한 (UploadSizeLimitMiddleware)
+ASGI로 앱을 직접 호출해 본문을 얼마나 받았는지 세고, 제한을 넘는 요청이 본문을 다 받기 전에 413으로 끝나는지 확인
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+CHUNK = 256 * 1024
+BOUNDARY = b"limit-test"
+
+
+@pytest.fixture
+def small_limit(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 1024 * 1024)
+    return settings.MAX_UPLOAD_SIZE
+
+
+def _multipart_chunks(total: int):
+    """이미지 파트 하나로 된 multipart 본문을 CHUNK 단위로"""
+    head = (b"--" + BOUNDARY + b"\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.png\"\r\n"
+            b"Content-Type: image/png\r\n\r\n")
+    yield head
+    for offset in range(0, total, CHUNK):
+        yield b"\0" * min(CHUNK, total - offset)
+    yield b"\r\n--" + BOUNDARY + b"--\r\n"
+
+
+async def _post(path: str, chunks, content_length=None):
+    """본문을 청크로 나눠 보내는 ASGI 요청 (응답 상태, 본문, 앱이 읽어 간 청크 수)"""
+    chunks = list(chunks)
+    headers = [(b"content-type", b"multipart/form-data; boundary=" + BOUNDARY)]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "", "headers": headers,
+             "client": ("127.0.0.1", 50000), "server": ("testserver", 80)}
+    read = 0
+    messages = []
+
+    async def receive():
+        nonlocal read
+        if read < len(chunks):
+            read += 1
+            return {"type": "http.request", "body": chunks[read - 1], "more_body": read < len(chunks)}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    status = next(message["status"] for message in messages if message["type"] == "http.response.start")
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return status, json.loads(body), read
+
+
+def test_content_length_over_limit_is_rejected_before_reading(small_limit):
+    chunks = list(_multipart_chunks(small_limit * 4))
+    status, body, read = asyncio.run(_post("/api/generate", chunks, sum(map(len, chunks))))
+    assert status == 413
+    assert "1MB" in body["detail"]
+    assert read == 0
+
+
+def test_chunked_body_over_limit_stops_while_receiving(small_limit):
+    """Content-Length 없이 보낸 본문은 제한을 넘는 청크까지만 받고 중단"""
+    chunks = list(_multipart_chunks(small_limit * 4))
+    status, body, read = asyncio.run(_post("/api/generate", chunks))
+    assert status == 413
+    assert read <= small_limit // CHUNK + 2
+    assert read < len(chunks)
+
+
+def test_batch_uses_batch_limit(small_limit, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_BATCH_UPLOAD_SIZE", 2 * 1024 * 1024)
+    chunks = list(_multipart_chunks(3 * 1024 * 1024))
+    status, body, read = asyncio.run(_post("/api/generate/batch", chunks, sum(map(len, chunks))))
+    assert (status, read) == (413, 0)
+    assert "2MB" in body["detail"]
+
+
+def test_upload_within_limit_is_accepted(small_limit):
+    with TestClient(app) as client:
+        response = client.post("/api/generate", files={"file": ("small.png", b"\x89PNG" + b"\0" * 1024, "image/png")})
+    assert response.status_code == 202
+    assert response.json()["task_id"]
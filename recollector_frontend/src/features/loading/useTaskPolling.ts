@@ -1,6 +1,7 @@
 import { useState, useRef, useEffect } from "react";
 import { taskApi } from "../../entities";
 import { TaskStatusResponse } from "../../entities/taskType";
+import { API_CONFIG } from "../../shared/api/config";
 
 
 
@@ -31,6 +32,22 @@ export const useTaskPolling = ({
 
   const isPollingRef = useRef(false);
   const pollingIntervalRef = useRef<NodeJS.Timeout | null>(null);
+  const eventSourceRef = useRef<EventSource | null>(null);
+
+  const handleStatus = (data: TaskStatusResponse) => {
+    setTaskStatus(data);
+    setProgress(data.progress || 0);
+    setIsLoading(false);
+
+    if (data.status === 'completed') {
+      stopPolling();
+      onCompleted?.(data);
+    } else if (data.status === 'failed') {
+      stopPolling();
+      setError(data.error || 'Task failed');
+      onFailed?.(data.error || 'Unknown error');
+    }
+  };
 
   const fetchTaskStatus = async () => {
     if (!taskId || isPollingRef.current) return;
@@ -39,18 +56,7 @@ export const useTaskPolling = ({
 
     try {
       const data = await taskApi.getStatus(taskId);
-      setTaskStatus(data);
-      setProgress(data.progress || 0);
-      setIsLoading(false);
-
-      if (data.status === 'completed') {
-        stopPolling();
-        onCompleted?.(data);
-      } else if (data.status === 'failed') {
-        stopPolling();
-        setError(data.error || 'Task failed');
-        onFailed?.(data.error || 'Unknown error');
-      }
+      handleStatus(data);
     } catch (err) {
       console.error('Error fetching task status:', err);
       setError('Failed to fetch task status');
@@ -61,6 +67,10 @@ export const useTaskPolling = ({
   };
 
   const stopPolling = () => {
+    if (eventSourceRef.current) {
+      eventSourceRef.current.close();
+      eventSourceRef.current = null;
+    }
     if (pollingIntervalRef.current) {
       clearInterval(pollingIntervalRef.current);
       pollingIntervalRef.current = null;
@@ -70,13 +80,39 @@ export const useTaskPolling = ({
   useEffect(() => {
     if (!taskId) return;
 
-    // 초기 로드
-    fetchTaskStatus();
-
-    // 폴링 시작
-    pollingIntervalRef.current = setInterval(() => {
+    const startPolling = () => {
+      // 초기 로드
       fetchTaskStatus();
-    }, interval);
+
+      // 폴링 시작
+      pollingIntervalRef.current = setInterval(() => {
+        fetchTaskStatus();
+      }, interval);
+    };
+
+    if (typeof EventSource === 'undefined') {
+      startPolling();
+      return () => {
+        stopPolling();
+      };
+    }
+
+    // 서버가 상태 변경을 SSE로 푸시 (연결에 실패하면 폴링으로 대체)
+    const eventSource = new EventSource(`${API_CONFIG.BASE_URL}/api/status/${taskId}/events`);
+    eventSourceRef.current = eventSource;
+
+    const onEvent = (event: MessageEvent) => {
+      handleStatus(JSON.parse(event.data) as TaskStatusResponse);
+    };
+    eventSource.addEventListener('status', onEvent);
+    eventSource.addEventListener('completed', onEvent);
+    eventSource.addEventListener('failed', onEvent);
+    eventSource.onerror = () => {
+      if (eventSourceRef.current !== eventSource) return;
+      eventSource.close();
+      eventSourceRef.current = null;
+      startPolling();
+    };
 
     // 클린업
     return () => {